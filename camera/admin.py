@@ -1,27 +1,28 @@
 from django.contrib import admin
-from .models import BoatCapture
+from .models import BoatCapture, Camera, DetectionProfile, IngestJob, QRScanLog, RegisteredBoat
 
 @admin.register(BoatCapture)
 class BoatCaptureAdmin(admin.ModelAdmin):
-    list_display = ['id', 'captured_at', 'qr_detected', 'qr_valid', 'status', 'reviewed_by']
-    list_filter = ['status', 'qr_valid', 'qr_detected']
+    list_display = ['id', 'captured_at', 'camera', 'track_frames', 'qr_detected', 'qr_valid', 'status', 'reviewed_by']
+    list_filter = ['status', 'camera', 'qr_valid', 'qr_detected']
     search_fields = ['qr_data', 'notes']
-    readonly_fields = ['captured_at', 'image']
+    readonly_fields = ['captured_at', 'image', 'blobs', 'track_frames', 'last_seen_at']
     
     fieldsets = (
         ('Image Info', {
-            'fields': ('image', 'captured_at')
+            'fields': ('image', 'captured_at', 'camera')
         }),
         ('QR Code Details', {
             'fields': ('qr_detected', 'qr_data', 'qr_valid')
         }),
+        ('Detected Objects', {
+            'fields': ('blobs', 'track_frames', 'last_seen_at')
+        }),
         ('Coast Guard Review', {
             'fields': ('status', 'reviewed_by', 'reviewed_at', 'notes')
         }),
     )
 
-from .models import RegisteredBoat, QRScanLog
-
 @admin.register(RegisteredBoat)
 class RegisteredBoatAdmin(admin.ModelAdmin):
     list_display = ['boat_id', 'boat_name', 'owner_name', 'total_entries', 'suspicious_activity_count', 'is_blacklisted']
@@ -35,3 +36,39 @@ class QRScanLogAdmin(admin.ModelAdmin):
     list_filter = ['is_suspicious', 'scanned_at']
     search_fields = ['boat__boat_id', 'boat__boat_name']
     readonly_fields = ['scanned_at', 'distance_from_last_scan', 'time_since_last_scan', 'calculated_speed']
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'filename', 'status', 'attempts', 'lease_owner', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['filename', 'lease_owner', 'last_error']
+    readonly_fields = ['created_at', 'finished_at', 'result', 'last_error']
+
+@admin.register(DetectionProfile)
+class DetectionProfileAdmin(admin.ModelAdmin):
+    list_display = ['name', 'is_active', 'min_threshold', 'max_threshold', 'version', 'updated_at']
+    list_filter = ['is_active']
+    search_fields = ['name']
+    readonly_fields = ['version', 'updated_at']
+
+@admin.register(Camera)
+class CameraAdmin(admin.ModelAdmin):
+    list_display = ['camera_id', 'name', 'location_name', 'is_active', 'detection_profile', 'capture_interval', 'last_seen_at']
+    list_filter = ['is_active']
+    search_fields = ['camera_id', 'name', 'location_name']
+    readonly_fields = ['last_seen_at', 'created_at']
+
+    fieldsets = (
+        ('Camera', {
+            'fields': ('camera_id', 'name', 'token', 'is_active')
+        }),
+        ('Location', {
+            'fields': ('location_name', 'latitude', 'longitude', 'installation_height')
+        }),
+        ('Pipeline', {
+            'fields': ('roi_polygons', 'detection_profile', 'capture_interval')
+        }),
+        ('Status', {
+            'fields': ('last_seen_at', 'created_at')
+        }),
+    )
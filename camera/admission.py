@@ -0,0 +1,178 @@
+"""
+Rate limiting + admission control for device uploads
+
+Two gates run before an upload body is even read:
+1. Per-camera token bucket: a camera may upload RATE_LIMIT_HEADROOM times
+   faster than its configured capture interval, with RATE_LIMIT_BURST
+   uploads of slack. Over the limit → 429 with the exact wait.
+2. Global admission: while the ingest backlog is above INGEST_MAX_BACKLOG
+   new uploads are refused (queue mode), and at most
+   ADMISSION_MAX_IN_FLIGHT uploads (queue mode) or ADMISSION_MAX_INLINE
+   uploads (inline mode: each one runs detection in the request) are
+   handled at once. Either case → 503.
+Both answers carry Retry-After (header + "retry_after" in the JSON) so the
+ESP32 sleeps instead of re-sending into an overloaded server.
+
+State is host-wide, shared by every gunicorn worker and thread: buckets
+are small flock'd files in ADMISSION_STATE_DIR (one per camera - only
+registered cameras get this far), in-flight uploads hold flock slots
+(slots.py), and the backlog is counted in the DB.
+"""
+import os
+import math
+import time
+import struct
+import threading
+
+from django.conf import settings
+
+from .slots import FlockSlots
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process, an in-memory lock is enough
+    fcntl = None
+
+
+class TokenBucket:
+    STATE = struct.Struct('<dd')  # tokens, updated (wall clock: shared by processes)
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+    def take(self, rate, burst, now):
+        """Take one token. Returns 0.0 if allowed, else seconds until one is available"""
+        self.tokens = min(burst, self.tokens + max(now - self.updated, 0.0) * rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class RateLimiter:
+    """Token bucket for every camera, one file each: read + update under an flock"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def check(self, camera_id, capture_interval):
+        """0.0 if the upload may proceed, else seconds to wait"""
+        rate = settings.RATE_LIMIT_HEADROOM / max(capture_interval, 1)
+        burst = settings.RATE_LIMIT_BURST
+        os.makedirs(self.directory, exist_ok=True)
+
+        with self._lock:
+            fd = os.open(os.path.join(self.directory, f"{camera_id}.bucket"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                now = time.time()
+                state = os.pread(fd, TokenBucket.STATE.size, 0)
+                if len(state) == TokenBucket.STATE.size:
+                    bucket = TokenBucket(*TokenBucket.STATE.unpack(state))
+                else:
+                    bucket = TokenBucket(float(burst), now)  # First upload of this camera
+                wait = bucket.take(rate, burst, now)
+                os.pwrite(fd, TokenBucket.STATE.pack(bucket.tokens, bucket.updated), 0)
+                return wait
+            finally:
+                os.close(fd)  # Also drops the flock
+
+
+class AdmissionController:
+    """Host-wide upload slots + ingest backlog check"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.rejected = 0  # By this process
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._local = threading.local()  # The slot held by this thread's request
+        self._backlog = 0
+        self._backlog_checked_at = 0.0
+
+    def slots(self):
+        """Slot pool for the current mode (inline uploads hold a slot while detecting)"""
+        if settings.INGEST_QUEUE_ENABLED:
+            key = ('upload', settings.ADMISSION_MAX_IN_FLIGHT)
+        else:
+            key = ('inline', settings.ADMISSION_MAX_INLINE)
+        pool = self._slots.get(key)
+        if pool is None:
+            pool = self._slots[key] = FlockSlots(self.directory, *key)
+        return pool
+
+    def backlog(self):
+        """Queued + leased ingest jobs (re-counted at most every ADMISSION_BACKLOG_CHECK_INTERVAL)"""
+        if time.monotonic() - self._backlog_checked_at >= settings.ADMISSION_BACKLOG_CHECK_INTERVAL:
+            from .models import IngestJob
+            self._backlog = IngestJob.objects.filter(status__in=['queued', 'leased']).count()
+            self._backlog_checked_at = time.monotonic()
+        return self._backlog
+
+    def enter(self):
+        """
+        Claim an upload slot for this thread
+        Returns: (0, None) if admitted - call leave() when done -
+        else (retry_after_seconds, reason)
+        """
+        if settings.INGEST_QUEUE_ENABLED:
+            backlog = self.backlog()
+            if backlog >= settings.INGEST_MAX_BACKLOG:
+                with self._lock:
+                    self.rejected += 1
+                # Wait longer the deeper the backlog
+                return retry_after(backlog / settings.INGEST_MAX_BACKLOG), 'backlog'
+
+        pool = self.slots()
+        slot = pool.acquire()
+        if slot is None:
+            with self._lock:
+                self.rejected += 1
+            return retry_after(), 'busy'
+        self._local.held = (pool, slot)
+        return 0, None
+
+    def leave(self):
+        held = getattr(self._local, 'held', None)
+        if held is not None:
+            self._local.held = None
+            held[0].release(held[1])
+
+    def stats(self):
+        pool = self.slots()
+        with self._lock:
+            return {
+                "in_flight_here": pool.held_here(),
+                "max_in_flight": pool.count,
+                "rejected_here": self.rejected,
+                "backlog": self._backlog,
+            }
+
+
+def retry_after(load=1.0):
+    """Suggested device back-off in whole seconds, scaled by how overloaded we are"""
+    seconds = math.ceil(settings.ADMISSION_RETRY_AFTER * max(load, 1.0))
+    return min(seconds, settings.ADMISSION_MAX_RETRY_AFTER)
+
+
+_limiter = None
+_admission = None
+
+
+def get_rate_limiter():
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(os.path.join(settings.ADMISSION_STATE_DIR, 'buckets'))
+    return _limiter
+
+
+def get_admission():
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController(settings.ADMISSION_STATE_DIR)
+    return _admission
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CameraConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'camera'
+
+    def ready(self):
+        # Keep OpenCV from spawning one thread per core in every gunicorn worker
+        from django.conf import settings
+        from .executor import configure_cv_threads
+        configure_cv_threads(settings.DETECTION_CV_THREADS)
+
+        # Registers the profile / camera changed signal handlers
+        from . import profiles, cameras  # noqa: F401
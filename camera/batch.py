@@ -0,0 +1,128 @@
+"""
+Batch upload parsing (burst captures)
+
+Two request formats are accepted by /upload-batch/:
+
+1. multipart/form-data
+   - one file field per frame (any field name, kept in body order)
+   - optional "metadata" field: JSON list, one object per frame
+
+2. application/x-oceanguard-frames (length-prefixed, easy to build on an ESP32)
+   repeated for every frame:
+     4 bytes  big-endian header length
+     N bytes  JSON header (per-frame metadata, may be {})
+     4 bytes  big-endian JPEG length
+     M bytes  JPEG
+"""
+import json
+import struct
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+
+FRAMES_CONTENT_TYPE = 'application/x-oceanguard-frames'
+
+
+class BatchFormatError(ValueError):
+    pass
+
+
+class PartOrderHandler(FileUploadHandler):
+    """
+    Records the field name of every file part in body order, passes the data on
+    request.FILES groups files by field name ("a", "b", "a" → a, a, b)
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.fields = []
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.fields.append(field_name)
+
+    def receive_data_chunk(self, raw_data, start):
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def _parse_multipart(request):
+    order = PartOrderHandler(request)
+    request.upload_handlers.insert(0, order)  # Before request.FILES is parsed
+    uploaded = request.FILES
+
+    # Frames are order-sensitive (motion, dedupe, tracking): rebuild body order
+    files, taken = [], {}
+    for name in order.fields:
+        index = taken.get(name, 0)
+        taken[name] = index + 1
+        parts = uploaded.getlist(name)
+        if index < len(parts):
+            files.append(parts[index])
+
+    metadata = []
+    if 'metadata' in request.POST:
+        try:
+            metadata = json.loads(request.POST['metadata'])
+        except ValueError:
+            raise BatchFormatError("metadata must be a JSON list")
+        if not isinstance(metadata, list):
+            raise BatchFormatError("metadata must be a JSON list")
+
+    if len(files) > settings.BATCH_MAX_FRAMES:
+        raise BatchFormatError(f"At most {settings.BATCH_MAX_FRAMES} frames per batch")
+
+    return [
+        (f.read(), metadata[i] if i < len(metadata) else {})
+        for i, f in enumerate(files)
+    ]
+
+
+def _parse_length_prefixed(body):
+    frames = []
+    offset = 0
+
+    def take(size):
+        nonlocal offset
+        if offset + size > len(body):
+            raise BatchFormatError("Truncated batch body")
+        chunk = body[offset:offset + size]
+        offset += size
+        return chunk
+
+    while offset < len(body):
+        if len(frames) >= settings.BATCH_MAX_FRAMES:
+            raise BatchFormatError(f"At most {settings.BATCH_MAX_FRAMES} frames per batch")
+
+        (header_len,) = struct.unpack('>I', take(4))
+        header = take(header_len)
+        try:
+            meta = json.loads(header) if header else {}
+        except ValueError:
+            raise BatchFormatError(f"Frame {len(frames)}: header is not valid JSON")
+
+        (frame_len,) = struct.unpack('>I', take(4))
+        frames.append((take(frame_len), meta))
+
+    return frames
+
+
+def parse_batch(request):
+    """
+    Returns: list of (jpeg_bytes, metadata_dict)
+    Raises BatchFormatError on malformed input
+    """
+    content_type = request.content_type or ''
+
+    if content_type.startswith('multipart/form-data'):
+        frames = _parse_multipart(request)
+    elif content_type == FRAMES_CONTENT_TYPE:
+        frames = _parse_length_prefixed(request.body)
+    else:
+        raise BatchFormatError(f"Use multipart/form-data or {FRAMES_CONTENT_TYPE}")
+
+    if not frames:
+        raise BatchFormatError("Batch contains no frames")
+    return frames
@@ -0,0 +1,172 @@
+"""
+Per-camera configuration
+
+Every upload carries a camera id (X-Camera-Id). The Camera row is loaded
+once into an immutable CameraConfig - ROI already normalized, detection
+profile already compiled - and cached in-process for CAMERA_CONFIG_TTL
+seconds, so the upload path never queries the cameras table per frame.
+Saving a Camera or Detection Profile invalidates this process at once;
+other processes pick the change up within the TTL.
+Unknown cameras are refused unless CAMERA_AUTO_REGISTER is on; then a
+camera that presents a token is registered on first contact with that
+token (location defaults from settings.CAMERA_GPS_LOCATION), up to
+CAMERA_AUTO_REGISTER_MAX cameras. Tokenless ids are never registered, so
+made-up camera ids can't add rows or rate-limit buckets.
+The 'default' camera (stock firmware sends no id) is created by
+migration 0011, so unconfigured devices keep working.
+"""
+import hmac
+import time
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Camera, DetectionProfile
+from .profiles import CompiledProfile, compile_profile, get_active_profile
+from .roi import normalize_polygons
+
+
+@dataclass(frozen=True)
+class CameraConfig:
+    pk: int
+    camera_id: str
+    token: str
+    is_active: bool
+    roi: tuple                   # Normalized ROI polygons or None
+    profile: CompiledProfile     # Camera's own profile, or None = globally active
+    capture_interval: int
+    location: dict
+
+    @property
+    def detection_profile(self):
+        return self.profile or get_active_profile()
+
+    def check_token(self, token):
+        """True if the camera has no token or the given one matches"""
+        return not self.token or hmac.compare_digest(self.token, token or '')
+
+
+def _compile_camera_profile(row):
+    if row is None:
+        return None
+    try:
+        return compile_profile(row.name, row.version, row.color_ranges, row.min_threshold, row.max_threshold)
+    except Exception as e:
+        print(f"⚠️ Detection profile {row.name} v{row.version} invalid: {str(e)} - using active profile")
+        return None
+
+
+def _roi(camera):
+    try:
+        return normalize_polygons(camera.roi_polygons)
+    except Exception as e:
+        print(f"⚠️ Camera '{camera.camera_id}' ROI invalid: {str(e)} - using whole frame")
+        return None
+
+
+def _register(camera_id, token):
+    location = settings.CAMERA_GPS_LOCATION
+    camera, created = Camera.objects.get_or_create(
+        camera_id=camera_id,
+        defaults={
+            'token': token,
+            'location_name': location.get('location_name', ''),
+            'latitude': location.get('latitude'),
+            'longitude': location.get('longitude'),
+            'installation_height': location.get('installation_height'),
+        },
+    )
+    if created:
+        print(f"📷 New camera registered: {camera_id}")
+    return camera
+
+
+class CameraStore:
+    """Per-process cache: camera_id → (CameraConfig, loaded_at)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()  # Registering a camera fires post_save → invalidate()
+        self._configs = {}
+
+    def invalidate(self, camera_id=None):
+        with self._lock:
+            if camera_id is None:
+                self._configs.clear()
+            else:
+                self._configs.pop(camera_id, None)
+
+    def get(self, camera_id):
+        entry = self._configs.get(camera_id)
+        if entry is None or time.monotonic() - entry[1] >= settings.CAMERA_CONFIG_TTL:
+            with self._lock:
+                config = self._load(camera_id)
+                if config is None:
+                    return None  # Unknown ids are not cached: any client can make them up
+                entry = (config, time.monotonic())
+                self._configs[camera_id] = entry
+        return entry[0]
+
+    def _load(self, camera_id):
+        camera = Camera.objects.select_related('detection_profile').filter(camera_id=camera_id).first()
+        if camera is None:
+            return None
+
+        # Reloads happen at most once per TTL per camera: cheap "last seen"
+        Camera.objects.filter(pk=camera.pk).update(last_seen_at=timezone.now())
+
+        return CameraConfig(
+            pk=camera.pk,
+            camera_id=camera.camera_id,
+            token=camera.token,
+            is_active=camera.is_active,
+            roi=_roi(camera),
+            profile=_compile_camera_profile(camera.detection_profile),
+            capture_interval=camera.capture_interval,
+            location={
+                'latitude': camera.latitude,
+                'longitude': camera.longitude,
+                'location_name': camera.location_name,
+                'installation_height': camera.installation_height,
+            },
+        )
+
+
+_store = CameraStore()
+
+
+def get_camera(camera_id):
+    """CameraConfig for a camera id, or None if unknown"""
+    return _store.get(camera_id)
+
+
+def register_camera(camera_id, token):
+    """
+    Auto-register an unknown camera (CAMERA_AUTO_REGISTER): the token it
+    presents becomes its token, so every later upload is authenticated
+    Returns: CameraConfig, or None (registration off, no token, or
+    CAMERA_AUTO_REGISTER_MAX cameras already exist)
+    """
+    if not settings.CAMERA_AUTO_REGISTER:
+        return None
+    if not token or len(token) > Camera._meta.get_field('token').max_length:
+        print(f"🚫 Camera '{camera_id}' not registered: a token (X-Camera-Token) is required")
+        return None
+    if Camera.objects.count() >= settings.CAMERA_AUTO_REGISTER_MAX:
+        print(f"🚫 Camera '{camera_id}' not registered: CAMERA_AUTO_REGISTER_MAX reached")
+        return None
+    _register(camera_id, token)
+    return get_camera(camera_id)
+
+
+@receiver([post_save, post_delete], sender=Camera)
+def _camera_changed(sender, instance, **kwargs):
+    _store.invalidate(instance.camera_id)
+
+
+@receiver([post_save, post_delete], sender=DetectionProfile)
+def _camera_profile_changed(sender, **kwargs):
+    _store.invalidate()
@@ -0,0 +1,83 @@
+"""
+Single-pass color classifier
+
+COLOR_RANGES is compiled into three 256-entry lookup tables (H, S, V).
+Every range owns one bit: the H table has the bit set for hues inside the
+range, likewise for S and V. A pixel is inside range r exactly when bit r
+survives H_lut[h] & S_lut[s] & V_lut[v], so one LUT pass over the HSV
+image classifies every pixel against every range of every color at once.
+Per-color counts then come from the 1-channel bitmask, which is cheap.
+Cost stays flat as colors are added, where cv2.inRange costs one full
+3-channel pass per range.
+"""
+try:
+    import cv2
+    import numpy as np
+    CV_AVAILABLE = True
+except ImportError:
+    CV_AVAILABLE = False
+
+MAX_RANGES = 31  # One bit per range; cv2.LUT tables go up to 32-bit signed
+
+
+class ColorClassifier:
+    def __init__(self, color_ranges):
+        self.colors = list(color_ranges)
+
+        ranges = [
+            (color_index, color_range)
+            for color_index, color_name in enumerate(self.colors)
+            for color_range in color_ranges[color_name]
+        ]
+        if len(ranges) > MAX_RANGES:
+            raise ValueError(f"At most {MAX_RANGES} color ranges are supported, got {len(ranges)}")
+
+        self.num_ranges = len(ranges)
+        self.dtype = next(
+            dt for dt, bits in ((np.uint8, 8), (np.uint16, 16), (np.int32, 31))
+            if self.num_ranges <= bits
+        )
+
+        # Per-channel bitmask tables
+        luts = np.zeros((3, 256), dtype=self.dtype)
+        color_bits = [0] * len(self.colors)
+        for bit, (color_index, color_range) in enumerate(ranges):
+            for channel in range(3):
+                lo, hi = color_range['lower'][channel], color_range['upper'][channel]
+                luts[channel, lo:hi + 1] |= self.dtype(1 << bit)
+            color_bits[color_index] |= 1 << bit
+
+        self.luts = luts
+        self.color_bits = color_bits
+
+    def classify(self, hsv):
+        """Bitmask image: bit r set where the pixel is inside range r"""
+        h, s, v = cv2.split(hsv)
+        return cv2.bitwise_and(
+            cv2.bitwise_and(cv2.LUT(h, self.luts[0]), cv2.LUT(s, self.luts[1])),
+            cv2.LUT(v, self.luts[2]),
+        )
+
+    def color_mask(self, bits, color_name):
+        """Nonzero where the pixel belongs to color_name (from a classify() bitmask)"""
+        return cv2.bitwise_and(bits, self.color_bits[self.colors.index(color_name)])
+
+    def counts_from_bits(self, bits):
+        """{color_name: pixel count} from a classify() bitmask"""
+        return {
+            color: cv2.countNonZero(cv2.bitwise_and(bits, color_bits))
+            for color, color_bits in zip(self.colors, self.color_bits)
+        }
+
+    def counts(self, hsv, mask=None):
+        """mask (optional, same size): only count pixels where mask is nonzero"""
+        bits = self.classify(hsv)
+        if mask is not None:
+            bits = cv2.bitwise_and(bits, bits, mask=mask)
+        return self.counts_from_bits(bits)
+
+    def percentages(self, hsv, mask=None):
+        """{color_name: percentage of pixels of that color}"""
+        total_pixels = hsv.shape[0] * hsv.shape[1]
+        return {color: count / total_pixels * 100 for color, count in self.counts(hsv, mask).items()}
+
@@ -0,0 +1,116 @@
+"""
+Near-duplicate frame suppression
+
+A fixed camera at a quiet harbour sends almost the same frame every few
+seconds. Each frame gets a 64-bit dHash from a 9x8 gray thumbnail (taken
+from the cheap 1/8 reduced decode). If a frame from the same camera
+within DEDUPE_WINDOW_SECONDS is within DEDUPE_MAX_DISTANCE bits, the
+earlier verdict is reused: no detection run, no new capture.
+Only frames saved as a capture are remembered. A boat covering a few
+percent of the view barely changes the hash of an empty scene, so a
+"rejected" verdict is never reused - quiet scenes are skipped by the
+motion gate instead.
+Entries expire DEDUPE_WINDOW_SECONDS after they were first seen, so a
+boat that stays in view is captured again once per window.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+try:
+    import cv2
+    import numpy as np
+    CV_AVAILABLE = True
+except ImportError:
+    CV_AVAILABLE = False
+
+
+def dhash(frame):
+    """64-bit difference hash of a Frame (None if it doesn't decode)"""
+    small = frame.reduced(8)
+    if small is None:
+        return None
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class DedupeEntry:
+    def __init__(self, phash, verdict, capture_id):
+        self.phash = phash
+        self.verdict = verdict
+        self.capture_id = capture_id
+        self.seen_at = time.monotonic()
+
+
+class DuplicateCache:
+    """Per-camera, time-bounded LRU of recent frame hashes"""
+
+    def __init__(self, window_seconds, max_distance, max_per_camera, max_cameras):
+        self.window_seconds = window_seconds
+        self.max_distance = max_distance
+        self.max_per_camera = max_per_camera
+        self.max_cameras = max_cameras
+        self._cameras = OrderedDict()  # camera_id → OrderedDict(entry_id → DedupeEntry)
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def lookup(self, camera_id, phash):
+        """Most recent matching entry for this camera, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entries = self._cameras.get(camera_id)
+            if not entries:
+                return None
+            self._cameras.move_to_end(camera_id)
+
+            # Drop expired entries (at most max_per_camera to check)
+            expired = [
+                entry_id for entry_id, entry in entries.items()
+                if now - entry.seen_at > self.window_seconds
+            ]
+            for entry_id in expired:
+                del entries[entry_id]
+
+            for entry_id in reversed(entries):
+                entry = entries[entry_id]
+                if hamming(entry.phash, phash) <= self.max_distance:
+                    entries.move_to_end(entry_id)  # LRU: recently matched stays longest
+                    return entry
+        return None
+
+    def remember(self, camera_id, phash, verdict, capture_id=None):
+        entry = DedupeEntry(phash, verdict, capture_id)
+        with self._lock:
+            entries = self._cameras.setdefault(camera_id, OrderedDict())
+            self._cameras.move_to_end(camera_id)
+            self._next_id += 1
+            entries[self._next_id] = entry
+
+            while len(entries) > self.max_per_camera:
+                entries.popitem(last=False)
+            while len(self._cameras) > self.max_cameras:
+                self._cameras.popitem(last=False)
+        return entry
+
+
+_cache = None
+
+
+def get_dedupe_cache():
+    global _cache
+    if _cache is None:
+        _cache = DuplicateCache(
+            window_seconds=settings.DEDUPE_WINDOW_SECONDS,
+            max_distance=settings.DEDUPE_MAX_DISTANCE,
+            max_per_camera=settings.DEDUPE_MAX_PER_CAMERA,
+            max_cameras=settings.DEDUPE_MAX_CAMERAS,
+        )
+    return _cache
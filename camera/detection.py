@@ -0,0 +1,273 @@
+"""
+Detection stages (pure CPU work, no database access)
+Everything here can run in a detection pool process, see executor.py
+"""
+from django.conf import settings
+
+from .frame import as_frame
+from .profiles import settings_profile
+from .motion import resize_mask
+from .roi import crop_to_roi, roi_bbox
+from .blobs import find_blobs, largest_by_color
+from .sampling import certainly_below
+# QR Code Scanner Libraries - OpenCV (Windows-friendly, no DLL issues)
+try:
+    import cv2
+    QR_AVAILABLE = True
+except ImportError:
+    # OpenCV not available
+    QR_AVAILABLE = False
+# ML Boat Detection (Optional - graceful fallback if ultralytics is not installed)
+from .detectors import ml_available
+from .inference import detect_boats, detect_boats_batch
+
+
+def color_blobs(hsv, classifier, foreground=None, roi=None, scale=1):
+    """
+    Connected color blobs inside the ROI (and the motion foreground, if given)
+    Work is cropped to the ROI bounding box; blob coordinates are mapped
+    back to full-resolution frame pixels
+    """
+    height, width = hsv.shape[:2]
+    cropped, mask, area = crop_to_roi(hsv, roi, resize_mask(foreground, hsv.shape))
+    offset = roi_bbox(roi, height, width)[:2] if roi else (0, 0)
+
+    bits = classifier.classify(cropped)
+    if mask is not None:
+        bits = cv2.bitwise_and(bits, bits, mask=mask)
+    return find_blobs(bits, classifier, area, offset, scale)
+
+
+def sampled_reject(bgr, classifier, foreground=None, roi=None, threshold=0.0):
+    """True if a tile sample proves every color is below threshold (see sampling.py)"""
+    cropped, mask, area = crop_to_roi(bgr, roi, resize_mask(foreground, bgr.shape))
+    return certainly_below(cropped, classifier, mask, area, threshold)
+
+
+def _near_threshold(percentages, min_threshold, max_threshold, margin):
+    """True if any color is too close to a threshold to trust a reduced-size estimate"""
+    return any(
+        abs(p - min_threshold) <= margin or abs(p - max_threshold) <= margin
+        for p in percentages.values()
+    )
+
+
+# 🎨 Color Detection Function for RED and BLUE boats
+def detect_colored_boat(img_data, profile=None, foreground=None, roi=None):
+    """
+    Detect RED or BLUE colored boats in image using HSV color space
+    img_data: JPEG bytes or a Frame (reuses its decoded HSV view)
+    profile: CompiledProfile (defaults to the one built from settings.py)
+    foreground: optional motion mask (any size) - only changed pixels count
+    roi: optional camera ROI polygons - percentages are of the ROI area
+
+    The thresholds apply to the largest connected blob of each color
+    (see blobs.py), not to the total count of colored pixels.
+
+    Screening mode (COLOR_SCREENING_SCALE > 1): the JPEG is decoded at
+    1/2, 1/4 or 1/8 size first; only if a percentage lands within
+    COLOR_SCREENING_MARGIN of a threshold is the full frame checked.
+    Sampling mode (COLOR_SAMPLING_ENABLED, full-resolution decodes only):
+    a stratified sample of tiles is checked first and the frame is rejected
+    as soon as every color is certainly below the minimum threshold.
+
+    Returns: (detected, color, percentage, blobs)
+    - detected: True if RED or BLUE boat found
+    - color: 'RED' or 'BLUE' or None
+    - percentage: percentage of image (or ROI) covered by the largest blob of that color
+    - blobs: every blob above BLOB_MIN_AREA_PERCENT, largest first
+    """
+    if not QR_AVAILABLE:  # cv2 needed
+        return False, None, 0.0, []
+
+    try:
+        frame = as_frame(img_data)
+
+        # Precompiled color ranges + thresholds
+        profile = profile or settings_profile()
+        classifier = profile.classifier
+        min_threshold = profile.min_threshold
+        max_threshold = profile.max_threshold
+        scale = settings.COLOR_SCREENING_SCALE
+
+        blobs = None
+
+        # Early exit: sampled tiles prove there isn't enough color for a blob above the minimum
+        # (closing can grow a blob a little, hence the margin)
+        if settings.COLOR_SAMPLING_ENABLED and scale <= 1:
+            if not frame.valid:
+                return False, None, 0.0, []
+            if sampled_reject(frame.bgr, classifier, foreground, roi, min_threshold - settings.COLOR_SCREENING_MARGIN):
+                return False, None, 0.0, []
+
+        # Cheap estimate on a reduced decode (most frames stop here)
+        if scale > 1:
+            if frame.reduced(scale) is None:
+                return False, None, 0.0, []
+            blobs = color_blobs(frame.reduced_hsv(scale), classifier, foreground, roi, scale)
+            percentages = largest_by_color(blobs, classifier.colors)
+            if _near_threshold(percentages, min_threshold, max_threshold, settings.COLOR_SCREENING_MARGIN):
+                blobs = None  # Ambiguous → decide on full resolution
+
+        if blobs is None:
+            if not frame.valid:
+                return False, None, 0.0, []
+            # HSV view of the frame (better for color detection)
+            blobs = color_blobs(frame.hsv, classifier, foreground, roi)
+            percentages = largest_by_color(blobs, classifier.colors)
+
+        detected_colors = []
+
+        for color_name, percentage in percentages.items():
+            # Check if within valid range (not too small, not too big)
+            if min_threshold <= percentage <= max_threshold:
+                detected_colors.append({
+                    'color': color_name,
+                    'percentage': round(percentage, 2)
+                })
+
+        # Return highest percentage color
+        if detected_colors:
+            detected_colors.sort(key=lambda x: x['percentage'], reverse=True)
+            best = detected_colors[0]
+            return True, best['color'], best['percentage'], blobs
+
+        return False, None, 0.0, blobs
+
+    except Exception as e:
+        print(f"❌ Color detection error: {str(e)}")
+        return False, None, 0.0, []
+
+
+def cascade_regions(blobs, shape):
+    """
+    Padded crop boxes around color candidates (largest blobs first)
+    Each blob box grows by ML_CASCADE_PADDING of its size on every side (a red
+    hull is only part of the boat), is at least ML_CASCADE_MIN_CROP pixels,
+    and overlapping boxes are merged
+    Returns: list of [x, y, w, h], or None if the crops would cover so much
+    of the frame that full-frame inference is just as cheap
+    """
+    height, width = shape
+    boxes = []
+    for blob in blobs[:settings.ML_CASCADE_MAX_CROPS]:
+        x, y, w, h = blob["bbox"]
+        pad_x = max(w * settings.ML_CASCADE_PADDING, (settings.ML_CASCADE_MIN_CROP - w) / 2, 0)
+        pad_y = max(h * settings.ML_CASCADE_PADDING, (settings.ML_CASCADE_MIN_CROP - h) / 2, 0)
+        box = [max(int(x - pad_x), 0), max(int(y - pad_y), 0),
+               min(int(x + w + pad_x), width), min(int(y + h + pad_y), height)]
+
+        # Merge with any box it overlaps (x1, y1, x2, y2 while merging)
+        for other in boxes[:]:
+            if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                boxes.remove(other)
+                box = [min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3])]
+        boxes.append(box)
+
+    covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in boxes)
+    if not boxes or covered > settings.ML_CASCADE_MAX_COVERAGE * height * width:
+        return None
+    return [[x1, y1, x2 - x1, y2 - y1] for x1, y1, x2, y2 in boxes]
+
+
+# ML Boat Detection
+def detect_boat(image_data, roi=None, candidates=None):
+    """
+    Detect if image contains a boat using YOLO ML model
+    image_data: JPEG bytes or a Frame (reuses its decoded BGR array)
+    roi: optional camera ROI polygons - inference runs on the ROI crop only
+    candidates: color blobs (largest first). With ML_CASCADE_ENABLED the
+    model only looks at padded crops around them (cascade_regions), at
+    ML_CASCADE_IMAGE_SIZE; full-frame inference only if there is nothing
+    to crop to or the crops would cover most of the frame
+    Returns: (is_boat, confidence, detected_class)
+    """
+    if not ml_available() or not settings.ML_BOAT_DETECTION_ENABLED:
+        # If ML not available or disabled, assume it's a boat (fallback)
+        return True, 1.0, "unknown"
+
+    try:
+        # Decoded BGR array (shared with the color stage)
+        frame = as_frame(image_data)
+        regions = None
+        if settings.ML_CASCADE_ENABLED and candidates:
+            regions = cascade_regions(candidates, frame.shape)
+
+        # Run inference: process-wide model or the inference daemon (see inference.py)
+        if regions:
+            crops = [frame.bgr[y:y + h, x:x + w] for x, y, w, h in regions]
+            found = detect_boats_batch(crops, settings.ML_CONFIDENCE_THRESHOLD, settings.ML_CASCADE_IMAGE_SIZE)
+            boats = sorted((boat for crop_boats in found for boat in crop_boats),
+                           key=lambda boat: boat["confidence"], reverse=True)
+            stage = f"{len(crops)} crop(s)"
+        else:
+            image, _, _ = crop_to_roi(frame.bgr, roi)  # Full frame (ROI crop)
+            boats = detect_boats(image, settings.ML_CONFIDENCE_THRESHOLD)
+            stage = "full frame"
+
+        if boats:
+            best = boats[0]
+            print(f"🚢 Boat Detected: {best['class']} ({best['confidence']*100:.1f}% confidence, {stage})")
+            return True, best["confidence"], best["class"]
+
+        # No boat detected
+        print(f"❌ No boat detected in image ({stage})")
+        return False, 0.0, None
+
+    except Exception as e:
+        print(f"⚠️ ML Detection Error: {str(e)}")
+        # On error, assume it's a boat (fail-safe approach)
+        return True, 0.0, "error"
+
+
+# Full detection chain for one frame (runs in the detection pool)
+def analyze_frame(img_data, profile=None, foreground=None, roi=None):
+    """
+    Run color screening, then ML confirmation if enabled
+    The JPEG is decoded once into a Frame shared by both stages
+    profile: CompiledProfile resolved by the caller (pickled to pool processes)
+    foreground: motion mask from the camera's background model (or None)
+    roi: camera ROI polygons (or None for the whole frame)
+    Returns: verdict dict
+    """
+    frame = as_frame(img_data)
+
+    color_detected = False
+    detected_color = None
+    color_percentage = 0.0
+    blobs = []
+
+    try:
+        if settings.COLOR_DETECTION_ENABLED:
+            print("🎨 Step 1: Checking for suspicious activity...")
+            color_detected, detected_color, color_percentage, blobs = detect_colored_boat(
+                frame, profile, foreground, roi
+            )
+
+            if color_detected:
+                print(f"✅ Suspicious Color Found! ({color_percentage}% of image, {len(blobs)} blob(s))")
+            else:
+                print(f"❌ No suspicious activity detected - Rejecting image")
+        else:
+            print("⚠️ Color detection disabled in settings")
+    except Exception as e:
+        print(f"❌ Color Detection Error: {str(e)}")
+
+    verdict = {
+        "suspicious": color_detected,
+        "color_detected": color_detected,
+        "color": detected_color,
+        "color_percentage": color_percentage,
+        "blobs": blobs,
+    }
+
+    # STEP 2: ML confirmation (only for frames that passed the color screen)
+    # Cascade: the detector looks at the candidate blobs of the detected color, not the whole frame
+    if color_detected and settings.ML_BOAT_DETECTION_ENABLED:
+        candidates = [blob for blob in blobs if blob["color"] == detected_color]
+        is_boat, confidence, detected_class = detect_boat(frame, roi, candidates)
+        verdict["suspicious"] = is_boat
+        verdict["ml_confidence"] = confidence
+        verdict["ml_class"] = detected_class
+
+    return verdict
@@ -0,0 +1,278 @@
+"""
+YOLO model registry (one loaded model per process)
+
+detect_boat used to build YOLO('yolov8n.pt') for every frame. The model is
+now loaded once per process, the first time it is needed or - better -
+at startup by warm_detectors(), which also runs one dummy inference so
+the graph is set up before the first real frame:
+- every detection pool process (executor.py initializer)
+- gunicorn workers, post_fork (gunicorn.conf.py)
+- run_ingest_worker on start
+With INFERENCE_MODE = 'daemon' only the inference server loads it
+(see inference.py).
+Inference is restricted to the BOAT_CLASSES ids (YOLO skips every other
+class in NMS), and the class / confidence filter is done with array
+operations over result.boxes instead of a Python loop per box.
+
+Two backends, chosen by ML_BACKEND:
+- 'torch': the ultralytics .pt model (BoatDetector)
+- 'onnx': the model exported by manage.py export_detector, run with
+  ONNX Runtime on the CPU (OnnxBoatDetector) - FP32 or INT8 quantized.
+  Needs only onnxruntime, not ultralytics / PyTorch.
+"""
+import ast
+import time
+import threading
+
+from django.conf import settings
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+try:
+    from ultralytics import YOLO
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+try:
+    import onnxruntime
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+
+def ml_available():
+    """True if the configured ML_BACKEND can be loaded in this environment"""
+    if settings.ML_BACKEND == 'onnx':
+        return ONNX_AVAILABLE and cv2 is not None
+    return TORCH_AVAILABLE
+
+
+def boat_class_ids(names, class_names, source):
+    """Ids of the model classes listed in BOAT_CLASSES (case-insensitive)"""
+    wanted = {name.lower() for name in class_names}
+    class_ids = [i for i, name in names.items() if name.lower() in wanted]
+    if not class_ids:
+        print(f"⚠️ None of BOAT_CLASSES {class_names} is a class of {source}")
+    return class_ids
+
+
+def letterbox(image, size):
+    """
+    Resize keeping aspect ratio and pad to size x size (YOLO's input layout)
+    Returns: (padded BGR image, scale, (pad_x, pad_y))
+    """
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+    pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+
+    padded = np.full((size, size, 3), 114, dtype=np.uint8)
+    padded[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = cv2.resize(
+        image, (new_width, new_height), interpolation=cv2.INTER_LINEAR
+    )
+    return padded, scale, (pad_x, pad_y)
+
+
+def to_input(padded_images):
+    """Letterboxed BGR images → float32 NCHW RGB tensor in [0, 1]"""
+    batch = np.stack(padded_images)[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+
+class BoatDetector:
+    """One YOLO model + the class ids that count as boats"""
+
+    def __init__(self, weights, class_names, image_size):
+        self.weights = weights
+        self.image_size = image_size
+        self.model = YOLO(weights)
+        self.names = self.model.names  # class id → name
+        self.class_ids = boat_class_ids(self.names, class_names, weights)
+        self._class_array = np.array(self.class_ids, dtype=np.int64)
+
+    def warm(self):
+        """One inference on a blank frame: sets up the graph before real traffic"""
+        blank = np.zeros((self.image_size, self.image_size, 3), dtype=np.uint8)
+        self.model.predict(blank, imgsz=self.image_size, classes=self.class_ids, verbose=False)
+
+    def detect(self, image, min_confidence, image_size=None):
+        """
+        Boat boxes in a BGR image, most confident first
+        image_size: model input size (default ML_IMAGE_SIZE; smaller for crops)
+        Returns: list of {"class", "confidence", "bbox": [x, y, w, h]}
+        """
+        return self.detect_batch([image], [min_confidence], image_size)[0]
+
+    def detect_batch(self, images, min_confidences, image_size=None):
+        """detect() for several images in one forward pass (inference daemon, cascade crops)"""
+        if not self.class_ids:
+            return [[] for _ in images]
+        results = self.model.predict(
+            images, imgsz=image_size or self.image_size, classes=self.class_ids,
+            conf=min(min_confidences), verbose=False
+        )
+        return [self.boxes(result.boxes, conf) for result, conf in zip(results, min_confidences)]
+
+    def boxes(self, boxes, min_confidence):
+        """Filter + sort a result's boxes with array operations (no per-box tensor conversion)"""
+        if len(boxes) == 0:
+            return []
+        confidence = boxes.conf.cpu().numpy()
+        class_id = boxes.cls.cpu().numpy().astype(np.int64)
+        xywh = boxes.xyxy.cpu().numpy()
+        xywh[:, 2:] -= xywh[:, :2]
+
+        keep = np.isin(class_id, self._class_array) & (confidence >= min_confidence)
+        order = np.flatnonzero(keep)[np.argsort(-confidence[keep], kind='stable')]
+        return [
+            {
+                "class": self.names[int(class_id[i])],
+                "confidence": float(confidence[i]),
+                "bbox": [int(v) for v in xywh[i].round()],
+            }
+            for i in order
+        ]
+
+
+class OnnxBoatDetector:
+    """
+    Exported YOLOv8 model on ONNX Runtime (CPU)
+    Same interface as BoatDetector; pre- and post-processing (letterbox,
+    class filter, NMS, mapping boxes back) are done here with numpy / OpenCV
+    """
+
+    def __init__(self, model_path, class_names, image_size):
+        self.weights = model_path
+        self.image_size = image_size
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = settings.ML_ONNX_THREADS
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)  # Exported with dynamic=True
+        # A static export only accepts its own input size
+        self.fixed_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else None
+
+        # ultralytics stores the class names in the model metadata
+        names = self.session.get_modelmeta().custom_metadata_map.get('names')
+        if not names:
+            raise ValueError(f"{model_path} has no class names - export it with manage.py export_detector")
+        self.names = {int(i): name for i, name in ast.literal_eval(names).items()}
+        self.class_ids = boat_class_ids(self.names, class_names, model_path)
+        self._class_array = np.array(self.class_ids, dtype=np.int64)
+
+    def warm(self):
+        blank = np.zeros((self.image_size, self.image_size, 3), dtype=np.uint8)
+        self.detect(blank, 1.0)
+
+    def detect(self, image, min_confidence, image_size=None):
+        return self.detect_batch([image], [min_confidence], image_size)[0]
+
+    def detect_batch(self, images, min_confidences, image_size=None):
+        if not self.class_ids:
+            return [[] for _ in images]
+        size = self.fixed_size or image_size or self.image_size
+        letterboxed = [letterbox(image, size) for image in images]
+        padded = [item[0] for item in letterboxed]
+
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: to_input(padded)})[0]
+        else:
+            outputs = np.concatenate([self.session.run(None, {self.input_name: to_input([p])})[0] for p in padded])
+
+        return [
+            self.boxes(output, scale, pad, image.shape[:2], conf)
+            for output, (_, scale, pad), image, conf in zip(outputs, letterboxed, images, min_confidences)
+        ]
+
+    def boxes(self, output, scale, pad, shape, min_confidence):
+        """
+        Decode one YOLOv8 output (4 + classes, anchors): boat class scores only,
+        confidence filter, NMS, boxes mapped back to the original image
+        """
+        predictions = output.T                                  # (anchors, 4 + classes)
+        scores = predictions[:, 4 + self._class_array]          # Boat classes only
+        best = scores.argmax(axis=1)
+        confidence = scores[np.arange(len(scores)), best]
+        keep = confidence >= min_confidence
+        if not keep.any():
+            return []
+
+        center, size = predictions[keep, :2], predictions[keep, 2:4]
+        xywh = np.concatenate([center - size / 2, size], axis=1)
+        xywh[:, :2] -= pad
+        xywh /= scale
+        confidence, class_id = confidence[keep], self._class_array[best[keep]]
+
+        # Class-aware NMS in one call: shift each class to its own region
+        offset = (class_id * (max(shape) + 1))[:, None].astype(np.float32)
+        shifted = xywh.copy()
+        shifted[:, :2] += offset
+        indexes = cv2.dnn.NMSBoxes(shifted.tolist(), confidence.tolist(), min_confidence, settings.ML_NMS_IOU)
+        indexes = np.array(indexes, dtype=np.int64).reshape(-1)
+        order = indexes[np.argsort(-confidence[indexes], kind='stable')]
+
+        height, width = shape
+        x1 = np.clip(xywh[:, 0], 0, width)
+        y1 = np.clip(xywh[:, 1], 0, height)
+        x2 = np.clip(xywh[:, 0] + xywh[:, 2], 0, width)
+        y2 = np.clip(xywh[:, 1] + xywh[:, 3], 0, height)
+        clipped = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1).round().astype(int)
+        return [
+            {
+                "class": self.names[int(class_id[i])],
+                "confidence": float(confidence[i]),
+                "bbox": clipped[i].tolist(),
+            }
+            for i in order
+        ]
+
+
+BACKENDS = {
+    'torch': BoatDetector,
+    'onnx': OnnxBoatDetector,
+}
+
+
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+def get_detector():
+    """This process's detector for the configured backend + model (loaded on first use)"""
+    weights = settings.ML_ONNX_MODEL if settings.ML_BACKEND == 'onnx' else settings.ML_MODEL_WEIGHTS
+    key = (settings.ML_BACKEND, weights, tuple(settings.BOAT_CLASSES), settings.ML_IMAGE_SIZE)
+    detector = _detectors.get(key)
+    if detector is None:
+        with _detectors_lock:
+            detector = _detectors.get(key)
+            if detector is None:
+                detector = _detectors[key] = BACKENDS[settings.ML_BACKEND](*key[1:])
+    return detector
+
+
+def warm_detectors():
+    """
+    Load + warm the YOLO model in this process
+    No-op when ML detection is off, or the inference daemon holds the model
+    """
+    if not ml_available() or not settings.ML_BOAT_DETECTION_ENABLED or settings.INFERENCE_MODE == 'daemon':
+        return False
+    started = time.perf_counter()
+    try:
+        get_detector().warm()
+    except Exception as e:
+        print(f"⚠️ YOLO warm-up failed: {str(e)}")
+        return False
+    print(f"🧠 YOLO {get_detector().weights} ({settings.ML_BACKEND}) loaded + warmed in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return True
@@ -0,0 +1,185 @@
+"""
+Detection process pool
+
+OpenCV/NumPy detection is CPU bound, so it runs in a pool of worker
+processes instead of the calling thread. Every pool process pins
+cv2.setNumThreads(DETECTION_CV_THREADS) so pool size x OpenCV threads
+matches the cores instead of oversubscribing them.
+DETECTION_POOL_SIZE = 0 runs detection inline (no pool).
+DETECTION_POOL_SIZE is per host: processes that run side by side (the
+gunicorn workers) call share_pool() and each gets an even share of it.
+"""
+import os
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.conf import settings
+
+
+def configure_cv_threads(num_threads):
+    """Pin OpenCV's internal thread pool for this process"""
+    try:
+        import cv2
+        cv2.setNumThreads(num_threads)
+    except ImportError:
+        pass
+
+
+def _init_pool_process(num_threads):
+    # Spawned processes start fresh: bring Django up before importing detection code
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'oceanguard.settings')
+    import django
+    django.setup()
+    configure_cv_threads(num_threads)
+
+    # Load the YOLO model now, not on this process's first frame
+    from .detectors import warm_detectors
+    warm_detectors()
+
+
+def _timed_call(fn, args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+class DetectionExecutor:
+    """Process pool + busy-time accounting for utilisation stats"""
+
+    def __init__(self, pool_size, cv_threads=1, start_method='spawn'):
+        self.pool_size = pool_size
+        self.cv_threads = cv_threads
+        self.started_at = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+
+        if pool_size > 0:
+            self._pool = ProcessPoolExecutor(
+                max_workers=pool_size,
+                mp_context=multiprocessing.get_context(start_method),
+                initializer=_init_pool_process,
+                initargs=(cv_threads,),
+            )
+        else:
+            self._pool = None
+            configure_cv_threads(cv_threads)
+
+    def submit(self, fn, *args):
+        """Schedule fn(*args) on the pool. fn must be a module-level function."""
+        with self._lock:
+            self._in_flight += 1
+
+        if self._pool is None:
+            future = Future()
+            try:
+                future.set_result(_timed_call(fn, args))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = self._pool.submit(_timed_call, fn, args)
+
+        result_future = Future()
+
+        def _done(f):
+            with self._lock:
+                self._in_flight -= 1
+                if f.exception() is not None:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+                    self._busy_seconds += f.result()[1]
+            if f.exception() is not None:
+                result_future.set_exception(f.exception())
+            else:
+                result_future.set_result(f.result()[0])
+
+        future.add_done_callback(_done)
+        return result_future
+
+    def warm(self):
+        """
+        Start every pool process now (each loads + warms its models in the
+        initializer) so the first frames don't pay for it; inline: warm here
+        """
+        if self._pool is None:
+            from .detectors import warm_detectors
+            warm_detectors()
+            return
+        futures = [self._pool.submit(os.getpid) for _ in range(self.pool_size)]
+        pids = {f.result() for f in futures}
+        print(f"⚙️ Detection pool warm: {len(pids)} process(es)")
+
+    def run(self, fn, *args):
+        """Submit and wait for the result"""
+        return self.submit(fn, *args).result()
+
+    def map(self, fn, items, *args):
+        """Run fn(item, *args) for every item in parallel, results in input order"""
+        futures = [self.submit(fn, item, *args) for item in items]
+        return [f.result() for f in futures]
+
+    def stats(self):
+        """Pool size and utilisation (busy worker-seconds / available worker-seconds)"""
+        with self._lock:
+            elapsed = time.monotonic() - self.started_at
+            capacity = max(self.pool_size, 1) * elapsed
+            return {
+                "pool_size": self.pool_size,
+                "cv_threads": self.cv_threads,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "busy_seconds": round(self._busy_seconds, 3),
+                "utilisation": round(self._busy_seconds / capacity, 4) if capacity else 0.0,
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_pool_sharers = 1
+
+
+def share_pool(processes):
+    """This process is one of `processes` splitting DETECTION_POOL_SIZE (call before get_executor)"""
+    global _pool_sharers
+    _pool_sharers = max(processes, 1)
+
+
+def pool_size():
+    """This process's share of DETECTION_POOL_SIZE (at least 1 process, 0 stays inline)"""
+    if settings.DETECTION_POOL_SIZE <= 0:
+        return 0
+    return max(settings.DETECTION_POOL_SIZE // _pool_sharers, 1)
+
+
+def get_executor():
+    """Per-process executor, created lazily (after any gunicorn fork)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = DetectionExecutor(
+                    pool_size=pool_size(),
+                    cv_threads=settings.DETECTION_CV_THREADS,
+                    start_method=settings.DETECTION_POOL_START_METHOD,
+                )
+                atexit.register(_executor.shutdown)
+    return _executor
+
+
+def executor_stats():
+    """Stats for this process, without starting a pool just to report on it"""
+    if _executor is None:
+        return {"pool_size": pool_size(), "started": False}
+    return dict(_executor.stats(), started=True)
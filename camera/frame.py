@@ -0,0 +1,127 @@
+"""
+Frame - one uploaded JPEG shared by every pipeline stage
+
+The JPEG is decoded at most once; HSV / gray views and downscaled
+variants are computed on first use and cached on the Frame, so the
+color, YOLO and QR stages never decode or convert the same bytes twice.
+Screening stages can ask for a reduced decode (1/2, 1/4, 1/8) which
+libjpeg produces by DCT scaling, far cheaper than a full decode. Only one
+reduced decode is made, at base_scale (the finest scale any screening
+stage uses); coarser scales are resized from it.
+A Frame is picklable: it goes to the detection pool with its decodes
+(not the derived views), so the pool never decodes what screening did.
+"""
+from functools import cached_property
+
+try:
+    import cv2
+    import numpy as np
+    CV_AVAILABLE = True
+except ImportError:
+    CV_AVAILABLE = False
+
+# Scale → imdecode flag for decoding at reduced size
+REDUCED_DECODE_FLAGS = {
+    2: 'IMREAD_REDUCED_COLOR_2',
+    4: 'IMREAD_REDUCED_COLOR_4',
+    8: 'IMREAD_REDUCED_COLOR_8',
+}
+
+
+class Frame:
+    def __init__(self, data, base_scale=None):
+        self.data = data          # Raw JPEG bytes (as uploaded)
+        self.base_scale = base_scale  # Reduced decode to make (None: each scale as asked)
+        self._downscaled = {}     # scale → BGR array
+        self._reduced = {}        # scale → BGR array decoded at reduced size
+        self._reduced_hsv = {}    # scale → HSV of the reduced decode
+
+    @cached_property
+    def bgr(self):
+        """Full resolution BGR array (None if the bytes don't decode)"""
+        if not CV_AVAILABLE:
+            return None
+        return cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_COLOR)
+
+    @property
+    def valid(self):
+        return self.bgr is not None
+
+    @property
+    def shape(self):
+        """(height, width) of the full resolution frame"""
+        return self.bgr.shape[:2]
+
+    @cached_property
+    def hsv(self):
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV)
+
+    @cached_property
+    def gray(self):
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+
+    def downscaled(self, scale):
+        """BGR frame resized by 1/scale (e.g. scale=4 → 200x150 for SVGA)"""
+        if scale == 1:
+            return self.bgr
+        if scale not in self._downscaled:
+            h, w = self.shape
+            self._downscaled[scale] = cv2.resize(
+                self.bgr, (max(w // scale, 1), max(h // scale, 1)), interpolation=cv2.INTER_AREA
+            )
+        return self._downscaled[scale]
+
+    def reduced(self, scale):
+        """
+        BGR frame decoded directly at 1/scale (scale 1, 2, 4 or 8)
+        Reuses the full decode if some stage already paid for it
+        """
+        if scale == 1:
+            return self.bgr
+        if scale not in REDUCED_DECODE_FLAGS:
+            raise ValueError(f"Unsupported reduced decode scale: {scale}")
+        if 'bgr' in self.__dict__ or self.base_scale == 1:
+            return self.downscaled(scale) if self.valid else None
+        if scale not in self._reduced:
+            finer = [s for s in self._reduced if scale % s == 0 and self._reduced[s] is not None]
+            if not finer and self.base_scale and scale % self.base_scale == 0 and self.base_scale != scale:
+                finer = [self.base_scale] if self.reduced(self.base_scale) is not None else []
+            if finer:
+                # One decode per frame: resize the finest reduced decode already made
+                source = self._reduced[min(finer)]
+                h, w = source.shape[:2]
+                factor = scale // min(finer)
+                self._reduced[scale] = cv2.resize(
+                    source, (max(w // factor, 1), max(h // factor, 1)), interpolation=cv2.INTER_AREA
+                )
+            else:
+                flag = getattr(cv2, REDUCED_DECODE_FLAGS[scale])
+                self._reduced[scale] = cv2.imdecode(np.frombuffer(self.data, np.uint8), flag)
+        return self._reduced[scale]
+
+    def reduced_hsv(self, scale):
+        """HSV view of reduced(scale)"""
+        if scale == 1:
+            return self.hsv
+        if scale not in self._reduced_hsv:
+            self._reduced_hsv[scale] = cv2.cvtColor(self.reduced(scale), cv2.COLOR_BGR2HSV)
+        return self._reduced_hsv[scale]
+
+
+    def __getstate__(self):
+        """Pickled for the detection pool: bytes + decodes (views are cheap to redo there)"""
+        state = {
+            'data': self.data,
+            'base_scale': self.base_scale,
+            '_reduced': self._reduced,
+            '_downscaled': {},
+            '_reduced_hsv': {},
+        }
+        if 'bgr' in self.__dict__:
+            state['bgr'] = self.bgr
+        return state
+
+
+def as_frame(img):
+    """Accept either raw bytes or an existing Frame"""
+    return img if isinstance(img, Frame) else Frame(img)
@@ -0,0 +1,287 @@
+"""
+YOLO inference: in this process, or in one shared daemon per host
+
+INFERENCE_MODE = 'local': every detection process holds its own model
+(detectors.py) and runs one frame at a time.
+INFERENCE_MODE = 'daemon': one process (manage.py run_inference_server)
+holds the only model and listens on the Unix socket INFERENCE_SOCKET.
+Detection processes send it the decoded BGR crops of a frame in one
+request; it collects images for up to INFERENCE_BATCH_WAIT_MS or
+INFERENCE_BATCH_MAX frames, runs one batched forward pass and sends each
+caller its own boxes. RAM for
+the model is paid once per host, and under concurrency frames share
+forward passes instead of queueing for the CPU one by one.
+
+Wire format (both directions length-prefixed, one request at a time per
+connection):
+    request:  image count (!H), min_confidence (!f),
+              model input size (!H, 0 = default),
+              then per image: height, width, channels (!HHB), raw pixels
+    response: length (!I), JSON - list of boxes per image, or {"error": ...}
+A malformed request (bad count or shape) gets an error reply, then the
+daemon closes that connection (the client reconnects on its next call).
+"""
+import os
+import json
+import time
+import queue
+import socket
+import struct
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+REQUEST = struct.Struct('!HfH')
+SHAPE = struct.Struct('!HHB')
+MAX_REQUEST_IMAGES = 64  # Crops of one frame (cascade) - more is a malformed request
+RESPONSE = struct.Struct('!I')
+
+
+class InferenceError(Exception):
+    pass
+
+
+def recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Connection closed")
+        received += count
+    return buffer
+
+
+def send_json(sock, value):
+    body = json.dumps(value).encode()
+    sock.sendall(RESPONSE.pack(len(body)) + body)
+
+
+# ============================================
+# CLIENT (detection processes)
+# ============================================
+
+class InferenceClient:
+    """One persistent connection per thread to the inference daemon"""
+
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def detect(self, image, min_confidence, image_size=None):
+        """Same result as BoatDetector.detect, computed by the daemon"""
+        return self.detect_batch([image], min_confidence, image_size)[0]
+
+    def detect_batch(self, images, min_confidence, image_size=None):
+        """Boxes for every image, sent in one request (they share the daemon's next batch)"""
+        images = [np.ascontiguousarray(image) for image in images]
+        message = [REQUEST.pack(len(images), min_confidence, image_size or 0)]
+        for image in images:
+            channels = image.shape[2] if image.ndim == 3 else 1
+            message.append(SHAPE.pack(image.shape[0], image.shape[1], channels))
+            message.append(image.data)
+
+        # A kept-alive connection may have been closed by a daemon restart: retry once
+        for attempt in range(2):
+            sock = getattr(self._local, 'sock', None)
+            try:
+                if sock is None:
+                    sock = self._connect()
+                for part in message:
+                    sock.sendall(part)
+                length = RESPONSE.unpack(recv_exact(sock, RESPONSE.size))[0]
+                reply = json.loads(recv_exact(sock, length))
+                break
+            except (ConnectionError, FileNotFoundError, socket.timeout, OSError) as e:
+                self._close()
+                if attempt or isinstance(e, (FileNotFoundError, socket.timeout)):
+                    raise InferenceError(f"Inference daemon unavailable ({self.path}): {str(e)}")
+
+        if isinstance(reply, dict):
+            raise InferenceError(reply.get("error", "Inference failed"))
+        return reply
+
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = InferenceClient(settings.INFERENCE_SOCKET, settings.INFERENCE_TIMEOUT)
+    return _client
+
+
+def detect_boats(image, min_confidence, image_size=None):
+    """Boat boxes for a BGR image, from the local model or the daemon (INFERENCE_MODE)"""
+    return detect_boats_batch([image], min_confidence, image_size)[0]
+
+
+def detect_boats_batch(images, min_confidence, image_size=None):
+    """
+    detect_boats() for several images (e.g. cascade crops of one frame)
+    Local: one forward pass. Daemon: one request, batched by the daemon.
+    """
+    if settings.INFERENCE_MODE == 'daemon':
+        return get_client().detect_batch(images, min_confidence, image_size)
+    from .detectors import get_detector
+    return get_detector().detect_batch(images, [min_confidence] * len(images), image_size)
+
+
+# ============================================
+# SERVER (manage.py run_inference_server)
+# ============================================
+
+class InferenceServer:
+    """
+    Accepts connections (one thread each), queues their frames, and a single
+    batcher thread runs them through the model in micro-batches
+    """
+
+    def __init__(self, detector, path, batch_max, batch_wait):
+        self.detector = detector
+        self.path = path
+        self.batch_max = batch_max
+        self.batch_wait = batch_wait  # Seconds
+        self.requests = queue.Queue()
+        self.frames = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+
+    def serve_forever(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Left behind by a previous daemon
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        os.chmod(self.path, 0o660)
+        server.listen(128)
+
+        threading.Thread(target=self.run_batches, name='batcher', daemon=True).start()
+        print(f"🧠 Inference server listening on {self.path} (batch ≤ {self.batch_max}, wait ≤ {self.batch_wait * 1000:.0f} ms)")
+
+        try:
+            while True:
+                conn, _ = server.accept()
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        finally:
+            server.close()
+            os.remove(self.path)
+
+    def handle(self, conn):
+        """One client connection: read a request's images, wait for their batch, reply - repeat"""
+        with conn:
+            while True:
+                try:
+                    images, min_confidence, image_size = self.read_request(conn)
+                except ConnectionError:
+                    return
+                except (ValueError, MemoryError) as e:
+                    # The rest of the request can't be framed: answer, then drop the connection
+                    print(f"⚠️ Bad inference request: {str(e)}")
+                    try:
+                        send_json(conn, {"error": f"Bad request: {str(e)}"})
+                    except OSError:
+                        pass
+                    return
+                # Queued together, once all have arrived, so they land in the same batch
+                futures = [Future() for _ in images]
+                for image, future in zip(images, futures):
+                    self.requests.put((image, min_confidence, image_size or None, future))
+                try:
+                    reply = [future.result() for future in futures]
+                except Exception as e:
+                    reply = {"error": str(e)}
+                try:
+                    send_json(conn, reply)
+                except OSError:
+                    return
+
+    def read_request(self, conn):
+        """Returns: (images, min_confidence, image_size) - raises ValueError for a malformed request"""
+        count, min_confidence, image_size = REQUEST.unpack(recv_exact(conn, REQUEST.size))
+        if not 0 < count <= MAX_REQUEST_IMAGES:
+            raise ValueError(f"image count {count} not in 1..{MAX_REQUEST_IMAGES}")
+        images = []
+        for _ in range(count):
+            height, width, channels = SHAPE.unpack(recv_exact(conn, SHAPE.size))
+            limit = settings.UPLOAD_MAX_DIMENSION
+            if not (0 < height <= limit and 0 < width <= limit) or channels not in (1, 3, 4):
+                raise ValueError(f"image shape {height}x{width}x{channels} not accepted")
+            pixels = recv_exact(conn, height * width * channels)
+            shape = (height, width, channels) if channels > 1 else (height, width)
+            images.append(np.frombuffer(pixels, dtype=np.uint8).reshape(shape))
+        return images, min_confidence, image_size
+
+    def next_batch(self):
+        """Block for the first request, then take more until batch_max or batch_wait"""
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_max:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run_batches(self):
+        last_stats = time.monotonic()
+        while True:
+            batch = self.next_batch()
+            started = time.perf_counter()
+
+            # One forward pass per model input size (full frames vs cascade crops)
+            by_size = {}
+            for request in batch:
+                by_size.setdefault(request[2], []).append(request)
+            for image_size, requests in by_size.items():
+                try:
+                    results = self.detector.detect_batch(
+                        [image for image, _, _, _ in requests],
+                        [min_confidence for _, min_confidence, _, _ in requests],
+                        image_size,
+                    )
+                    for (_, _, _, future), boxes in zip(requests, results):
+                        future.set_result(boxes)
+                except Exception as e:
+                    print(f"⚠️ Inference batch of {len(requests)} failed: {str(e)}")
+                    for _, _, _, future in requests:
+                        future.set_exception(e)
+
+            self.busy_seconds += time.perf_counter() - started
+            self.frames += len(batch)
+            self.batches += 1
+            if time.monotonic() - last_stats >= settings.INGEST_STATS_INTERVAL:
+                last_stats = time.monotonic()
+                print(f"📊 Inference: {self.stats()}")
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "batches": self.batches,
+            "average_batch": round(self.frames / self.batches, 2) if self.batches else 0.0,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
@@ -0,0 +1,244 @@
+"""
+Durable ingest queue (SQLite-backed)
+
+upload_image spools the JPEG to disk and inserts an IngestJob row, then
+returns 202 straight away. Background workers (manage.py run_ingest_worker)
+lease jobs, run the detection chain and store the result. A lease that is
+not completed in time (worker crashed / killed) becomes leasable again, so
+any worker process or node sharing the DB can pick it up.
+"""
+import os
+import socket
+import time
+import uuid
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import IngestJob
+from .executor import executor_stats
+
+
+def make_worker_id():
+    """Unique id for one worker process (host:pid:random)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def spool_upload(img_data):
+    """
+    Write uploaded bytes to the spool folder (atomic + fsync)
+    This is the only time the bytes are written: a saved capture is a
+    hard link to this file (see storage.py)
+    Returns: absolute path of the spooled file
+    """
+    spool_dir = settings.INGEST_SPOOL_DIR
+    os.makedirs(spool_dir, exist_ok=True)
+
+    final_path = os.path.join(spool_dir, f"{uuid.uuid4().hex}.jpg")
+    tmp_path = final_path + '.tmp'
+
+    with open(tmp_path, 'wb') as f:
+        f.write(img_data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, final_path)  # Never leave a half-written spool file
+
+    return final_path
+
+
+def enqueue_upload(img_data, filename, camera_id='default'):
+    """Persist an upload and queue it for detection. Returns the IngestJob."""
+    spool_path = spool_upload(img_data)
+    try:
+        return IngestJob.objects.create(filename=filename, camera_id=camera_id, spool_path=spool_path)
+    except Exception:
+        os.remove(spool_path)
+        raise
+
+
+def read_job_data(job):
+    """Read the spooled bytes of a job"""
+    with open(job.spool_path, 'rb') as f:
+        return f.read()
+
+
+def remove_spool(spool_path):
+    try:
+        os.remove(spool_path)
+    except FileNotFoundError:
+        pass
+
+
+def discard_spool(job):
+    """Remove spooled bytes once the job reached a final state"""
+    remove_spool(job.spool_path)
+
+
+def _leasable(now):
+    # Queued and due, or leased by a worker that never finished (crash)
+    return (
+        Q(status='queued', available_at__lte=now) |
+        Q(status='leased', lease_expires_at__lt=now)
+    )
+
+
+def _fail_abandoned(now):
+    """Jobs whose lease expired on the last allowed attempt are given up"""
+    abandoned = IngestJob.objects.filter(
+        status='leased',
+        lease_expires_at__lt=now,
+        attempts__gte=settings.INGEST_MAX_ATTEMPTS,
+    )
+    for job in abandoned:
+        updated = IngestJob.objects.filter(pk=job.pk, status='leased', lease_owner=job.lease_owner).update(
+            status='failed',
+            last_error='Lease expired on last attempt (worker crashed or timed out)',
+            finished_at=now,
+        )
+        if updated:
+            discard_spool(job)
+            print(f"❌ Ingest Job {job.id} abandoned after {job.attempts} attempts")
+
+
+def lease_jobs(worker_id, limit=1, cameras=None, one_per_camera=False):
+    """
+    Lease up to `limit` jobs for this worker.
+    Each lease is a conditional UPDATE, so two workers racing for the same
+    row can never both win it.
+    cameras: only lease jobs from these camera ids (worker sharding)
+    one_per_camera: at most one job per camera in flight (oldest first) -
+    the motion model, dedupe cache and tracks need a camera's frames in order
+    """
+    now = timezone.now()
+    _fail_abandoned(now)
+
+    lease_until = now + datetime.timedelta(seconds=settings.INGEST_LEASE_SECONDS)
+    candidates = IngestJob.objects.filter(_leasable(now))
+    if cameras:
+        candidates = candidates.filter(camera_id__in=cameras)
+    if one_per_camera:
+        # Cameras with a job still running (here or in another worker) wait for it
+        running = IngestJob.objects.filter(status='leased', lease_expires_at__gte=now).values('camera_id')
+        candidates = candidates.exclude(camera_id__in=running)
+    candidate_rows = list(candidates.order_by('id').values_list('id', 'camera_id')[:limit * 4])
+
+    leased, taken_cameras = [], set()
+    for job_id, camera_id in candidate_rows:
+        if one_per_camera and camera_id in taken_cameras:
+            continue
+        updated = IngestJob.objects.filter(_leasable(now), pk=job_id).update(
+            status='leased',
+            lease_owner=worker_id,
+            lease_expires_at=lease_until,
+            attempts=F('attempts') + 1,
+        )
+        if updated:
+            leased.append(IngestJob.objects.get(pk=job_id))
+            taken_cameras.add(camera_id)
+            if len(leased) >= limit:
+                break
+
+    return leased
+
+
+def _owned(job, worker_id):
+    return IngestJob.objects.filter(pk=job.pk, status='leased', lease_owner=worker_id)
+
+
+def complete_job(job, worker_id, persist):
+    """
+    Finish a job: persist(job) runs in the same transaction that marks the job
+    done, and only if this worker still owns the lease. A worker whose lease
+    expired mid-run therefore never saves a duplicate capture.
+    Returns: result dict, or None if the lease was lost
+    """
+    with transaction.atomic():
+        claimed = _owned(job, worker_id).update(status='done', finished_at=timezone.now())
+        if not claimed:
+            return None
+        result = persist(job)
+        IngestJob.objects.filter(pk=job.pk).update(result=result)
+
+    discard_spool(job)
+    return result
+
+
+def fail_job(job, worker_id, error):
+    """Schedule a retry with exponential backoff, or give up after max attempts"""
+    now = timezone.now()
+
+    if job.attempts >= settings.INGEST_MAX_ATTEMPTS:
+        updated = _owned(job, worker_id).update(status='failed', last_error=error, finished_at=now)
+        if updated:
+            discard_spool(job)
+        return
+
+    delay = settings.INGEST_RETRY_BACKOFF * (2 ** (job.attempts - 1))
+    _owned(job, worker_id).update(
+        status='queued',
+        lease_owner=None,
+        lease_expires_at=None,
+        last_error=error,
+        available_at=now + datetime.timedelta(seconds=delay),
+    )
+
+
+def process_job(job, worker_id, analyze, persist):
+    """Run one leased job: analyze (no DB writes) then persist (transactional)"""
+    try:
+        img_data = read_job_data(job)
+        verdict = analyze(job, img_data)
+        result = complete_job(job, worker_id, lambda j: persist(j, img_data, verdict))
+        if result is None:
+            print(f"⚠️ Ingest Job {job.id}: lease lost, result discarded")
+        return result
+    except Exception as e:
+        print(f"❌ Ingest Job {job.id} error (attempt {job.attempts}): {str(e)}")
+        fail_job(job, worker_id, str(e))
+        return None
+
+
+def _process_in_thread(job, worker_id, analyze, persist):
+    try:
+        return process_job(job, worker_id, analyze, persist)
+    finally:
+        connection.close()  # One DB connection per job thread, don't leak them
+
+
+def run_worker(analyze, persist, worker_id=None, once=False, concurrency=1, cameras=None):
+    """
+    Worker loop: lease → analyze → persist, forever (or until queue empty if once=True)
+    With concurrency > 1, that many jobs are in flight at once so the
+    detection pool (see executor.py) has work for every core - one per
+    camera, so each camera's frames are still handled in upload order.
+    cameras: shard by camera - per-camera state (background model, dedupe
+    cache) then lives in exactly one worker process
+    """
+    worker_id = worker_id or make_worker_id()
+    shard = f", cameras {', '.join(cameras)}" if cameras else ""
+    print(f"👷 Ingest worker {worker_id} started (concurrency {concurrency}{shard})")
+
+    last_stats = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as threads:
+        while True:
+            jobs = lease_jobs(worker_id, limit=concurrency, cameras=cameras, one_per_camera=True)
+
+            if not jobs:
+                if once:
+                    return
+                time.sleep(settings.INGEST_POLL_INTERVAL)
+                continue
+
+            if concurrency == 1:
+                for job in jobs:
+                    process_job(job, worker_id, analyze, persist)
+            else:
+                list(threads.map(lambda job: _process_in_thread(job, worker_id, analyze, persist), jobs))
+
+            if time.monotonic() - last_stats >= settings.INGEST_STATS_INTERVAL:
+                last_stats = time.monotonic()
+                print(f"📊 Detection pool: {executor_stats()}")
@@ -0,0 +1,135 @@
+"""
+Streaming JPEG reader / validator
+
+The upload body is read in chunks into a buffer with a hard size cap and
+checked while it streams in: SOI marker first, SOF header for the frame
+size, EOI marker at the end. Truncated frames (ESP32 Wi-Fi drops),
+non-JPEG bodies and oversized frames are rejected before any decode or
+disk write, and memory per in-flight upload never exceeds the cap.
+"""
+from django.conf import settings
+
+SOI = b'\xff\xd8'
+EOI = b'\xff\xd9'
+
+# Start Of Frame markers (baseline, progressive, lossless, arithmetic...)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+SOS = 0xDA
+STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD8))  # TEM, RSTn: no length field
+
+
+class JpegValidationError(ValueError):
+    def __init__(self, reason, message, status=400):
+        super().__init__(message)
+        self.reason = reason
+        self.status = status
+
+
+class JpegStreamValidator:
+    """Feed chunks in, get validated bytes + dimensions out"""
+
+    def __init__(self, max_bytes, max_dimension):
+        self.max_bytes = max_bytes
+        self.max_dimension = max_dimension
+        self.buffer = bytearray()
+        self.width = None
+        self.height = None
+        self._pos = 2  # Header parse position (after SOI)
+
+    def feed(self, chunk):
+        if len(self.buffer) + len(chunk) > self.max_bytes:
+            raise JpegValidationError(
+                'too_large', f"Frame larger than {self.max_bytes} bytes", status=413
+            )
+
+        self.buffer += chunk
+
+        if len(self.buffer) >= 2 and self.buffer[:2] != SOI:
+            raise JpegValidationError('not_jpeg', "Missing JPEG SOI marker")
+
+        if self.width is None:
+            self._parse_header()
+
+    def _parse_header(self):
+        """Walk marker segments until SOF (stops early if data not yet arrived)"""
+        buf = self.buffer
+        pos = self._pos
+
+        while pos + 4 <= len(buf):
+            if buf[pos] != 0xFF:
+                raise JpegValidationError('corrupt', f"Bad marker at byte {pos}")
+            marker = buf[pos + 1]
+
+            if marker == 0xFF:  # Fill byte
+                pos += 1
+                continue
+            if marker in STANDALONE_MARKERS:
+                pos += 2
+                continue
+            if marker == SOS:
+                raise JpegValidationError('corrupt', "Scan data before frame header")
+
+            length = (buf[pos + 2] << 8) | buf[pos + 3]
+            if length < 2:
+                raise JpegValidationError('corrupt', f"Bad segment length at byte {pos}")
+
+            if marker in SOF_MARKERS:
+                if pos + 9 > len(buf):
+                    break  # Wait for the rest of the SOF segment
+                self.height = (buf[pos + 5] << 8) | buf[pos + 6]
+                self.width = (buf[pos + 7] << 8) | buf[pos + 8]
+                if not self.width or not self.height:
+                    raise JpegValidationError('corrupt', "Frame header has zero size")
+                if max(self.width, self.height) > self.max_dimension:
+                    raise JpegValidationError(
+                        'too_large',
+                        f"Frame {self.width}x{self.height} exceeds {self.max_dimension}px",
+                        status=413,
+                    )
+                break
+
+            pos += 2 + length
+
+        self._pos = pos
+
+    def finish(self):
+        """Check the complete frame; returns the JPEG bytes"""
+        if len(self.buffer) < 4 or self.buffer[:2] != SOI:
+            raise JpegValidationError('not_jpeg', "Missing JPEG SOI marker")
+        if self.width is None:
+            raise JpegValidationError('corrupt', "No frame header (SOF) found")
+        if not self.buffer.rstrip(b'\x00').endswith(EOI):
+            raise JpegValidationError('truncated', "Missing JPEG EOI marker (upload cut off)")
+        return bytes(self.buffer)
+
+
+def _validator():
+    return JpegStreamValidator(settings.UPLOAD_MAX_BYTES, settings.UPLOAD_MAX_DIMENSION)
+
+
+def read_jpeg_upload(request):
+    """
+    Stream the request body through the validator
+    Returns: JPEG bytes. Raises JpegValidationError (status 400 / 413).
+    """
+    content_length = request.META.get('CONTENT_LENGTH')
+    if content_length and content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_BYTES:
+        raise JpegValidationError(
+            'too_large', f"Frame larger than {settings.UPLOAD_MAX_BYTES} bytes", status=413
+        )
+
+    validator = _validator()
+    while True:
+        chunk = request.read(settings.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        validator.feed(chunk)
+
+    return validator.finish()
+
+
+def validate_jpeg(data):
+    """Same checks for bytes that are already in memory (batch uploads)"""
+    validator = _validator()
+    validator.feed(data)
+    return validator.finish()
@@ -0,0 +1,318 @@
+"""
+Live monitoring ring buffer (shared memory)
+
+Every camera gets one fixed-size segment file in LIVE_BUFFER_DIR
+(/dev/shm when available, so it never hits a disk) that every gunicorn
+and ingest worker process maps with mmap:
+
+    header | index (LIVE_BUFFER_FRAMES entries) | data (LIVE_BUFFER_BYTES, circular)
+
+Writers (serialized per camera with flock) reserve space by advancing
+write_pos first, copy the JPEG into the data ring, fill the index entry,
+and only then bump frame_seq - that last store publishes the frame.
+Readers never lock: they read frame_seq, copy a frame, then re-check that
+its index entry still has the same seq and that write_pos has not moved
+more than one ring length past the frame's start. A frame that was being
+overwritten is skipped, never returned half-written.
+Memory is bounded by frame count and bytes; old frames are overwritten,
+so there is nothing to clean up.
+
+MJPEG viewers (StreamClient) only ever read the ring, so a slow viewer
+can never hold up an upload: each viewer keeps a small queue of frame
+seqs, and when it falls behind the oldest are dropped.
+"""
+import os
+import mmap
+import time
+import struct
+import threading
+from collections import deque
+
+from django.conf import settings
+
+from .slots import FlockSlots
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server, the thread lock is enough
+    fcntl = None
+
+MAGIC = b'OGLR'
+VERSION = 1
+
+# magic, version, max_frames, capacity, frame_seq, write_pos
+HEADER = struct.Struct('<4sIIQQQ')
+HEADER_SIZE = 64
+FRAME_SEQ_OFFSET = 20
+WRITE_POS_OFFSET = 28
+
+# seq, start (absolute byte position), length, timestamp, filename
+ENTRY = struct.Struct('<QQId64s')
+ENTRY_SIZE = 96
+
+U64 = struct.Struct('<Q')
+
+
+class LiveRing:
+    """One camera's ring buffer, mapped into this process"""
+
+    def __init__(self, path, max_frames, capacity):
+        self.path = path
+        self.max_frames = max_frames
+        self.capacity = capacity
+        self.data_offset = HEADER_SIZE + max_frames * ENTRY_SIZE
+        self._lock = threading.Lock()
+
+        size = self.data_offset + capacity
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self._lock_file(fd)
+            try:
+                if os.fstat(fd).st_size != size or not self._header_matches(fd):
+                    # New segment (or LIVE_BUFFER_* changed): start empty
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, HEADER.pack(MAGIC, VERSION, max_frames, capacity, 0, 0), 0)
+                self.mm = mmap.mmap(fd, size)
+            finally:
+                self._unlock_file(fd)
+        except Exception:
+            os.close(fd)
+            raise
+        self.fd = fd
+
+    def _header_matches(self, fd):
+        magic, version, max_frames, capacity, _, _ = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+        return (magic, version, max_frames, capacity) == (MAGIC, VERSION, self.max_frames, self.capacity)
+
+    def _lock_file(self, fd):
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_file(self, fd):
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _read_u64(self, offset):
+        return U64.unpack_from(self.mm, offset)[0]
+
+    def publish(self, data, filename):
+        """Append one frame. Returns its seq, or None if it is larger than the ring."""
+        length = len(data)
+        if length > self.capacity:
+            return None
+
+        with self._lock:
+            self._lock_file(self.fd)
+            try:
+                seq = self._read_u64(FRAME_SEQ_OFFSET) + 1
+                start = self._read_u64(WRITE_POS_OFFSET)
+                offset = start % self.capacity
+                if offset + length > self.capacity:
+                    start += self.capacity - offset  # Keep frames contiguous: wrap to the beginning
+                    offset = 0
+
+                # 1. Reserve: readers of frames in this range now see them as overwritten
+                U64.pack_into(self.mm, WRITE_POS_OFFSET, start + length)
+                # 2. Data
+                position = self.data_offset + offset
+                self.mm[position:position + length] = data
+                # 3. Index entry
+                ENTRY.pack_into(
+                    self.mm, HEADER_SIZE + (seq % self.max_frames) * ENTRY_SIZE,
+                    seq, start, length, time.time(), filename.encode()[:64],
+                )
+                # 4. Publish
+                U64.pack_into(self.mm, FRAME_SEQ_OFFSET, seq)
+            finally:
+                self._unlock_file(self.fd)
+        return seq
+
+    def _entry(self, seq):
+        return ENTRY.unpack_from(self.mm, HEADER_SIZE + (seq % self.max_frames) * ENTRY_SIZE)
+
+    def _valid(self, seq, start):
+        entry_seq = self._entry(seq)[0]
+        return entry_seq == seq and self._read_u64(WRITE_POS_OFFSET) - start <= self.capacity
+
+    def read(self, seq, with_data=True):
+        """
+        Frame dict for one seq, or None if it was overwritten
+        Lock free: copy first, validate after
+        """
+        entry_seq, start, length, timestamp, filename = self._entry(seq)
+        if entry_seq != seq:
+            return None
+        data = None
+        if with_data:
+            position = self.data_offset + start % self.capacity
+            data = bytes(self.mm[position:position + length])
+        if not self._valid(seq, start):
+            return None
+        return {
+            "seq": seq,
+            "filename": filename.rstrip(b'\0').decode(errors='replace'),
+            "timestamp": timestamp,
+            "size": length,
+            "data": data,
+        }
+
+    def latest_seq(self):
+        return self._read_u64(FRAME_SEQ_OFFSET)
+
+    def latest(self, count=1, with_data=True):
+        """Up to `count` newest frames still in the ring, newest first"""
+        newest = self.latest_seq()
+        frames = []
+        for seq in range(newest, max(newest - min(count, self.max_frames), 0), -1):
+            frame = self.read(seq, with_data)
+            if frame is None:
+                break  # Older frames are overwritten too
+            frames.append(frame)
+        return frames
+
+
+BOUNDARY = b'frame'
+
+
+def multipart_part(frame):
+    """One multipart/x-mixed-replace part: the stored JPEG bytes as they are"""
+    header = (
+        b'--' + BOUNDARY + b'\r\n'
+        b'Content-Type: image/jpeg\r\n'
+        b'Content-Length: %d\r\n'
+        b'X-Frame-Seq: %d\r\n\r\n' % (frame["size"], frame["seq"])
+    )
+    return header + frame["data"] + b'\r\n'
+
+
+class StreamClient:
+    """
+    One viewer's bounded send queue (frame seqs, not bytes)
+    Bytes are copied from the ring only when a frame is actually sent;
+    frames overwritten before that are skipped
+    """
+
+    def __init__(self, ring, queue_size):
+        self.ring = ring
+        self.queue = deque(maxlen=queue_size)
+        self.last_seq = max(ring.latest_seq() - 1, 0)  # Start with the newest frame
+        self.sent = 0
+        self.dropped = 0
+
+    def poll(self):
+        """Queue frames published since the last poll, dropping the oldest when full"""
+        newest = self.ring.latest_seq()
+        if newest <= self.last_seq:
+            return
+        first = max(self.last_seq + 1, newest - self.queue.maxlen + 1)
+        self.dropped += first - self.last_seq - 1  # Too far behind to ever be sent
+        for seq in range(first, newest + 1):
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(seq)
+        self.last_seq = newest
+
+    def next_frame(self):
+        while self.queue:
+            frame = self.ring.read(self.queue.popleft())
+            if frame is not None:
+                self.sent += 1
+                return frame
+            self.dropped += 1  # Overwritten in the ring meanwhile
+        return None
+
+
+def mjpeg_parts(client, camera_id, max_seconds, poll_interval, keepalive):
+    """
+    Generator of multipart parts for one viewer, ends after max_seconds
+    The last frame is re-sent every `keepalive` seconds while the camera is
+    idle, so a viewer that went away is noticed (the write fails) and
+    the server worker is freed
+    """
+    started = last_sent = time.monotonic()
+    last_frame = None
+    try:
+        while time.monotonic() - started < max_seconds:
+            client.poll()
+            frame = client.next_frame()
+            if frame is None and last_frame is not None and time.monotonic() - last_sent >= keepalive:
+                frame = last_frame
+            if frame is None:
+                time.sleep(poll_interval)
+                continue
+            yield multipart_part(frame)
+            last_frame, last_sent = frame, time.monotonic()
+    finally:
+        print(f"📺 Live stream of '{camera_id}' closed: {client.sent} frames sent, {client.dropped} dropped")
+
+
+class MjpegStream:
+    """
+    Response body of one viewer (StreamingHttpResponse calls close() when
+    the response ends, even if it was never iterated) - frees the viewer slot
+    """
+
+    def __init__(self, ring, camera_id, slot, max_seconds, poll_interval, keepalive, queue_size):
+        self.client = StreamClient(ring, queue_size)
+        self._parts = mjpeg_parts(self.client, camera_id, max_seconds, poll_interval, keepalive)
+        self._slot = slot
+        self._closed = False
+
+    def __iter__(self):
+        return self._parts
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._parts.close()
+            release_stream(self._slot)
+
+
+_stream_slots = None
+
+
+def stream_slots():
+    """Viewer slots shared by every worker on the host (flock files next to the rings)"""
+    global _stream_slots
+    if _stream_slots is None or _stream_slots.count != settings.LIVE_STREAM_MAX_CLIENTS:
+        _stream_slots = FlockSlots(buffer_dir(), 'stream', settings.LIVE_STREAM_MAX_CLIENTS)
+    return _stream_slots
+
+
+def acquire_stream():
+    """Claim a viewer slot. Returns a handle for release_stream(), or None if all are taken."""
+    return stream_slots().acquire()
+
+
+def release_stream(slot):
+    stream_slots().release(slot)
+
+
+def buffer_dir():
+    return settings.LIVE_BUFFER_DIR
+
+
+_rings = {}
+_rings_lock = threading.Lock()
+
+
+def get_ring(camera_id):
+    """This process's mapping of a camera's ring (opened once, then cached)"""
+    ring = _rings.get(camera_id)
+    if ring is None:
+        with _rings_lock:
+            ring = _rings.get(camera_id)
+            if ring is None:
+                os.makedirs(buffer_dir(), exist_ok=True)
+                ring = LiveRing(
+                    os.path.join(buffer_dir(), f"{camera_id}.ring"),
+                    settings.LIVE_BUFFER_FRAMES,
+                    settings.LIVE_BUFFER_BYTES,
+                )
+                _rings[camera_id] = ring
+    return ring
+
+
+def ring_exists(camera_id):
+    return camera_id in _rings or os.path.exists(os.path.join(buffer_dir(), f"{camera_id}.ring"))
@@ -0,0 +1,250 @@
+"""
+Background maintenance scheduler
+
+Periodic housekeeping runs here instead of on the upload path. Every
+process that starts the scheduler (run_ingest_worker, every gunicorn
+worker - inline mode has no ingest worker - or the standalone
+run_maintenance command) competes for an flock on MAINTENANCE_LOCK_FILE;
+the holder is the leader and the only process that runs jobs. If the
+leader dies the kernel drops its lock and another process takes over on
+its next tick.
+
+Directories are walked with os.scandir (one directory entry at a time,
+no glob list) and handled in batches of MAINTENANCE_BATCH_SIZE, so a
+large backlog never means one huge query or one huge list in memory.
+Each run's duration and counts are logged and written to
+MAINTENANCE_STATUS_FILE (served by /system/maintenance/).
+"""
+import os
+import json
+import time
+import datetime
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process, it is always the leader
+    fcntl = None
+
+
+def scan_batches(directory, match, older_than, batch_size):
+    """
+    Yield lists of up to batch_size paths in directory (and its subfolders)
+    whose name passes match(name) and that were last modified more than
+    older_than seconds ago
+    """
+    cutoff = time.time() - older_than
+    batch = []
+    pending = [directory]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif match(entry.name) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                        batch.append(entry.path)
+                except FileNotFoundError:
+                    continue  # Removed while we were looking
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def remove_files(paths):
+    removed = 0
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+# ============================================
+# JOBS (each returns a dict of counts for the run report)
+# ============================================
+
+def clean_spool():
+    """
+    Spool files no queued / processing job refers to (enqueue crashed between
+    write and INSERT, or a job row was deleted) + half-written .tmp files
+    """
+    from .models import IngestJob
+    age, batch_size = settings.MAINTENANCE_FILE_MAX_AGE, settings.MAINTENANCE_BATCH_SIZE
+    scanned = removed = 0
+
+    for batch in scan_batches(settings.INGEST_SPOOL_DIR, lambda name: name.endswith('.jpg'), age, batch_size):
+        scanned += len(batch)
+        in_use = set(
+            IngestJob.objects.filter(spool_path__in=batch, status__in=['queued', 'leased'])
+            .values_list('spool_path', flat=True)
+        )
+        removed += remove_files(path for path in batch if path not in in_use)
+
+    for batch in scan_batches(settings.INGEST_SPOOL_DIR, lambda name: name.endswith('.tmp'), age, batch_size):
+        scanned += len(batch)
+        removed += remove_files(batch)
+
+    return {"scanned": scanned, "removed": removed}
+
+
+def clean_capture_temp_files():
+    """Temp files left in media/captures by a crash during save (see storage.py)"""
+    scanned = removed = 0
+    for batch in scan_batches(
+        os.path.join(settings.MEDIA_ROOT, 'captures'), lambda name: name.endswith('.tmp'),
+        settings.MAINTENANCE_FILE_MAX_AGE, settings.MAINTENANCE_BATCH_SIZE,
+    ):
+        scanned += len(batch)
+        removed += remove_files(batch)
+    return {"scanned": scanned, "removed": removed}
+
+
+def prune_ingest_jobs():
+    """Delete finished ingest jobs older than INGEST_JOB_RETENTION_DAYS (batch of ids per DELETE)"""
+    from .models import IngestJob
+    cutoff = timezone.now() - datetime.timedelta(days=settings.INGEST_JOB_RETENTION_DAYS)
+    finished = IngestJob.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff)
+    removed = 0
+    while True:
+        ids = list(finished.values_list('id', flat=True)[:settings.MAINTENANCE_BATCH_SIZE])
+        if not ids:
+            return {"removed": removed}
+        removed += IngestJob.objects.filter(id__in=ids).delete()[0]
+
+
+def clean_legacy_live_folder():
+    """
+    JPEGs of the old file-based live view (media/live_monitoring, replaced by
+    the ring buffer in live.py): removed with the folder, then a no-op
+    """
+    folder = os.path.join(settings.MEDIA_ROOT, 'live_monitoring')
+    if not os.path.isdir(folder):
+        return {"removed": 0}
+    removed = 0
+    for batch in scan_batches(folder, lambda name: True, 0, settings.MAINTENANCE_BATCH_SIZE):
+        removed += remove_files(batch)
+    for directory, _, _ in os.walk(folder, topdown=False):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass  # Not empty (written to meanwhile): next run
+    return {"removed": removed}
+
+
+JOBS = {
+    'clean_spool': clean_spool,
+    'clean_capture_temp_files': clean_capture_temp_files,
+    'prune_ingest_jobs': prune_ingest_jobs,
+    'clean_legacy_live_folder': clean_legacy_live_folder,
+}
+
+
+class MaintenanceScheduler:
+    """Runs JOBS on their MAINTENANCE_INTERVALS while this process holds the leader lock"""
+
+    def __init__(self):
+        self.lock_fd = None
+        self.last_run = {}   # Job name → monotonic time of its last run
+        self.reports = {}    # Job name → last run report
+
+    def try_lead(self):
+        """True if this process is (or just became) the leader"""
+        if self.lock_fd is not None:
+            return True
+        path = settings.MAINTENANCE_LOCK_FILE
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self.lock_fd = fd
+        print(f"🧹 Maintenance leader: pid {os.getpid()}")
+        return True
+
+    def run_job(self, name):
+        started = time.monotonic()
+        try:
+            report = dict(JOBS[name](), ok=True)
+        except Exception as e:
+            report = {"ok": False, "error": str(e)}
+        finally:
+            connection.close()  # Scheduler thread: don't keep a DB connection open between runs
+        report["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        report["finished_at"] = timezone.now().isoformat()
+        self.reports[name] = report
+
+        if report["ok"]:
+            counts = ", ".join(f"{k} {v}" for k, v in report.items() if k not in ("ok", "duration_ms", "finished_at"))
+            print(f"🧹 {name}: {counts} in {report['duration_ms']} ms")
+        else:
+            print(f"⚠️ Maintenance job {name} failed after {report['duration_ms']} ms: {report['error']}")
+        return report
+
+    def tick(self, force=False):
+        """Run every job that is due (force=True: all of them). Returns names run."""
+        if not self.try_lead():
+            return []
+        ran = []
+        for name, interval in settings.MAINTENANCE_INTERVALS.items():
+            last = self.last_run.get(name)
+            if force or last is None or time.monotonic() - last >= interval:
+                self.run_job(name)
+                self.last_run[name] = time.monotonic()
+                ran.append(name)
+        if ran:
+            self.write_status()
+        return ran
+
+    def write_status(self):
+        path = settings.MAINTENANCE_STATUS_FILE
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"leader_pid": os.getpid(), "jobs": self.reports}, f)
+        os.replace(tmp_path, path)
+
+    def run_forever(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠️ Maintenance scheduler error: {str(e)}")
+            time.sleep(settings.MAINTENANCE_TICK_SECONDS)
+
+
+_scheduler_thread = None
+
+
+def start_scheduler():
+    """Run the scheduler in a daemon thread of this process (once)"""
+    global _scheduler_thread
+    if not settings.MAINTENANCE_ENABLED or _scheduler_thread is not None:
+        return
+    _scheduler_thread = threading.Thread(
+        target=MaintenanceScheduler().run_forever, name='maintenance', daemon=True
+    )
+    _scheduler_thread.start()
+
+
+def read_status():
+    """Last run report written by the leader, or None"""
+    try:
+        with open(settings.MAINTENANCE_STATUS_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
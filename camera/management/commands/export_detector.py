@@ -0,0 +1,120 @@
+import os
+import shutil
+
+import cv2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from camera.detectors import letterbox, to_input
+from camera.models import BoatCapture
+
+try:
+    from onnxruntime.quantization import CalibrationDataReader
+except ImportError:  # Only needed for --int8
+    CalibrationDataReader = object
+
+
+class CaptureCalibrationReader(CalibrationDataReader):
+    """Feeds stored capture images to ONNX Runtime's INT8 calibration, one at a time"""
+
+    def __init__(self, input_name, paths, image_size):
+        self.input_name = input_name
+        self.paths = iter(paths)
+        self.image_size = image_size
+
+    def get_next(self):
+        for path in self.paths:
+            image = cv2.imread(path)
+            if image is not None:
+                padded, _, _ = letterbox(image, self.image_size)
+                return {self.input_name: to_input([padded])}
+        return None
+
+
+def copy_metadata(source_path, target_path):
+    """Keep the class names (ONNX metadata) on the quantized model"""
+    import onnx
+    source, target = onnx.load(source_path), onnx.load(target_path)
+    del target.metadata_props[:]
+    target.metadata_props.extend(source.metadata_props)
+    onnx.save(target, target_path)
+
+
+class Command(BaseCommand):
+    help = "Export the YOLO .pt model to ONNX for ML_BACKEND = 'onnx' (optionally INT8, calibrated on stored captures)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weights', default=None, help="PyTorch model (default: ML_MODEL_WEIGHTS)")
+        parser.add_argument('--output', default=None, help="ONNX file (default: ML_ONNX_MODEL)")
+        parser.add_argument('--imgsz', type=int, default=None, help="Input size (default: ML_IMAGE_SIZE)")
+        parser.add_argument('--int8', action='store_true', help="Also write a static INT8 quantized model (*.int8.onnx)")
+        parser.add_argument(
+            '--calibration-images', type=int, default=200,
+            help="Newest stored captures used to calibrate INT8 activation ranges"
+        )
+
+    def handle(self, *args, **options):
+        weights = options['weights'] or settings.ML_MODEL_WEIGHTS
+        output = options['output'] or settings.ML_ONNX_MODEL
+        image_size = options['imgsz'] or settings.ML_IMAGE_SIZE
+
+        try:
+            from ultralytics import YOLO
+        except ImportError:
+            raise CommandError("Exporting needs ultralytics (pip install ultralytics onnx)")
+
+        # dynamic=True: batch dimension left open for the inference daemon's micro-batches
+        exported = YOLO(weights).export(format='onnx', imgsz=image_size, dynamic=True, simplify=True)
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        shutil.move(exported, output)
+        self.stdout.write(f"✅ {weights} → {output} ({os.path.getsize(output) / 1e6:.1f} MB)")
+
+        if options['int8']:
+            output = self.quantize(output, image_size, options['calibration_images'])
+
+        self.stdout.write(f"Use it with: ML_BACKEND = 'onnx', ML_ONNX_MODEL = '{output}'")
+
+    def quantize(self, model_path, image_size, count):
+        try:
+            import onnx
+            from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+            from onnxruntime.quantization.shape_inference import quant_pre_process
+        except ImportError:
+            raise CommandError("INT8 quantization needs onnx + onnxruntime")
+
+        paths = []
+        for capture in BoatCapture.objects.order_by('-captured_at').only('image')[:count]:
+            if capture.image and os.path.exists(capture.image.path):
+                paths.append(capture.image.path)
+        if not paths:
+            raise CommandError("No stored captures to calibrate on - collect some frames first")
+        if len(paths) < 50:
+            self.stdout.write(f"⚠️ Only {len(paths)} calibration images - INT8 accuracy may suffer")
+
+        base = model_path[:-len('.onnx')] if model_path.endswith('.onnx') else model_path
+        prepared_path, int8_path = f"{base}.prep.onnx", f"{base}.int8.onnx"
+        quant_pre_process(model_path, prepared_path)
+
+        model = onnx.load(prepared_path)
+        reader = CaptureCalibrationReader(model.graph.input[0].name, paths, image_size)
+        # The Detect head (last module, model.22 in YOLOv8) stays FP32: box regression is sensitive to INT8
+        head = max((node.name.split('/')[1] for node in model.graph.node if node.name.startswith('/model.')),
+                   key=lambda name: int(name.split('.')[1]), default=None)
+        excluded = [node.name for node in model.graph.node if head and node.name.startswith(f'/{head}/')]
+
+        quantize_static(
+            prepared_path, int8_path, reader,
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            nodes_to_exclude=excluded,
+        )
+        copy_metadata(model_path, int8_path)
+        os.remove(prepared_path)
+
+        self.stdout.write(
+            f"✅ INT8 → {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB, "
+            f"calibrated on {len(paths)} captures, {len(excluded)} head nodes kept FP32)"
+        )
+        return int8_path
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from camera.detectors import get_detector, ml_available
+from camera.inference import InferenceServer
+
+
+class Command(BaseCommand):
+    help = "Serve YOLO inference to every detection process on this host (INFERENCE_MODE = 'daemon')"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=None, help="Unix socket path (default: INFERENCE_SOCKET)")
+        parser.add_argument('--batch-max', type=int, default=None, help="Frames per forward pass")
+        parser.add_argument('--batch-wait-ms', type=float, default=None, help="Max wait for a batch to fill")
+
+    def handle(self, *args, **options):
+        if not ml_available():
+            raise CommandError(f"ML backend '{settings.ML_BACKEND}' is not installed (ultralytics / onnxruntime)")
+
+        detector = get_detector()
+        detector.warm()
+
+        InferenceServer(
+            detector,
+            path=options['socket'] or settings.INFERENCE_SOCKET,
+            batch_max=options['batch_max'] or settings.INFERENCE_BATCH_MAX,
+            batch_wait=(options['batch_wait_ms'] if options['batch_wait_ms'] is not None else settings.INFERENCE_BATCH_WAIT_MS) / 1000,
+        ).serve_forever()
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from camera.executor import get_executor
+from camera.ingest import run_worker
+from camera.maintenance import start_scheduler
+from camera.views import analyze_upload, save_upload_result
+
+
+class Command(BaseCommand):
+    help = "Drain the ingest queue: lease uploaded frames and run the detection chain"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+        parser.add_argument('--worker-id', default=None, help="Override the generated worker id")
+        parser.add_argument(
+            '--concurrency', type=int, default=None,
+            help="Jobs in flight at once (default: DETECTION_POOL_SIZE)"
+        )
+        parser.add_argument(
+            '--camera', action='append', dest='cameras', default=None,
+            help="Only process uploads from this camera id (repeatable, default: all cameras)"
+        )
+
+    def handle(self, *args, **options):
+        if not options['once']:
+            start_scheduler()  # Periodic cleanup (only the leader process runs it)
+        get_executor().warm()  # Pool processes + YOLO model ready before the first job
+
+        run_worker(
+            analyze=lambda job, img_data: analyze_upload(img_data, job.camera_id),
+            # A saved capture is a hard link to the spool file, never rewritten
+            persist=lambda job, img_data, verdict: save_upload_result(
+                img_data, job.filename, verdict, job.camera_id, job.spool_path
+            ),
+            worker_id=options['worker_id'],
+            once=options['once'],
+            concurrency=options['concurrency'] or max(settings.DETECTION_POOL_SIZE, 1),
+            cameras=options['cameras'],
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from camera.maintenance import MaintenanceScheduler
+
+
+class Command(BaseCommand):
+    help = "Run periodic maintenance (spool / temp file cleanup, old ingest jobs) as the leader process"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run every job once and exit")
+
+    def handle(self, *args, **options):
+        scheduler = MaintenanceScheduler()
+        if options['once']:
+            if not scheduler.tick(force=True):
+                self.stdout.write("Another process holds the maintenance lock - nothing run")
+            return
+        scheduler.run_forever()
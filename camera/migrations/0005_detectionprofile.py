@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0004_ingestjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DetectionProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('is_active', models.BooleanField(default=False)),
+                ('color_ranges', models.JSONField()),
+                ('min_threshold', models.FloatField(default=5.0)),
+                ('max_threshold', models.FloatField(default=60.0)),
+                ('version', models.PositiveIntegerField(default=1, editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Detection Profile',
+                'verbose_name_plural': 'Detection Profiles',
+            },
+        ),
+    ]
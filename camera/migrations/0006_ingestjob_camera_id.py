@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0005_detectionprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestjob',
+            name='camera_id',
+            field=models.CharField(default='default', max_length=50),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0006_ingestjob_camera_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boatcapture',
+            name='blobs',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
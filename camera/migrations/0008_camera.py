@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0007_boatcapture_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Camera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('camera_id', models.SlugField(unique=True)),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('token', models.CharField(blank=True, max_length=64)),
+                ('is_active', models.BooleanField(default=True)),
+                ('location_name', models.CharField(blank=True, max_length=100)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('installation_height', models.FloatField(blank=True, null=True)),
+                ('roi_polygons', models.JSONField(blank=True, default=list)),
+                ('capture_interval', models.PositiveIntegerField(default=8)),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('detection_profile', models.ForeignKey(blank=True, help_text='Empty = the globally active profile', null=True, on_delete=django.db.models.deletion.SET_NULL, to='camera.detectionprofile')),
+            ],
+            options={
+                'ordering': ['camera_id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='boatcapture',
+            name='camera',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='captures', to='camera.camera'),
+        ),
+        migrations.AddField(
+            model_name='capturerequest',
+            name='camera',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='capture_requests', to='camera.camera'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:31
+
+import camera.storage
+from django.db import migrations, models
+
+
+def hash_existing_images(apps, schema_editor):
+    """Fill image_sha256 for captures saved before content addressing (files stay where they are)"""
+    import hashlib
+    BoatCapture = apps.get_model('camera', 'BoatCapture')
+    for capture in BoatCapture.objects.filter(image_sha256='').exclude(image=''):
+        try:
+            with capture.image.open('rb') as f:
+                capture.image_sha256 = hashlib.sha256(f.read()).hexdigest()
+        except (FileNotFoundError, OSError):
+            continue
+        capture.save(update_fields=['image_sha256'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0008_camera'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boatcapture',
+            name='image_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='boatcapture',
+            name='image',
+            field=models.ImageField(storage=camera.storage.capture_storage, upload_to='captures/'),
+        ),
+        migrations.RunPython(hash_existing_images, migrations.RunPython.noop),
+    ]
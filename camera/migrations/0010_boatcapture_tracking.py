@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0009_boatcapture_image_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boatcapture',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='boatcapture',
+            name='track_frames',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 21:04
+
+from django.conf import settings
+from django.db import migrations
+
+
+def create_default_camera(apps, schema_editor):
+    """
+    Stock firmware sends no X-Camera-Id, so it uploads as 'default'. Create
+    that camera (no token, location from CAMERA_GPS_LOCATION) so existing
+    devices keep working now that unknown cameras are refused.
+    """
+    Camera = apps.get_model('camera', 'Camera')
+    location = settings.CAMERA_GPS_LOCATION
+    Camera.objects.get_or_create(
+        camera_id='default',
+        defaults={
+            'name': 'Default camera',
+            'location_name': location.get('location_name', ''),
+            'latitude': location.get('latitude'),
+            'longitude': location.get('longitude'),
+            'installation_height': location.get('installation_height'),
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0010_boatcapture_tracking'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_default_camera, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,56 @@
 from django.db import models
+from django.utils import timezone
+
+from .storage import capture_storage
+
+
+# Camera - One ESP32-CAM and its pipeline configuration
+class Camera(models.Model):
+    camera_id = models.SlugField(max_length=50, unique=True)  # Sent by the ESP32 as X-Camera-Id
+    name = models.CharField(max_length=100, blank=True)
+    token = models.CharField(max_length=64, blank=True)  # X-Camera-Token (empty = no check)
+    is_active = models.BooleanField(default=True)        # Inactive cameras are refused
+
+    # Location
+    location_name = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    installation_height = models.FloatField(null=True, blank=True)  # meters
+
+    # Pipeline configuration
+    # ROI: list of polygons, points as [x, y] fractions of width/height (0-1), empty = whole frame
+    # e.g. [[[0.0, 0.35], [1.0, 0.35], [1.0, 1.0], [0.0, 1.0]]] → lower 65% of the frame
+    roi_polygons = models.JSONField(default=list, blank=True)
+    detection_profile = models.ForeignKey(
+        'DetectionProfile', on_delete=models.SET_NULL, null=True, blank=True,
+        help_text="Empty = the globally active profile"
+    )
+    capture_interval = models.PositiveIntegerField(default=8)  # Seconds between ESP32 captures
+
+    last_seen_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['camera_id']
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .roi import normalize_polygons
+        try:
+            normalize_polygons(self.roi_polygons)
+        except Exception as e:
+            raise ValidationError({'roi_polygons': f"Invalid ROI polygons: {e}"})
+
+    def __str__(self):
+        return f"{self.camera_id} - {self.name or self.location_name or 'Camera'}"
 
 
 # Capture Request - Manual trigger from app
 class CaptureRequest(models.Model):
+    camera = models.ForeignKey(
+        Camera, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='capture_requests'
+    )  # Empty = whichever camera polls first
     requested_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False)
 
@@ -13,6 +61,81 @@ class CaptureRequest(models.Model):
         return f"Capture Request {self.id} - {'Processed' if self.processed else 'Pending'}"
 
 
+# Ingest Job - Durable upload queue (ESP32 gets 202, workers run detection)
+class IngestJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),           # Waiting for a worker
+        ('leased', 'Processing'),       # Leased by a worker (lease can expire)
+        ('done', 'Done'),               # Detection finished, result stored
+        ('failed', 'Failed'),           # Gave up after max attempts
+    ]
+
+    filename = models.CharField(max_length=255)
+    camera_id = models.CharField(max_length=50, default='default')  # Which camera sent it
+    spool_path = models.CharField(max_length=500)  # Uploaded bytes on disk
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+
+    # Leasing / retry
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # Retry backoff
+    lease_owner = models.CharField(max_length=100, blank=True, null=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+
+    # Outcome
+    result = models.JSONField(blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['id']  # FIFO
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['status', 'lease_expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Ingest Job {self.id} - {self.status} (attempt {self.attempts})"
+
+
+# Detection Profile - Color ranges + thresholds, editable in admin without restart
+class DetectionProfile(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    is_active = models.BooleanField(default=False)  # Only one profile is active at a time
+
+    # Same format as settings.COLOR_RANGES, e.g.
+    # {"RED": [{"lower": [0, 100, 100], "upper": [10, 255, 255]}]}
+    color_ranges = models.JSONField()
+    min_threshold = models.FloatField(default=5.0)   # Minimum % of colored pixels
+    max_threshold = models.FloatField(default=60.0)  # Maximum % of colored pixels
+
+    version = models.PositiveIntegerField(default=1, editable=False)  # Bumped on every save
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Detection Profile'
+        verbose_name_plural = 'Detection Profiles'
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .profiles import compile_profile
+        try:
+            compile_profile(self.name, self.version, self.color_ranges, self.min_threshold, self.max_threshold)
+        except Exception as e:
+            raise ValidationError({'color_ranges': f"Invalid color ranges: {e}"})
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            self.version += 1
+        super().save(*args, **kwargs)
+        if self.is_active:
+            DetectionProfile.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}{' (active)' if self.is_active else ''}"
+
+
 # BoatCapture Model - Har boat ki photo aur uska status
 class BoatCapture(models.Model):
     # Status choices for Coast Guard action
@@ -23,14 +146,26 @@ class BoatCapture(models.Model):
     ]
 
     # Image and capture info
-    image = models.ImageField(upload_to='captures/')
+    image = models.ImageField(upload_to='captures/', storage=capture_storage)  # Stored by SHA-256 (storage.py)
+    image_sha256 = models.CharField(max_length=64, blank=True, db_index=True)  # Same bytes → same hash
     captured_at = models.DateTimeField(auto_now_add=True)
+    camera = models.ForeignKey(
+        Camera, on_delete=models.SET_NULL, null=True, blank=True, related_name='captures'
+    )  # Kaun se camera ne bheja
 
     # QR Code validation
     qr_detected = models.BooleanField(default=False)  # QR mila ya nahi
     qr_data = models.TextField(blank=True, null=True)  # QR mein kya likha hai
     qr_valid = models.BooleanField(default=False)     # QR valid hai ya nahi
 
+    # Detected objects: [{"color", "area", "percentage", "bbox": [x, y, w, h], "centroid": [x, y]}]
+    # In full-resolution image pixels, largest first (see camera/blobs.py)
+    blobs = models.JSONField(default=list, blank=True)
+
+    # Vessel tracking: one capture per track, later frames of the same boat only update it
+    track_frames = models.PositiveIntegerField(default=1)       # Frames this boat was seen in
+    last_seen_at = models.DateTimeField(blank=True, null=True)  # Latest frame of the track
+
     # Coast Guard Review
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     reviewed_at = models.DateTimeField(blank=True, null=True)
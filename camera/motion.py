@@ -0,0 +1,109 @@
+"""
+Motion gating (per camera background model)
+
+Each camera keeps a running background: an exponential moving average of
+its downscaled, blurred frames. A new frame is compared against it;
+pixels where any channel differs by more than MOTION_PIXEL_THRESHOLD
+form the foreground mask. Color (not gray) differences are used because
+a red hull on water can have almost the same brightness as the water.
+Frames with too little foreground never reach color / ML detection, and
+the (dilated) mask is handed to the color stage so static red objects
+(buoys, roofs, painted hulls) stop counting.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .roi import roi_area, roi_mask
+
+try:
+    import cv2
+    import numpy as np
+    CV_AVAILABLE = True
+except ImportError:
+    CV_AVAILABLE = False
+
+
+class BackgroundModel:
+    def __init__(self, learning_rate, pixel_threshold):
+        self.learning_rate = learning_rate
+        self.pixel_threshold = pixel_threshold
+        self.background = None  # float32 EMA of small BGR frames
+        self.lock = threading.Lock()
+
+    def apply(self, small, roi=None):
+        """
+        Compare a small blurred BGR frame against the background, then learn it
+        Changes outside the ROI (waves at the horizon, shore traffic) are ignored
+        Returns: (foreground_mask, foreground_percentage of the ROI)
+        The first frame (or a resolution change) counts as all foreground
+        """
+        with self.lock:
+            if self.background is None or self.background.shape != small.shape:
+                self.background = small.astype(np.float32)
+                return np.full(small.shape[:2], 255, np.uint8), 100.0
+
+            diff = cv2.absdiff(small, cv2.convertScaleAbs(self.background)).max(axis=2)
+            _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+            cv2.accumulateWeighted(small, self.background, self.learning_rate)
+
+        area = mask.size
+        if roi:
+            height, width = mask.shape
+            mask = cv2.bitwise_and(mask, roi_mask(roi, height, width))
+            area = roi_area(roi, height, width) or 1
+
+        percentage = cv2.countNonZero(mask) / area * 100
+        # Grow the mask so the whole moving object counts, not just its changed edges
+        mask = cv2.dilate(mask, np.ones((3, 3), np.uint8), iterations=settings.MOTION_DILATE_ITERATIONS)
+        return mask, percentage
+
+
+class MotionGate:
+    """Background models for every camera (least recently used dropped first)"""
+
+    def __init__(self, max_cameras):
+        self.max_cameras = max_cameras
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def model_for(self, camera_id):
+        with self._lock:
+            model = self._models.get(camera_id)
+            if model is None:
+                model = BackgroundModel(settings.MOTION_LEARNING_RATE, settings.MOTION_PIXEL_THRESHOLD)
+                self._models[camera_id] = model
+                while len(self._models) > self.max_cameras:
+                    self._models.popitem(last=False)
+            self._models.move_to_end(camera_id)
+            return model
+
+    def apply(self, frame, camera_id, roi=None):
+        """
+        Returns: (foreground_mask, foreground_percentage), or (None, 100.0)
+        if the frame can't be decoded (let detection decide)
+        """
+        small = frame.reduced(settings.MOTION_SCALE)
+        if small is None:
+            return None, 100.0
+        return self.model_for(camera_id).apply(cv2.GaussianBlur(small, (5, 5), 0), roi)
+
+
+_gate = None
+
+
+def get_motion_gate():
+    global _gate
+    if _gate is None:
+        _gate = MotionGate(settings.MOTION_MAX_CAMERAS)
+    return _gate
+
+
+def resize_mask(mask, shape):
+    """Scale a foreground mask to (height, width) of the processing resolution"""
+    if mask is None or mask.shape[:2] == tuple(shape[:2]):
+        return mask
+    return cv2.resize(mask, (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST)
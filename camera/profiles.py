@@ -0,0 +1,133 @@
+"""
+Detection profiles
+
+A profile (color ranges + thresholds) is compiled once into an immutable
+CompiledProfile that holds the ready-to-use LUT classifier, so requests
+never parse settings or build numpy bounds. The active profile lives in
+the DB (admin → Detection Profiles); each process re-checks its version
+every PROFILE_RELOAD_INTERVAL seconds and swaps to the new compiled
+profile without a restart. Without an active profile, settings.COLOR_RANGES
+and the COLOR_DETECTION_*_THRESHOLD values are used.
+"""
+import time
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .color_lut import ColorClassifier
+from .models import DetectionProfile
+
+
+@dataclass(frozen=True)
+class CompiledProfile:
+    name: str
+    version: int
+    min_threshold: float
+    max_threshold: float
+    classifier: ColorClassifier
+
+    @property
+    def colors(self):
+        return self.classifier.colors
+
+
+def compile_profile(name, version, color_ranges, min_threshold, max_threshold):
+    """Validate + compile a profile (raises ValueError on bad input)"""
+    if not color_ranges:
+        raise ValueError("At least one color is required")
+    for color_name, ranges in color_ranges.items():
+        for color_range in ranges:
+            for bound in ('lower', 'upper'):
+                values = color_range[bound]
+                if len(values) != 3 or not all(0 <= int(v) <= 255 for v in values):
+                    raise ValueError(f"{color_name} {bound} must be 3 values in 0-255")
+    if not 0 <= min_threshold <= max_threshold <= 100:
+        raise ValueError("Thresholds must satisfy 0 <= min <= max <= 100")
+
+    return CompiledProfile(
+        name=name,
+        version=version,
+        min_threshold=float(min_threshold),
+        max_threshold=float(max_threshold),
+        classifier=ColorClassifier(color_ranges),
+    )
+
+
+def settings_profile():
+    """Fallback profile built from settings.py (compiled once per process)"""
+    global _settings_profile
+    if _settings_profile is None:
+        _settings_profile = compile_profile(
+            'settings', 0,
+            settings.COLOR_RANGES,
+            settings.COLOR_DETECTION_MIN_THRESHOLD,
+            settings.COLOR_DETECTION_MAX_THRESHOLD,
+        )
+    return _settings_profile
+
+
+_settings_profile = None
+
+
+class ProfileStore:
+    """Per-process cache of the active compiled profile"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profile = None
+        self._key = None          # (id, version, updated_at) of the loaded DB profile
+        self._bad_key = None      # Same, for the last row that failed to compile
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        self._checked_at = 0.0
+
+    def get_active(self):
+        if self._profile is None or time.monotonic() - self._checked_at >= settings.PROFILE_RELOAD_INTERVAL:
+            with self._lock:
+                self._refresh()
+        return self._profile
+
+    def _refresh(self):
+        self._checked_at = time.monotonic()
+
+        # Cheap version probe; only recompile when the row changed
+        key = DetectionProfile.objects.filter(is_active=True).values_list('id', 'version', 'updated_at').first()
+        if key == self._key and self._profile is not None:
+            return
+        if key is not None and key == self._bad_key:
+            return  # Already reported; retried once the row is edited
+
+        if key is None:
+            self._profile, self._key = settings_profile(), None
+            return
+
+        row = DetectionProfile.objects.get(pk=key[0])
+        try:
+            self._profile = compile_profile(
+                row.name, row.version, row.color_ranges, row.min_threshold, row.max_threshold
+            )
+            self._key, self._bad_key = key, None
+            print(f"🔄 Detection profile loaded: {row.name} v{row.version}")
+        except Exception as e:
+            # Keep the last good profile rather than breaking detection
+            print(f"⚠️ Detection profile {row.name} v{row.version} invalid: {str(e)}")
+            self._bad_key = key
+            if self._profile is None:
+                self._profile = settings_profile()
+
+
+_store = ProfileStore()
+
+
+def get_active_profile():
+    return _store.get_active()
+
+
+@receiver([post_save, post_delete], sender=DetectionProfile)
+def _profile_changed(sender, **kwargs):
+    # This process reloads at once, others within PROFILE_RELOAD_INTERVAL
+    _store.invalidate()
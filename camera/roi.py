@@ -0,0 +1,77 @@
+"""
+Per-camera region of interest
+
+Each camera can list ROI polygons (the water it watches, without sky,
+dock or shore) in normalized coordinates: [[x, y], ...] with x, y in 0-1,
+so one polygon works at every processing resolution. Polygons are
+rasterised once per resolution into a cached mask + bounding box; the
+detection stages crop to the box, ignore pixels outside the mask and
+compute percentages against the ROI area instead of the whole frame.
+"""
+from functools import lru_cache
+
+try:
+    import cv2
+    import numpy as np
+    CV_AVAILABLE = True
+except ImportError:
+    CV_AVAILABLE = False
+
+
+def normalize_polygons(raw):
+    """
+    Config value → hashable tuple of polygons (None = whole frame)
+    Raises ValueError on malformed points or coordinates outside 0-1
+    """
+    if not raw:
+        return None
+    polygons = tuple(
+        tuple((float(x), float(y)) for x, y in polygon)
+        for polygon in raw
+        if len(polygon) >= 3
+    )
+    for polygon in polygons:
+        if not all(0 <= v <= 1 for point in polygon for v in point):
+            raise ValueError("ROI coordinates must be fractions of width/height (0-1)")
+    return polygons or None
+
+
+@lru_cache(maxsize=256)
+def roi_mask(polygons, height, width):
+    """Rasterised ROI (255 inside) at the given resolution - read only, cached"""
+    mask = np.zeros((height, width), np.uint8)
+    points = [
+        np.round(np.array(polygon, np.float32) * (width, height)).astype(np.int32)
+        for polygon in polygons
+    ]
+    cv2.fillPoly(mask, points, 255)
+    mask.setflags(write=False)
+    return mask
+
+
+@lru_cache(maxsize=256)
+def roi_bbox(polygons, height, width):
+    """(x, y, w, h) bounding box of the ROI mask"""
+    return cv2.boundingRect(roi_mask(polygons, height, width))
+
+
+@lru_cache(maxsize=256)
+def roi_area(polygons, height, width):
+    return cv2.countNonZero(roi_mask(polygons, height, width))
+
+
+def crop_to_roi(image, polygons, extra_mask=None):
+    """
+    Crop an image (and an optional same-size mask) to the ROI bounding box
+    Returns: (cropped_image, combined_mask_or_None, area_in_pixels)
+    Without an ROI the image is returned as-is and area is the full frame
+    """
+    height, width = image.shape[:2]
+    if not polygons:
+        return image, extra_mask, height * width
+
+    x, y, w, h = roi_bbox(polygons, height, width)
+    mask = roi_mask(polygons, height, width)[y:y + h, x:x + w]
+    if extra_mask is not None:
+        mask = cv2.bitwise_and(mask, extra_mask[y:y + h, x:x + w])
+    return image[y:y + h, x:x + w], mask, roi_area(polygons, height, width)
@@ -0,0 +1,129 @@
+"""
+Tile-sampled early-exit color screening
+
+Most uploads are rejected, so instead of converting and classifying every
+pixel the frame is split into COLOR_SAMPLE_TILE tiles, grouped into a
+COLOR_SAMPLE_STRATA x COLOR_SAMPLE_STRATA grid of strata. Each round takes
+one random tile from every stratum (a stratified sample over the whole
+frame), converts only those tiles to HSV and classifies them. After every
+round, confidence bounds on each color's fraction are updated: once every
+color is certainly below the minimum threshold the frame is rejected
+without a full scan; once any color is certainly above it, sampling stops
+and the full scan decides.
+
+Per-tile color fractions are in [0, 1], so their variance is at most
+p(1 - p): a Wilson score bound over tiles stays valid however clustered
+the color is inside tiles.
+
+Opt-in (COLOR_SAMPLING_ENABLED), used on full-resolution decodes only
+(COLOR_SCREENING_SCALE = 1). A 1/4 decode (200x150) has too few tiles to
+prove the minimum threshold within COLOR_SAMPLE_MAX_FRACTION, and scanning
+all of it is cheaper than sampling.
+Sampling never accepts a frame: the thresholds (MAX included) apply to
+the largest connected blob, and tiles can't tell one large blob from
+several small ones. Colour certainly above the minimum ends sampling at
+once and the full scan decides.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+
+try:
+    import cv2
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+    CV_AVAILABLE = True
+    _rng = np.random.default_rng()
+except ImportError:
+    CV_AVAILABLE = False
+
+
+def _starts(size, tile):
+    """Tile origins along one axis; the last tile is clamped so the edge is covered too"""
+    return np.minimum(np.arange(0, size, tile), size - tile)
+
+
+@lru_cache(maxsize=64)
+def strata(height, width, tile, count):
+    """
+    Tile origins per axis + stratum bounds (in tile indices), cached per frame size
+    Returns: (ys, xs, row_bounds, col_bounds)
+    """
+    ys, xs = _starts(height, tile), _starts(width, tile)
+    row_bounds = np.linspace(0, len(ys), min(count, len(ys)) + 1).astype(np.int64)
+    col_bounds = np.linspace(0, len(xs), min(count, len(xs)) + 1).astype(np.int64)
+    return ys, xs, row_bounds, col_bounds
+
+
+def sample_round(ys, xs, row_bounds, col_bounds):
+    """One random tile origin from every stratum: (tile_ys, tile_xs)"""
+    lo_r, hi_r = row_bounds[:-1, None], row_bounds[1:, None]
+    lo_c, hi_c = col_bounds[None, :-1], col_bounds[None, 1:]
+    shape = (len(lo_r), lo_c.shape[1])
+    rows = lo_r + (_rng.random(shape) * (hi_r - lo_r)).astype(np.int64)
+    cols = lo_c + (_rng.random(shape) * (hi_c - lo_c)).astype(np.int64)
+    return ys[rows.ravel()], xs[cols.ravel()]
+
+
+def wilson_interval(p, n, z):
+    """(lower, upper) Wilson score bounds for the mean of n sampled values in [0, 1]"""
+    z2 = z * z
+    center = p + z2 / (2 * n)
+    spread = z * (p * (1 - p) / n + z2 / (4 * n * n)) ** 0.5
+    return (center - spread) / (1 + z2 / n), (center + spread) / (1 + z2 / n)
+
+
+def tiles_needed(threshold, z):
+    """Fewest sampled tiles that can prove a fraction < threshold (if they are all empty)"""
+    t = threshold / 100
+    return z * z * (1 - t) / t
+
+
+def _gather(image, tile_ys, tile_xs, tile):
+    """Stack the tiles at (tile_ys, tile_xs) into one (k * tile, tile, ...) image"""
+    windows = sliding_window_view(image, (tile, tile), axis=(0, 1))[tile_ys, tile_xs]
+    if windows.ndim == 4:  # (k, channels, tile, tile) → channels last
+        windows = windows.transpose(0, 2, 3, 1)
+    return np.ascontiguousarray(windows).reshape((len(tile_ys) * tile, tile) + image.shape[2:])
+
+
+def certainly_below(bgr, classifier, mask, area, threshold):
+    """
+    True if sampled tiles prove every color covers < threshold % of the ROI
+    bgr: image at processing resolution (already cropped to the ROI box)
+    mask: ROI / motion mask of the same size, or None
+    area: ROI area in pixels (percentage denominator)
+    False means "not proven" - the caller scans the full frame.
+    """
+    tile, z = settings.COLOR_SAMPLE_TILE, settings.COLOR_SAMPLE_Z
+    height, width = bgr.shape[:2]
+    if not area or threshold <= 0 or height < tile or width < tile:
+        return False
+
+    ys, xs, row_bounds, col_bounds = strata(height, width, tile, settings.COLOR_SAMPLE_STRATA)
+    max_tiles = len(ys) * len(xs) * settings.COLOR_SAMPLE_MAX_FRACTION
+    # Tile fractions are relative to the ROI box; the ROI itself may be smaller
+    box_share = height * width / area
+    if tiles_needed(threshold / box_share, z) > max_tiles:
+        return False  # Small frame: proving it would cost about as much as scanning it
+
+    tile_pixels = tile * tile
+    sums = np.zeros(len(classifier.colors))
+    sampled = 0
+    while sampled < max_tiles:
+        tile_ys, tile_xs = sample_round(ys, xs, row_bounds, col_bounds)
+        hsv = cv2.cvtColor(_gather(bgr, tile_ys, tile_xs, tile), cv2.COLOR_BGR2HSV)
+        bits = classifier.classify(hsv)
+        if mask is not None:
+            bits = cv2.bitwise_and(bits, bits, mask=_gather(mask, tile_ys, tile_xs, tile))
+        for i, color_bits in enumerate(classifier.color_bits):
+            sums[i] += np.count_nonzero(bits & color_bits) / tile_pixels
+        sampled += len(tile_ys)
+
+        bounds = [wilson_interval(s / sampled, sampled, z) for s in sums]
+        if max(upper for _, upper in bounds) * box_share * 100 < threshold:
+            return True
+        if max(lower for lower, _ in bounds) * box_share * 100 > threshold:
+            return False  # Certainly enough color somewhere: the full scan decides
+
+    return False
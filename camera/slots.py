@@ -0,0 +1,67 @@
+"""
+Host-wide slots (flock)
+
+A limit shared by every process and thread on the host: slot i is the
+file <directory>/<name>-<i>.slot, and holding it means holding an
+exclusive flock on it through a file descriptor of your own. acquire()
+tries the slots from a random start with LOCK_NB and keeps the first one
+it gets; release() closes the descriptor, which drops the lock. The kernel
+drops a dead process's locks too, so a crashed worker never leaks a slot.
+Used for upload admission (admission.py) and live stream viewers (live.py).
+Without fcntl (Windows: one process) the count is kept in memory.
+"""
+import os
+import random
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class FlockSlots:
+    def __init__(self, directory, name, count):
+        self.directory = directory
+        self.name = name
+        self.count = count
+        self._held = 0  # This process (stats, and the whole count without fcntl)
+        self._lock = threading.Lock()
+
+    def _path(self, index):
+        return os.path.join(self.directory, f"{self.name}-{index}.slot")
+
+    def acquire(self):
+        """Claim a free slot. Returns a handle for release(), or None if all are taken."""
+        if fcntl is None:
+            with self._lock:
+                if self._held >= self.count:
+                    return None
+                self._held += 1
+                return -1
+
+        os.makedirs(self.directory, exist_ok=True)
+        start = random.randrange(self.count) if self.count else 0
+        for offset in range(self.count):
+            fd = os.open(self._path((start + offset) % self.count), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            with self._lock:
+                self._held += 1
+            return fd
+        return None
+
+    def release(self, handle):
+        if handle is None:
+            return
+        with self._lock:
+            self._held -= 1
+        if handle >= 0:
+            os.close(handle)
+
+    def held_here(self):
+        """Slots held by this process"""
+        return self._held
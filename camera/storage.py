@@ -0,0 +1,150 @@
+"""
+Content-addressed capture storage
+
+Capture images are stored by the SHA-256 of their bytes:
+captures/<first 2 hex>/<sha256>.jpg. The same bytes always map to the
+same file, so an ESP32 retry after a timeout is written once; saving
+bytes that already exist is a no-op.
+Reference counts are not stored anywhere - they are the number of
+BoatCapture rows whose image names the file (image_sha256 is indexed).
+release_image() unlinks a file only when no row refers to it any more,
+and only once the transaction that dropped the reference has committed.
+A save of bytes whose file already exists may race that unlink (it skips
+the write, then the file goes before its row commits), so every save
+re-checks its file after its own commit and restores it if it is gone.
+Both the unlink and that check run under one host-wide flock: whichever
+comes second sees the other's result.
+Writes go to a temp file + os.replace, so a file is never seen half-written.
+Bytes that are already on disk (the ingest spool file) are published with
+a hard link instead of a second write: the capture and the spool share one
+inode, and removing either leaves the other.
+"""
+import os
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process, the thread lock is enough
+    fcntl = None
+
+
+def sha256_hex(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def link_or_copy(source_path, dest_path):
+    """
+    Publish an existing file at dest_path atomically
+    Hard link (no data written); copy if the filesystem can't link (other device, FAT)
+    """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.link(source_path, tmp_path)
+    except FileExistsError:
+        os.remove(tmp_path)  # Left over from a crash
+        os.link(source_path, tmp_path)
+    except OSError:
+        shutil.copyfile(source_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+
+def write_file(path, data):
+    """Write bytes atomically (temp file + os.replace)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    _thread_lock = threading.Lock()
+
+    @contextmanager
+    def locked(self):
+        """Host-wide lock for unlink vs. restore of content files"""
+        os.makedirs(self.location, exist_ok=True)
+        with self._thread_lock:
+            fd = os.open(os.path.join(self.location, '.content.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)  # Also drops the flock
+
+    def _restore_after_commit(self, name, write):
+        """After the saving transaction commits: put the file back if a concurrent release unlinked it"""
+        def restore():
+            with self.locked():
+                if not self.exists(name):
+                    print(f"♻️ {name} was released while being saved again - restoring it")
+                    try:
+                        write(self.path(name))
+                    except OSError as e:
+                        print(f"❌ Could not restore {name}: {str(e)}")
+        transaction.on_commit(restore)
+
+    def content_name(self, name, digest):
+        """captures/capture_123.jpg + digest → captures/ab/<digest>.jpg"""
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], f"{digest}{extension}")
+
+    def get_available_name(self, name, max_length=None):
+        return name  # Same bytes → same name: reuse, never add a suffix
+
+    def _save(self, name, content):
+        content.seek(0)
+        data = content.read()
+        name = self.content_name(name, sha256_hex(data))
+        if not self.exists(name):
+            write_file(self.path(name), data)
+        self._restore_after_commit(name, lambda path: write_file(path, data))
+        return name
+
+    def save_file(self, name, source_path, digest):
+        """
+        Store a file that is already on disk under its content address
+        digest: SHA-256 of the file (the caller hashed the bytes already)
+        Returns: stored name
+        """
+        name = self.content_name(name, digest)
+        if not self.exists(name):
+            link_or_copy(source_path, self.path(name))
+        self._restore_after_commit(name, lambda path: link_or_copy(source_path, path))
+        return name
+
+
+_storage = ContentAddressedStorage()
+
+
+def capture_storage():
+    """Storage of BoatCapture.image (callable, so settings are read lazily)"""
+    return _storage
+
+
+def _unlink_unreferenced(name, digest):
+    from .models import BoatCapture
+    with _storage.locked():
+        if BoatCapture.objects.filter(image_sha256=digest, image=name).exists():
+            return
+        _storage.delete(name)
+
+
+def release_image(name, digest=''):
+    """
+    Unlink a capture image once no BoatCapture refers to it any more
+    Call after deleting / repointing the row, inside its transaction: the
+    reference count is checked and the file removed only after that
+    transaction commits (a rollback keeps the file the row still names)
+    """
+    if name:
+        transaction.on_commit(lambda: _unlink_unreferenced(name, digest))
@@ -1,3 +1,1150 @@
-from django.test import TestCase
+import os
+import json
+import time
+import shutil
+import tempfile
+import datetime
+import threading
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import (
+    admission, cameras, dedupe, detectors, executor, inference, live, maintenance, motion, profiles, sampling,
+    slots, storage, tracking,
+)
+from .color_lut import ColorClassifier
+from .blobs import largest_by_color
+from .detection import color_blobs, detect_colored_boat
+from .dedupe import dhash, hamming
+from .frame import Frame
+from .jpeg import JpegStreamValidator, JpegValidationError
+from .ingest import enqueue_upload, lease_jobs, complete_job, fail_job, process_job
+from .models import BoatCapture, Camera, DetectionProfile, IngestJob
+from .profiles import settings_profile
+from .roi import normalize_polygons
+from .storage import capture_storage, release_image, sha256_hex
+
+
+def jpeg(image, quality=95):
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+def sea(boat=None, color=(0, 0, 255)):
+    """800x600 empty sea (BGR), optionally with a boat: boat = (x, y, w, h)"""
+    image = np.full((600, 800, 3), (200, 120, 40), np.uint8)
+    if boat:
+        x, y, w, h = boat
+        image[y:y + h, x:x + w] = color
+    return image
+
+
+class IsolatedTestCase(TestCase):
+    """Temp media / spool / live folders, inline detection, fresh per-process caches, camera 'cam1'"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=os.path.join(self.tmp, 'media'),
+            INGEST_SPOOL_DIR=os.path.join(self.tmp, 'spool'),
+            LIVE_BUFFER_DIR=os.path.join(self.tmp, 'live'),
+            ADMISSION_STATE_DIR=os.path.join(self.tmp, 'admission'),
+            DETECTION_POOL_SIZE=0,
+            ML_BOAT_DETECTION_ENABLED=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        executor._executor = None
+        executor._pool_sharers = 1
+        dedupe._cache = None
+        motion._gate = None
+        tracking._tracker = None
+        admission._limiter = admission._admission = None
+        cameras._store.invalidate()
+        live._rings.clear()
+        live._stream_slots = None
+        Camera.objects.create(camera_id='cam1')
+
+
+# ============================================
+# INGEST QUEUE
+# ============================================
+
+class IngestQueueTests(IsolatedTestCase):
+    def test_lease_then_complete(self):
+        job = enqueue_upload(b'frame', 'a.jpg', 'cam1')
+        self.assertTrue(os.path.exists(job.spool_path))
+
+        leased = lease_jobs('w1')
+        self.assertEqual([j.id for j in leased], [job.id])
+        self.assertEqual(lease_jobs('w2'), [])  # Already leased
+
+        complete_job(leased[0], 'w1', lambda j: {"status": "rejected"})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('done', {"status": "rejected"}))
+        self.assertFalse(os.path.exists(job.spool_path))
+
+    def test_fail_schedules_retry_then_gives_up(self):
+        job = enqueue_upload(b'frame', 'a.jpg')
+        with self.settings(INGEST_MAX_ATTEMPTS=2, INGEST_RETRY_BACKOFF=0):
+            fail_job(lease_jobs('w1')[0], 'w1', 'boom')
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.last_error), ('queued', 'boom'))
+
+            fail_job(lease_jobs('w1')[0], 'w1', 'boom again')
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'failed')
+            self.assertFalse(os.path.exists(job.spool_path))
+
+    def test_expired_lease_is_released_and_old_owner_cannot_complete(self):
+        job = enqueue_upload(b'frame', 'a.jpg')
+        stale = lease_jobs('w1')[0]
+        IngestJob.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - datetime.timedelta(seconds=1))
+
+        fresh = lease_jobs('w2')
+        self.assertEqual([j.id for j in fresh], [job.id])
+
+        persisted = []
+        self.assertIsNone(complete_job(stale, 'w1', persisted.append))  # Lease lost: nothing saved
+        self.assertEqual(persisted, [])
+        self.assertIsNotNone(complete_job(fresh[0], 'w2', lambda j: persisted.append(j) or {}))
+        self.assertEqual(len(persisted), 1)
+
+    def test_one_job_per_camera_in_flight_oldest_first(self):
+        first, second, _ = [enqueue_upload(b'frame', f'{i}.jpg', 'cam1') for i in range(3)]
+        other = enqueue_upload(b'frame', 'x.jpg', 'cam2')
+
+        leased = lease_jobs('w1', limit=8, one_per_camera=True)
+        self.assertEqual([j.id for j in leased], [first.id, other.id])
+        self.assertEqual(lease_jobs('w2', limit=8, one_per_camera=True), [])  # Both cameras busy
+
+        complete_job(leased[0], 'w1', lambda j: {})
+        self.assertEqual([j.id for j in lease_jobs('w2', limit=8, one_per_camera=True)], [second.id])
+
+    def test_process_job_failure_is_retried(self):
+        job = enqueue_upload(b'frame', 'a.jpg')
+
+        def analyze(job, img_data):
+            raise ValueError("decode failed")
+
+        self.assertIsNone(process_job(lease_jobs('w1')[0], 'w1', analyze, None))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('queued', 1, 'decode failed'))
+
+
+@override_settings(INGEST_QUEUE_ENABLED=True, RATE_LIMIT_ENABLED=False)
+class LiveOnUploadTests(IsolatedTestCase):
+    def test_queued_upload_is_live_before_the_worker_runs(self):
+        response = self.client.post(
+            '/upload-image/', data=jpeg(sea()), content_type='image/jpeg', HTTP_X_CAMERA_ID='cam1'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(IngestJob.objects.get().status, 'queued')
+        self.assertEqual(live.get_ring('cam1').latest_seq(), 1)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False, TRACKING_ENABLED=False)
+class SingleWriteTests(IsolatedTestCase):
+    def upload(self):
+        return self.client.post(
+            '/upload-image/', data=jpeg(sea((200, 250, 220, 160))), content_type='image/jpeg',
+            HTTP_X_CAMERA_ID='cam1'
+        )
+
+    @override_settings(INGEST_QUEUE_ENABLED=True)
+    def test_queued_capture_is_a_hard_link_to_the_spool_file(self):
+        self.upload()
+        job = IngestJob.objects.get()
+        spool_inode = os.stat(job.spool_path).st_ino
+        with mock.patch('camera.storage.write_file') as write_file:
+            call_command('run_ingest_worker', once=True)
+        write_file.assert_not_called()
+
+        capture = BoatCapture.objects.get()
+        self.assertEqual(os.stat(capture.image.path).st_ino, spool_inode)
+        self.assertFalse(os.path.exists(job.spool_path))  # The capture outlives the spool link
+
+    @override_settings(INGEST_QUEUE_ENABLED=False)
+    def test_inline_capture_is_written_once(self):
+        with mock.patch('camera.storage.write_file', wraps=storage.write_file) as write_file:
+            self.assertEqual(self.upload().json()["status"], 'received')
+        self.assertEqual(write_file.call_count, 1)
+
+    def test_link_falls_back_to_a_copy(self):
+        source = os.path.join(self.tmp, 'frame.jpg')
+        storage.write_file(source, b'frame')
+        dest = os.path.join(self.tmp, 'out', 'frame.jpg')
+        with mock.patch('camera.storage.os.link', side_effect=OSError("cross-device link")):
+            storage.link_or_copy(source, dest)
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), b'frame')
+        self.assertNotEqual(os.stat(dest).st_ino, os.stat(source).st_ino)
+
+
+# ============================================
+# BATCH UPLOADS
+# ============================================
+
+def multipart(parts, boundary='frames'):
+    """Hand-built multipart body: parts = [(field_name, bytes)] in this exact order"""
+    body = b''
+    for i, (name, data) in enumerate(parts):
+        body += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{i}.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'
+        ).encode() + data + b'\r\n'
+    return body + f'--{boundary}--\r\n'.encode(), f'multipart/form-data; boundary={boundary}'
+
+
+@override_settings(RATE_LIMIT_ENABLED=False, DEDUPE_ENABLED=False)
+class BatchUploadTests(IsolatedTestCase):
+    def post_batch(self, parts):
+        body, content_type = multipart(parts)
+        response = self.client.post('/upload-batch/', data=body, content_type=content_type, HTTP_X_CAMERA_ID='cam1')
+        self.assertEqual(response.status_code, 200)
+        return response.json()["frames"]
+
+    def test_per_frame_verdicts_and_invalid_frames(self):
+        frames = self.post_batch([
+            ('frame', jpeg(sea())),
+            ('frame', b'not a jpeg'),
+            ('frame', jpeg(sea(boat=(200, 250, 220, 160)))),
+        ])
+        self.assertEqual([f["status"] for f in frames], ['rejected', 'invalid', 'received'])
+        self.assertEqual([f["index"] for f in frames], [0, 1, 2])
+        self.assertEqual(BoatCapture.objects.count(), 1)
+
+    def test_frames_kept_in_body_order_across_field_names(self):
+        frames = self.post_batch([
+            ('a', jpeg(sea())),
+            ('b', jpeg(sea(boat=(200, 250, 220, 160)))),
+            ('a', b'not a jpeg'),
+        ])
+        self.assertEqual([f["status"] for f in frames], ['rejected', 'received', 'invalid'])
+
+
+# ============================================
+# UPLOAD VALIDATION
+# ============================================
+
+class JpegValidationTests(IsolatedTestCase):
+    def stream(self, data, chunk=64, max_bytes=512 * 1024, max_dimension=2048):
+        validator = JpegStreamValidator(max_bytes, max_dimension)
+        for i in range(0, len(data), chunk):
+            validator.feed(data[i:i + chunk])
+        return validator
+
+    def reason(self, data, **kwargs):
+        with self.assertRaises(JpegValidationError) as raised:
+            self.stream(data, **kwargs).finish()
+        return raised.exception.reason, raised.exception.status
+
+    def test_valid_frame_streamed_in_chunks(self):
+        data = jpeg(sea())
+        validator = self.stream(data)
+        self.assertEqual((validator.width, validator.height), (800, 600))
+        self.assertEqual(validator.finish(), data)
+
+    def test_trailing_zero_padding_is_accepted(self):
+        data = jpeg(sea()) + b'\x00' * 37  # ESP32 frame buffers are padded
+        self.assertEqual(self.stream(data).finish(), data)
+
+    def test_truncated_stream(self):
+        self.assertEqual(self.reason(jpeg(sea())[:-500]), ('truncated', 400))
+
+    def test_oversized_body(self):
+        self.assertEqual(self.reason(jpeg(sea()), max_bytes=4096), ('too_large', 413))
+
+    def test_not_a_jpeg(self):
+        self.assertEqual(self.reason(b'\x89PNG\r\n\x1a\n' + b'\x00' * 100), ('not_jpeg', 400))
+        self.assertEqual(self.reason(b'\xff'), ('not_jpeg', 400))
+
+    def test_frame_header_above_the_dimension_limit(self):
+        # Refused from the SOF header, before the scan data arrives
+        data = jpeg(np.zeros((8, 3000, 3), np.uint8))
+        validator = JpegStreamValidator(512 * 1024, 2048)
+        with self.assertRaises(JpegValidationError) as raised:
+            validator.feed(data[:1024])
+        self.assertEqual((raised.exception.reason, raised.exception.status), ('too_large', 413))
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_upload_answers_with_the_reason(self):
+        response = self.client.post(
+            '/upload-image/', data=jpeg(sea())[:-500], content_type='image/jpeg', HTTP_X_CAMERA_ID='cam1'
+        )
+        self.assertEqual((response.status_code, response.json()["reason"]), (400, 'truncated'))
+        self.assertFalse(IngestJob.objects.exists())  # Nothing spooled
+
+
+# ============================================
+# FRAME DECODING
+# ============================================
+
+class FrameDecodeTests(TestCase):
+    def test_one_decode_serves_screening_and_the_pool(self):
+        import pickle
+        data = jpeg(sea((480, 240, 240, 160)))
+        with mock.patch('camera.frame.cv2.imdecode', wraps=cv2.imdecode) as imdecode:
+            frame = Frame(data, base_scale=4)
+            dhash(frame)                               # 1/8 (dedupe, motion)
+            self.assertEqual(frame.reduced(8).shape[:2], (75, 100))
+            shipped = pickle.loads(pickle.dumps(frame))  # To a pool process
+            self.assertEqual(shipped.reduced(4).shape[:2], (150, 200))
+            detect_colored_boat(shipped)                 # Color screen at 1/4
+        self.assertEqual(imdecode.call_count, 1)
+
+    def test_full_resolution_base(self):
+        frame = Frame(jpeg(sea()), base_scale=1)
+        self.assertEqual(frame.reduced(8).shape[:2], (75, 100))
+        self.assertIn('bgr', frame.__dict__)
+
+
+# ============================================
+# REDUCED-SIZE SCREENING
+# ============================================
+
+@override_settings(COLOR_SCREENING_SCALE=4, COLOR_SCREENING_MARGIN=1.0, COLOR_SAMPLING_ENABLED=False)
+class ReducedScreeningTests(TestCase):
+    def full_resolution(self, data):
+        with self.settings(COLOR_SCREENING_SCALE=1):
+            return detect_colored_boat(data)
+
+    def test_clear_frames_are_decided_without_a_full_decode(self):
+        for image in (sea(), sea((200, 250, 220, 160)), sea((0, 0, 800, 500))):
+            frame = Frame(jpeg(image))
+            verdict = detect_colored_boat(frame)
+            self.assertNotIn('bgr', frame.__dict__)
+            self.assertEqual(verdict[:2], self.full_resolution(jpeg(image))[:2])
+
+    def test_near_threshold_frame_is_checked_at_full_resolution(self):
+        data = jpeg(sea((300, 240, 200, 120)))  # 5.0% of the frame: on the minimum threshold
+        frame = Frame(data)
+        verdict = detect_colored_boat(frame)
+        self.assertIn('bgr', frame.__dict__)
+        self.assertEqual(verdict[:3], self.full_resolution(data)[:3])
+
+
+# ============================================
+# SINGLE-PASS COLOR CLASSIFIER
+# ============================================
+
+class ColorClassifierTests(TestCase):
+    def test_counts_match_in_range(self):
+        color_ranges = {
+            'red': [
+                {'lower': [0, 100, 100], 'upper': [10, 255, 255]},
+                {'lower': [160, 100, 100], 'upper': [180, 255, 255]},
+            ],
+            'yellow': [{'lower': [20, 100, 100], 'upper': [30, 255, 255]}],
+            'white': [{'lower': [0, 0, 200], 'upper': [180, 30, 255]}],
+        }
+        rng = np.random.default_rng(0)
+        hsv = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+        mask = (rng.random((120, 160)) > 0.5).astype(np.uint8) * 255
+
+        classifier = ColorClassifier(color_ranges)
+        for color, ranges in color_ranges.items():
+            expected = np.zeros(hsv.shape[:2], np.uint8)
+            for color_range in ranges:
+                expected |= cv2.inRange(hsv, np.array(color_range['lower']), np.array(color_range['upper']))
+            self.assertEqual(classifier.counts(hsv)[color], cv2.countNonZero(expected), color)
+            self.assertEqual(
+                classifier.counts(hsv, mask)[color], cv2.countNonZero(cv2.bitwise_and(expected, mask)), color
+            )
+
+
+# ============================================
+# DETECTION PROFILES
+# ============================================
+
+@override_settings(PROFILE_RELOAD_INTERVAL=0)
+class ProfileReloadTests(TestCase):
+    ranges = {'RED': [{'lower': [0, 100, 100], 'upper': [10, 255, 255]}]}
+
+    def test_edited_profile_is_picked_up_without_a_restart(self):
+        store = profiles.ProfileStore()
+        self.assertEqual(store.get_active().name, 'settings')
+        row = DetectionProfile.objects.create(name='night', is_active=True, color_ranges=self.ranges)
+        self.assertEqual((store.get_active().name, store.get_active().min_threshold), ('night', 5.0))
+        row.min_threshold = 12.0
+        row.save()
+        self.assertEqual(store.get_active().min_threshold, 12.0)
+
+    def test_invalid_profile_is_compiled_once_until_edited(self):
+        store = profiles.ProfileStore()
+        good = store.get_active()
+        row = DetectionProfile.objects.create(
+            name='broken', is_active=True, color_ranges=self.ranges, min_threshold=80, max_threshold=20
+        )
+        with mock.patch.object(profiles, 'compile_profile', wraps=profiles.compile_profile) as compile_profile:
+            for _ in range(3):
+                self.assertIs(store.get_active(), good)  # Last good profile stays in use
+            self.assertEqual(compile_profile.call_count, 1)
+            row.min_threshold = 10
+            row.save()
+            self.assertEqual(store.get_active().name, 'broken')
+            self.assertEqual(compile_profile.call_count, 2)
+
+
+# ============================================
+# REGION OF INTEREST
+# ============================================
+
+@override_settings(INGEST_QUEUE_ENABLED=False, RATE_LIMIT_ENABLED=False, TRACKING_ENABLED=False)
+class RoiTests(IsolatedTestCase):
+    water = [[[0, 0.5], [1, 0.5], [1, 1], [0, 1]]]  # Bottom half of the frame
+
+    def test_polygons_are_validated(self):
+        self.assertIsNone(normalize_polygons([]))
+        self.assertIsNone(normalize_polygons([[[0, 0], [1, 1]]]))  # Fewer than 3 points
+        self.assertEqual(normalize_polygons(self.water), (((0.0, 0.5), (1.0, 0.5), (1.0, 1.0), (0.0, 1.0)),))
+        with self.assertRaises(ValueError):
+            normalize_polygons([[[0, 0], [1.5, 0], [1, 1]]])
+
+    def test_percentages_are_of_the_roi_and_boxes_in_frame_pixels(self):
+        roi = normalize_polygons(self.water)
+        self.assertEqual(detect_colored_boat(jpeg(sea((480, 40, 240, 160))), roi=roi)[0], False)  # Shore
+
+        detected, color, percentage, blobs = detect_colored_boat(jpeg(sea((480, 360, 240, 160))), roi=roi)
+        self.assertEqual((detected, color), (True, 'RED'))
+        self.assertAlmostEqual(percentage, 16.0, delta=0.5)  # 8% of the frame, 16% of the ROI
+        for got, expected in zip(blobs[0]["bbox"], [480, 360, 240, 160]):
+            self.assertAlmostEqual(got, expected, delta=8)
+
+    def test_camera_roi_applies_to_uploads(self):
+        Camera.objects.filter(camera_id='cam1').update(roi_polygons=self.water)
+        cameras._store.invalidate()
+        for boat, status in (((480, 40, 240, 160), 'rejected'), ((480, 360, 240, 160), 'received')):
+            motion._gate = None  # Every frame is new to the background model
+            response = self.client.post(
+                '/upload-image/', data=jpeg(sea(boat)), content_type='image/jpeg', HTTP_X_CAMERA_ID='cam1'
+            )
+            self.assertEqual(response.json()["status"], status, boat)
+
+
+# ============================================
+# CONNECTED-COMPONENT BLOBS
+# ============================================
+
+class BlobTests(TestCase):
+    def blobs(self, image, scale):
+        frame = Frame(jpeg(image))
+        return color_blobs(frame.reduced_hsv(scale), settings_profile().classifier, scale=scale)
+
+    def test_reduced_and_full_resolution_passes_agree(self):
+        # A long, low hull (8 px tall): at 1/4 it is 2 px, which a 3 px open would erase
+        image = sea()
+        image[300:308, :] = (0, 0, 255)
+        full = largest_by_color(self.blobs(image, 1), ['RED'])['RED']
+        quarter = largest_by_color(self.blobs(image, 4), ['RED'])['RED']
+        self.assertGreater(full, 1.0)
+        self.assertAlmostEqual(quarter, full, delta=0.2)
+
+    @override_settings(COLOR_SCREENING_SCALE=1)
+    def test_scattered_color_is_not_a_boat(self):
+        image = sea()
+        for y in range(0, 600, 16):
+            for x in range(0, 800, 16):
+                image[y:y + 6, x:x + 6] = (0, 0, 255)  # 14% of the frame red, in 6 px specks
+        self.assertEqual(detect_colored_boat(jpeg(image)), (False, None, 0.0, []))
+
+    @override_settings(COLOR_SCREENING_SCALE=1)
+    def test_hull_split_by_rigging_is_one_blob(self):
+        image = sea((200, 250, 220, 160))
+        image[250:410, 300:302] = (30, 30, 30)  # Dark mast across the hull
+        blobs = self.blobs(image, 1)
+        self.assertEqual(len(blobs), 1)
+        self.assertAlmostEqual(blobs[0]["percentage"], 7.33, delta=0.3)
+
+    def test_each_boat_is_a_blob_in_frame_pixels(self):
+        image = sea((80, 80, 160, 120))
+        image[320:520, 400:700] = (0, 0, 255)
+        blobs = self.blobs(image, 4)
+        self.assertEqual(len(blobs), 2)
+        for blob, box in zip(blobs, [[400, 320, 300, 200], [80, 80, 160, 120]]):  # Largest first
+            for got, expected in zip(blob["bbox"], box):
+                self.assertAlmostEqual(got, expected, delta=8)
+            self.assertAlmostEqual(blob["centroid"][0], box[0] + box[2] / 2, delta=8)
+
+
+# ============================================
+# MOTION + NEAR-DUPLICATE GATES
+# ============================================
+
+@override_settings(MOTION_SCALE=8, MOTION_LEARNING_RATE=0.1, MOTION_PIXEL_THRESHOLD=25)
+class MotionGateTests(TestCase):
+    boat = (480, 240, 240, 160)  # 8% of the frame
+
+    def apply(self, gate, image, camera_id='cam1'):
+        return gate.apply(Frame(jpeg(image)), camera_id)
+
+    def test_boat_entering_a_static_scene_is_foreground(self):
+        gate = motion.MotionGate(4)
+        self.assertEqual(self.apply(gate, sea())[1], 100.0)  # No background yet
+        self.assertLess(self.apply(gate, sea())[1], 0.5)
+
+        mask, percentage = self.apply(gate, sea(self.boat))
+        self.assertAlmostEqual(percentage, 8.0, delta=1.5)
+        x, y, w, h = self.boat
+        self.assertEqual(mask[(y + h // 2) // 8, (x + w // 2) // 8], 255)
+        self.assertEqual(mask[20, 10], 0)
+
+    def test_moored_boat_fades_into_the_background(self):
+        gate = motion.MotionGate(4)
+        self.apply(gate, sea())
+        percentages = [self.apply(gate, sea(self.boat))[1] for _ in range(40)]
+        self.assertGreater(percentages[2], 5.0)
+        self.assertLess(percentages[-1], 0.5)
+
+    def test_each_camera_has_its_own_background(self):
+        gate = motion.MotionGate(2)
+        self.apply(gate, sea(), 'cam1')
+        self.assertEqual(self.apply(gate, sea(self.boat), 'cam2')[1], 100.0)
+        self.assertLess(self.apply(gate, sea(), 'cam1')[1], 0.5)
+
+        self.apply(gate, sea(), 'cam3')  # Over max_cameras: cam2 (least recent) is dropped
+        self.assertEqual(self.apply(gate, sea(self.boat), 'cam2')[1], 100.0)
+
+    def test_static_red_object_is_masked_out_of_the_color_stage(self):
+        buoy = (40, 40, 400, 200)  # 16.7%, larger than the boat, there from the start
+        scene = sea(buoy)
+        gate = motion.MotionGate(4)
+        for _ in range(3):
+            self.apply(gate, scene)
+        scene[self.boat[1]:self.boat[1] + self.boat[3], self.boat[0]:self.boat[0] + self.boat[2]] = (0, 0, 255)
+        mask, _ = self.apply(gate, scene)
+
+        self.assertAlmostEqual(detect_colored_boat(jpeg(scene))[2], 16.7, delta=0.5)
+        self.assertAlmostEqual(detect_colored_boat(jpeg(scene), foreground=mask)[2], 8.0, delta=0.5)
+
+
+@override_settings(INGEST_QUEUE_ENABLED=False, RATE_LIMIT_ENABLED=False, TRACKING_ENABLED=False)
+class ScreeningTests(IsolatedTestCase):
+    boat = (480, 240, 240, 160)  # 8% of the frame, 3 dHash bits from the empty scene
+
+    def upload(self, image):
+        response = self.client.post(
+            '/upload-image/', data=jpeg(image), content_type='image/jpeg', HTTP_X_CAMERA_ID='cam1'
+        )
+        return response.json()
+
+    def test_boat_entering_an_empty_scene_is_detected(self):
+        # Same scene by dHash: the empty frame's verdict must not be reused
+        self.assertLessEqual(hamming(dhash(Frame(jpeg(sea()))), dhash(Frame(jpeg(sea(self.boat))))), 4)
+        for _ in range(3):
+            self.assertEqual(self.upload(sea())["status"], 'rejected')
+        result = self.upload(sea(self.boat))
+        self.assertEqual(result["status"], 'received')
+        self.assertEqual(BoatCapture.objects.count(), 1)
+
+    def test_repeated_capture_is_a_duplicate(self):
+        self.upload(sea())
+        first = self.upload(sea(self.boat))
+        again = self.upload(sea(self.boat))
+        self.assertEqual((again["status"], again["duplicate_of"]), ('duplicate', first["id"]))
+        self.assertEqual(BoatCapture.objects.count(), 1)
+
+    def test_static_scene_skips_detection(self):
+        self.upload(sea())
+        result = self.upload(sea())
+        self.assertEqual(result["status"], 'rejected')
+
+
+# ============================================
+# SAMPLED EARLY EXIT
+# ============================================
+
+@override_settings(COLOR_SAMPLING_ENABLED=True, COLOR_SCREENING_SCALE=1)
+class ColorSamplingTests(TestCase):
+    def noise(self):
+        rng = np.random.default_rng(1)
+        return cv2.GaussianBlur(rng.integers(0, 255, (600, 800, 3), dtype=np.uint8), (31, 31), 0)
+
+    def test_sampling_rejects_a_full_resolution_frame(self):
+        with mock.patch.object(sampling, 'sample_round', wraps=sampling.sample_round) as rounds:
+            self.assertEqual(detect_colored_boat(jpeg(self.noise()))[:2], (False, None))
+        self.assertGreater(rounds.call_count, 0)
+
+    def test_same_verdict_as_the_full_scan(self):
+        image = sea(boat=(200, 250, 220, 160))
+        sampled = detect_colored_boat(jpeg(image))
+        with self.settings(COLOR_SAMPLING_ENABLED=False):
+            self.assertEqual(sampled[:3], detect_colored_boat(jpeg(image))[:3])
+        self.assertTrue(sampled[0])
+
+    def test_stops_sampling_once_color_is_certainly_present(self):
+        image = sea(boat=(0, 0, 800, 300))  # Half the frame red
+        with mock.patch.object(sampling, 'sample_round', wraps=sampling.sample_round) as rounds:
+            detected, color, percentage, _ = detect_colored_boat(jpeg(image))
+        self.assertEqual(rounds.call_count, 1)
+        self.assertEqual((detected, color), (True, 'RED'))
+
+    def test_not_used_on_reduced_decodes(self):
+        with self.settings(COLOR_SCREENING_SCALE=4), \
+                mock.patch.object(sampling, 'sample_round', wraps=sampling.sample_round) as rounds:
+            detect_colored_boat(jpeg(self.noise()))
+        self.assertEqual(rounds.call_count, 0)
+
+
+# ============================================
+# CAMERA REGISTRATION
+# ============================================
+
+@override_settings(INGEST_QUEUE_ENABLED=True, RATE_LIMIT_ENABLED=False)
+class CameraRegistrationTests(IsolatedTestCase):
+    def upload(self, camera_id, token=None):
+        headers = {'HTTP_X_CAMERA_ID': camera_id}
+        if token:
+            headers['HTTP_X_CAMERA_TOKEN'] = token
+        return self.client.post('/upload-image/', data=jpeg(sea()), content_type='image/jpeg', **headers)
+
+    def test_unknown_camera_refused_by_default(self):
+        self.assertEqual(self.upload('intruder', 'secret').status_code, 403)
+        self.assertFalse(Camera.objects.filter(camera_id='intruder').exists())
+
+    @override_settings(CAMERA_AUTO_REGISTER=True)
+    def test_auto_register_needs_a_token_which_then_sticks(self):
+        self.assertEqual(self.upload('cam2').status_code, 403)
+        self.assertEqual(self.upload('cam2', 'secret').status_code, 202)
+        self.assertEqual(Camera.objects.get(camera_id='cam2').token, 'secret')
+        self.assertEqual(self.upload('cam2', 'guess').status_code, 401)
+        self.assertEqual(self.upload('cam2').status_code, 401)
+
+    @override_settings(CAMERA_AUTO_REGISTER=True, CAMERA_AUTO_REGISTER_MAX=3)
+    def test_auto_register_is_capped(self):
+        # 'default' (migration) + cam1 + cam2
+        self.assertEqual(self.upload('cam2', 'a').status_code, 202)
+        self.assertEqual(self.upload('cam3', 'b').status_code, 403)
+        self.assertEqual(Camera.objects.count(), 3)
+
+    def test_unconfigured_device_works_out_of_the_box(self):
+        # Stock firmware: no X-Camera-Id, no token → the 'default' camera
+        response = self.client.post('/upload-image/', data=jpeg(sea()), content_type='image/jpeg')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(IngestJob.objects.get().camera_id, 'default')
+        self.assertEqual(self.upload('default').status_code, 202)
+        self.assertEqual(self.client.get('/check-capture/').json()["capture"], False)
+
+
+# ============================================
+# CONTENT-ADDRESSED STORAGE
+# ============================================
+
+class StorageTests(IsolatedTestCase):
+    def store(self, data):
+        name = capture_storage().save('captures/a.jpg', ContentFile(data))
+        return BoatCapture.objects.create(image=name, image_sha256=sha256_hex(data))
+
+    def delete(self, capture):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                capture.delete()
+                release_image(capture.image.name, capture.image_sha256)
+
+    def test_shared_file_removed_with_its_last_reference(self):
+        first, second = self.store(b'same bytes'), self.store(b'same bytes')
+        self.assertEqual(first.image.name, second.image.name)
+        path = first.image.path
+
+        self.delete(first)
+        self.assertTrue(os.path.exists(path))
+        self.delete(second)
+        self.assertFalse(os.path.exists(path))
+
+    def test_rollback_keeps_the_file(self):
+        capture = self.store(b'bytes')
+        pk = capture.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                capture.delete()
+                release_image(capture.image.name, capture.image_sha256)
+                raise RuntimeError("rolled back")
+        self.assertTrue(BoatCapture.objects.filter(pk=pk).exists())
+        self.assertTrue(os.path.exists(capture.image.path))
+
+    def test_release_racing_an_identical_save_keeps_the_file(self):
+        old = self.store(b'same bytes')
+        path = old.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                name = capture_storage().save('captures/b.jpg', ContentFile(b'same bytes'))  # Exists: no write
+                BoatCapture.objects.create(image=name, image_sha256=sha256_hex(b'same bytes'))
+                os.remove(path)  # The old capture's release committed meanwhile and unlinked it
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'same bytes')
+
+    def test_spool_file_published_by_hard_link(self):
+        spool_path = os.path.join(self.tmp, 'upload.jpg')
+        with open(spool_path, 'wb') as f:
+            f.write(b'spooled bytes')
+        name = capture_storage().save_file('captures/a.jpg', spool_path, sha256_hex(b'spooled bytes'))
+        path = capture_storage().path(name)
+        self.assertTrue(os.path.samefile(spool_path, path))
+
+        os.remove(spool_path)  # Spool cleanup leaves the capture
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'spooled bytes')
+
+
+# ============================================
+# RATE LIMIT + ADMISSION
+# ============================================
+
+class AdmissionTests(IsolatedTestCase):
+    def upload(self):
+        return self.client.post(
+            '/upload-image/', data=jpeg(sea()), content_type='image/jpeg', HTTP_X_CAMERA_ID='cam1'
+        )
+
+    @override_settings(RATE_LIMIT_BURST=1, INGEST_QUEUE_ENABLED=True)
+    def test_rate_limit_answers_429_with_retry_after(self):
+        self.assertEqual(self.upload().status_code, 202)
+        response = self.upload()
+        self.assertEqual(response.status_code, 429)
+        # capture_interval 8 s, headroom 2x → one upload per 4 s
+        self.assertEqual(response['Retry-After'], '4')
+        self.assertEqual(response.json()["retry_after"], 4)
+
+    @override_settings(RATE_LIMIT_BURST=1)
+    def test_buckets_are_shared_between_processes(self):
+        other_process = admission.RateLimiter(os.path.join(self.tmp, 'admission', 'buckets'))
+        self.assertEqual(other_process.check('cam1', 8), 0.0)
+        self.assertGreater(admission.get_rate_limiter().check('cam1', 8), 0.0)
+
+    @override_settings(RATE_LIMIT_ENABLED=False, INGEST_QUEUE_ENABLED=True, ADMISSION_MAX_IN_FLIGHT=2)
+    def test_busy_when_the_host_slots_are_taken(self):
+        # Another worker process holds every slot
+        other_process = slots.FlockSlots(os.path.join(self.tmp, 'admission'), 'upload', 2)
+        held = [other_process.acquire(), other_process.acquire()]
+        response = self.upload()
+        self.assertEqual((response.status_code, response.json()["reason"]), (503, 'busy'))
+        self.assertIn('Retry-After', response)
+
+        other_process.release(held.pop())
+        self.assertEqual(self.upload().status_code, 202)
+        self.assertEqual(admission.get_admission().slots().held_here(), 0)  # Released after the request
+
+    @override_settings(RATE_LIMIT_ENABLED=False, INGEST_QUEUE_ENABLED=False, ADMISSION_MAX_INLINE=1)
+    def test_inline_mode_has_its_own_limit(self):
+        other_process = slots.FlockSlots(os.path.join(self.tmp, 'admission'), 'inline', 1)
+        held = other_process.acquire()
+        self.assertEqual(self.upload().status_code, 503)
+        other_process.release(held)
+        self.assertEqual(self.upload().status_code, 200)
+
+    @override_settings(RATE_LIMIT_ENABLED=False, INGEST_QUEUE_ENABLED=True, INGEST_MAX_BACKLOG=2)
+    def test_backlog(self):
+        enqueue_upload(b'frame', 'a.jpg')
+        enqueue_upload(b'frame', 'b.jpg')
+        response = self.upload()
+        self.assertEqual((response.status_code, response.json()["reason"]), (503, 'backlog'))
+
+
+# ============================================
+# MAINTENANCE SCHEDULER
+# ============================================
+
+class MaintenanceTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        overrides = override_settings(
+            MAINTENANCE_LOCK_FILE=os.path.join(self.tmp, 'maintenance.lock'),
+            MAINTENANCE_STATUS_FILE=os.path.join(self.tmp, 'maintenance_status.json'),
+            MAINTENANCE_FILE_MAX_AGE=60,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def touch(self, path, age=0):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x')
+        past = time.time() - age
+        os.utime(path, (past, past))
+
+    def test_jobs_run_when_due_and_only_on_the_leader(self):
+        scheduler = maintenance.MaintenanceScheduler()
+        with mock.patch.object(maintenance.connection, 'close'):  # Keep the test transaction
+            self.assertEqual(set(scheduler.tick()), set(maintenance.JOBS))
+        self.assertEqual(scheduler.tick(), [])  # Not due yet
+        self.assertEqual(maintenance.read_status()["leader_pid"], os.getpid())
+
+        follower = maintenance.MaintenanceScheduler()
+        if maintenance.fcntl:
+            self.assertEqual(follower.tick(force=True), [])  # Lock held by the leader
+        os.close(scheduler.lock_fd)
+
+    def test_orphaned_spool_files_removed_queued_ones_kept(self):
+        queued = enqueue_upload(b'frame', 'a.jpg')
+        os.utime(queued.spool_path, (time.time() - 600, time.time() - 600))
+        orphan = os.path.join(self.tmp, 'spool', 'orphan.jpg')
+        fresh = os.path.join(self.tmp, 'spool', 'fresh.jpg')
+        self.touch(orphan, age=600)
+        self.touch(fresh)
+
+        self.assertEqual(maintenance.clean_spool()["removed"], 1)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(fresh))  # Younger than MAINTENANCE_FILE_MAX_AGE
+        self.assertTrue(os.path.exists(queued.spool_path))
+
+    def test_each_job_runs_on_its_own_interval(self):
+        calls = []
+
+        def failing():
+            calls.append('failing')
+            raise OSError("disk gone")
+
+        jobs = {'often': lambda: calls.append('often') or {}, 'failing': failing}
+        clock = mock.Mock(return_value=1000.0)
+        with mock.patch.dict(maintenance.JOBS, jobs, clear=True), \
+                mock.patch.object(maintenance.time, 'monotonic', clock), \
+                mock.patch.object(maintenance.connection, 'close'), \
+                self.settings(MAINTENANCE_INTERVALS={'often': 10, 'failing': 100}):
+            scheduler = maintenance.MaintenanceScheduler()
+            self.assertEqual(scheduler.tick(), ['often', 'failing'])  # A failing job doesn't stop the others
+            clock.return_value += 15
+            self.assertEqual(scheduler.tick(), ['often'])
+            clock.return_value += 90
+            self.assertEqual(scheduler.tick(), ['often', 'failing'])
+            os.close(scheduler.lock_fd)
+        self.assertEqual(calls, ['often', 'failing', 'often', 'often', 'failing'])
+        self.assertEqual(maintenance.read_status()["jobs"]["failing"]["error"], "disk gone")
+
+    def test_another_process_takes_over_when_the_leader_exits(self):
+        leader, follower = maintenance.MaintenanceScheduler(), maintenance.MaintenanceScheduler()
+        self.assertTrue(leader.try_lead())
+        if maintenance.fcntl:
+            self.assertFalse(follower.try_lead())
+        os.close(leader.lock_fd)  # The kernel drops the lock of a process that died
+        self.assertTrue(follower.try_lead())
+        os.close(follower.lock_fd)
+
+    @override_settings(MAINTENANCE_BATCH_SIZE=2, INGEST_JOB_RETENTION_DAYS=7)
+    def test_old_finished_jobs_pruned_in_batches(self):
+        old = timezone.now() - datetime.timedelta(days=8)
+        for status in ('done', 'done', 'failed', 'done', 'failed'):
+            IngestJob.objects.create(filename='a.jpg', spool_path='a', status=status, finished_at=old)
+        recent = IngestJob.objects.create(filename='b.jpg', spool_path='b', status='done', finished_at=timezone.now())
+        queued = enqueue_upload(b'frame', 'c.jpg')
+
+        self.assertEqual(maintenance.prune_ingest_jobs(), {"removed": 5})
+        self.assertEqual(set(IngestJob.objects.values_list('id', flat=True)), {recent.id, queued.id})
+
+    def test_capture_temp_files_removed(self):
+        stale = os.path.join(self.tmp, 'media', 'captures', 'ab', 'abc.jpg.123.tmp')
+        image = os.path.join(self.tmp, 'media', 'captures', 'ab', 'abc.jpg')
+        self.touch(stale, age=600)
+        self.touch(image, age=600)
+        self.assertEqual(maintenance.clean_capture_temp_files(), {"scanned": 1, "removed": 1})
+        self.assertTrue(os.path.exists(image))
+
+    def test_legacy_live_folder_removed_once(self):
+        folder = os.path.join(self.tmp, 'media', 'live_monitoring')
+        self.touch(os.path.join(folder, 'capture_1.jpg'))
+        self.touch(os.path.join(folder, 'cam1', 'capture_2.jpg'))
+        self.assertEqual(maintenance.clean_legacy_live_folder(), {"removed": 2})
+        self.assertFalse(os.path.exists(folder))
+        self.assertEqual(maintenance.clean_legacy_live_folder(), {"removed": 0})
+
+
+# ============================================
+# LIVE STREAM VIEWERS
+# ============================================
+
+class LiveRingTests(TestCase):
+    def ring(self, max_frames=4, capacity=1000):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        return live.LiveRing(os.path.join(tmp, 'cam1.ring'), max_frames, capacity)
+
+    def test_oldest_frames_are_overwritten_by_count(self):
+        ring = self.ring(max_frames=4, capacity=10000)
+        for i in range(1, 7):
+            self.assertEqual(ring.publish(bytes([i]) * 100, f'{i}.jpg'), i)
+        self.assertEqual([f["seq"] for f in ring.latest(10)], [6, 5, 4, 3])
+        self.assertIsNone(ring.read(2))
+        self.assertEqual(ring.read(3)["filename"], '3.jpg')
+
+    def test_frames_wrap_around_the_data_ring_intact(self):
+        ring = self.ring(max_frames=8, capacity=1000)
+        frames = [bytes([i]) * 300 for i in range(1, 6)]
+        for i, data in enumerate(frames):
+            ring.publish(data, f'{i}.jpg')
+        # Frame 4 wrapped to the start over frame 1, frame 5 over frame 2
+        self.assertIsNone(ring.read(1))
+        self.assertIsNone(ring.read(2))
+        self.assertEqual([f["data"] for f in ring.latest(8)], frames[:1:-1])
+        self.assertIsNone(ring.publish(b'x' * 1001, 'huge.jpg'))  # Larger than the ring
+
+    def test_other_processes_see_published_frames(self):
+        ring = self.ring()
+        ring.publish(b'frame', 'a.jpg')
+        other = live.LiveRing(ring.path, ring.max_frames, ring.capacity)  # Another worker's mapping
+        self.assertEqual(other.latest()[0]["data"], b'frame')
+        other.publish(b'next', 'b.jpg')
+        self.assertEqual(ring.latest()[0]["data"], b'next')
+
+        resized = live.LiveRing(ring.path, 16, ring.capacity)  # LIVE_BUFFER_* changed: start empty
+        self.assertEqual(resized.latest(), [])
+
+    def test_slow_viewer_drops_the_oldest_frames(self):
+        ring = self.ring(max_frames=16, capacity=10000)
+        ring.publish(b'0', '0.jpg')
+        client = live.StreamClient(ring, queue_size=3)
+        for i in range(1, 8):
+            ring.publish(bytes([i]), f'{i}.jpg')
+        client.poll()
+        sent = [client.next_frame()["seq"] for _ in range(3)]
+        self.assertEqual(sent, [6, 7, 8])
+        self.assertIsNone(client.next_frame())
+        self.assertEqual(client.dropped, 5)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False, LIVE_STREAM_MAX_CLIENTS=1)
+class LiveStreamTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        live.get_ring('cam1').publish(jpeg(sea()), 'frame.jpg')
+
+    def test_viewer_limit_is_host_wide(self):
+        # Another worker process holds the only viewer slot
+        other_process = slots.FlockSlots(os.path.join(self.tmp, 'live'), 'stream', 1)
+        held = other_process.acquire()
+        self.assertEqual(self.client.get('/live/cam1/stream/').status_code, 503)
+
+        other_process.release(held)
+        response = self.client.get('/live/cam1/stream/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(other_process.acquire())  # Held by the open stream
+        response.close()
+        self.assertIsNotNone(other_process.acquire())
+
+    @override_settings(LIVE_STREAM_MAX_SECONDS=120)
+    def test_dashboard_reconnects_before_the_stream_ends(self):
+        # A stream that ends normally fires no <img> error: the page must time it
+        for url in ('/gallery/', '/approved/', '/warnings/'):
+            self.assertContains(self.client.get(url), 'const LIVE_STREAM_SECONDS = 120;')
+
+
+# ============================================
+# DETECTION POOL
+# ============================================
+
+class DetectionPoolTests(TestCase):
+    frames = [jpeg(sea()), jpeg(sea((200, 250, 220, 160))), jpeg(sea((100, 100, 480, 240)))]
+
+    def run_on(self, pool):
+        self.addCleanup(pool.shutdown)
+        return [result[:3] for result in pool.map(detect_colored_boat, self.frames)]
+
+    def test_pool_matches_inline_detection_in_input_order(self):
+        inline = self.run_on(executor.DetectionExecutor(0))
+        pooled = executor.DetectionExecutor(2)
+        self.assertEqual(self.run_on(pooled), inline)
+        self.assertEqual([verdict[0] for verdict in inline], [False, True, True])
+        self.assertLess(inline[1][2], inline[2][2])
+        stats = pooled.stats()
+        self.assertEqual((stats["completed"], stats["failed"], stats["in_flight"]), (3, 0, 0))
+
+    def test_errors_reach_the_caller(self):
+        pool = executor.DetectionExecutor(0)
+        with self.assertRaises(TypeError):
+            pool.run(detect_colored_boat)
+        self.assertEqual(pool.stats()["failed"], 1)
+
+
+class PoolShareTests(TestCase):
+    def tearDown(self):
+        executor.share_pool(1)
+
+    @override_settings(DETECTION_POOL_SIZE=8)
+    def test_gunicorn_workers_split_the_host_pool(self):
+        self.assertEqual(executor.pool_size(), 8)
+        executor.share_pool(3)
+        self.assertEqual(executor.pool_size(), 2)
+        executor.share_pool(16)
+        self.assertEqual(executor.pool_size(), 1)
+
+    @override_settings(DETECTION_POOL_SIZE=0)
+    def test_inline_stays_inline(self):
+        executor.share_pool(4)
+        self.assertEqual(executor.pool_size(), 0)
+
+
+# ============================================
+# INFERENCE DAEMON
+# ============================================
+
+class FakeDetector:
+    """Records the batches it is given, one box per image (its width)"""
+
+    def __init__(self):
+        self.batches = []
+
+    def detect_batch(self, images, min_confidences, image_size=None):
+        self.batches.append(len(images))
+        return [[{"bbox": [0, 0, image.shape[1], image.shape[0]], "confidence": c}]
+                for image, c in zip(images, min_confidences)]
+
+
+class InferenceDaemonTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        path = os.path.join(tmp, 'inference.sock')
+        self.detector = FakeDetector()
+        server = inference.InferenceServer(self.detector, path, batch_max=8, batch_wait=0.05)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        while not os.path.exists(path):
+            threading.Event().wait(0.01)
+        self.client = inference.InferenceClient(path, timeout=5)
+        self.addCleanup(self.client._close)
+
+    def test_crops_of_a_frame_share_one_request_and_batch(self):
+        crops = [np.zeros((32, width, 3), np.uint8) for width in (40, 50, 60)]
+        results = self.client.detect_batch(crops, 0.5, 320)
+        self.assertEqual([boxes[0]["bbox"][2] for boxes in results], [40, 50, 60])
+        self.assertEqual(self.detector.batches, [3])
+
+    def test_malformed_request_gets_an_error_reply(self):
+        sock = self.client._connect()
+        sock.sendall(inference.REQUEST.pack(1, 0.5, 0) + inference.SHAPE.pack(16, 16, 2))
+        length = inference.RESPONSE.unpack(inference.recv_exact(sock, inference.RESPONSE.size))[0]
+        self.assertIn("error", json.loads(inference.recv_exact(sock, length)))
+        self.client._close()
+        # The daemon keeps serving
+        self.assertEqual(len(self.client.detect(np.zeros((16, 24), np.uint8), 0.25)), 1)
+
+    def test_single_image(self):
+        boxes = self.client.detect(np.zeros((16, 24), np.uint8), 0.25)
+        self.assertEqual(boxes, [{"bbox": [0, 0, 24, 16], "confidence": 0.25}])
+
+
+# ============================================
+# ONNX RUNTIME BACKEND (post-processing only: onnxruntime isn't needed)
+# ============================================
+
+class FakeSession:
+    """Static-batch session returning one prepared YOLOv8 output per run"""
+
+    def __init__(self, output):
+        self.output = output
+        self.inputs = []
+
+    def run(self, names, feeds):
+        self.inputs.append(feeds['images'])
+        return [self.output[None]]
+
+
+@override_settings(ML_NMS_IOU=0.45)
+class OnnxPostProcessingTests(TestCase):
+    def detector(self, output=None):
+        detector = object.__new__(detectors.OnnxBoatDetector)
+        detector.names = {0: 'person', 1: 'boat'}
+        detector.class_ids = detectors.boat_class_ids(detector.names, ['Boat'], 'test model')
+        detector._class_array = np.array(detector.class_ids, dtype=np.int64)
+        detector.image_size, detector.fixed_size, detector.dynamic_batch = 640, None, False
+        detector.input_name, detector.session = 'images', FakeSession(output)
+        return detector
+
+    def output(self):
+        """800x600 frame letterboxed to 640: scale 0.8, 80 px bars top and bottom"""
+        def anchor(x, y, w, h, person, boat):
+            return [(x + w / 2) * 0.8, (y + h / 2) * 0.8 + 80, w * 0.8, h * 0.8, person, boat]
+        return np.array([
+            anchor(100, 100, 200, 100, 0.95, 0.9),   # Boat (person score ignored)
+            anchor(104, 102, 200, 100, 0.0, 0.8),    # Same boat, weaker: suppressed
+            anchor(500, 300, 120, 80, 0.0, 0.7),     # Second boat
+            anchor(300, 400, 50, 50, 0.0, 0.3),      # Below min_confidence
+            anchor(600, 50, 40, 90, 0.99, 0.1),      # Person only
+            anchor(740, 560, 100, 80, 0.0, 0.6),     # Boat over the frame edge
+        ], dtype=np.float32).T
+
+    def test_class_filter_nms_and_boxes_in_frame_pixels(self):
+        results = self.detector().boxes(self.output(), 0.8, (0, 80), (600, 800), 0.5)
+        self.assertEqual([r["class"] for r in results], ['boat'] * 3)
+        self.assertEqual([round(r["confidence"], 2) for r in results], [0.9, 0.7, 0.6])
+        expected = [[100, 100, 200, 100], [500, 300, 120, 80], [740, 560, 60, 40]]  # Last one clipped
+        for result, box in zip(results, expected):
+            for value, wanted in zip(result["bbox"], box):
+                self.assertAlmostEqual(value, wanted, delta=1)
+
+    def test_nothing_above_min_confidence(self):
+        self.assertEqual(self.detector().boxes(self.output(), 0.8, (0, 80), (600, 800), 0.95), [])
+
+    def test_static_model_runs_once_per_image(self):
+        detector = self.detector(self.output())
+        results = detector.detect_batch([sea(), sea()], [0.5, 0.8])
+        self.assertEqual([len(r) for r in results], [3, 1])
+        self.assertEqual([batch.shape for batch in detector.session.inputs], [(1, 3, 640, 640)] * 2)
+        self.assertLessEqual(detector.session.inputs[0].max(), 1.0)
+
+    def test_letterbox_keeps_aspect_ratio(self):
+        padded, scale, pad = detectors.letterbox(sea(), 640)
+        self.assertEqual((padded.shape, scale, pad), ((640, 640, 3), 0.8, (0, 80)))
+        self.assertEqual(padded[0, 0].tolist(), [114, 114, 114])
+        self.assertEqual(padded[320, 320].tolist(), [200, 120, 40])
+
+
+# ============================================
+# VESSEL TRACKING
+# ============================================
+
+@override_settings(INGEST_QUEUE_ENABLED=False, RATE_LIMIT_ENABLED=False, TRACKING_ENABLED=True)
+class TrackingTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        # Frames 8 s apart (the tracker predicts from elapsed time)
+        self.clock = mock.Mock()
+        self.clock.monotonic.return_value = 1000.0
+        patcher = mock.patch.object(tracking, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, image):
+        self.clock.monotonic.return_value += 8
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/upload-image/', data=jpeg(image), content_type='image/jpeg', HTTP_X_CAMERA_ID='cam1'
+            )
+        return response.json()
+
+    def cross(self, frames):
+        """A 240x160 boat moving 40 px right per frame, after one empty frame"""
+        self.upload(sea())
+        return [self.upload(sea((80 + 40 * i, 240, 240, 160)))["status"] for i in range(frames)]
+
+    def test_one_capture_per_vessel(self):
+        self.assertEqual(self.cross(6), ['received'] + ['tracked'] * 5)
+        capture = BoatCapture.objects.get()
+        self.assertEqual(capture.track_frames, 6)
+
+    def test_boat_gone_is_not_tracked(self):
+        self.cross(3)
+        # Water still moves where the boat was, but there is no boat in it
+        result = self.upload(sea())
+        self.assertEqual(result["status"], 'rejected')
+        self.assertEqual(BoatCapture.objects.get().track_frames, 3)
+
+    def test_moored_boat_stays_tracked(self):
+        self.cross(3)
+        moored = sea((160, 240, 240, 160))  # Same place as the last frame, no motion
+        statuses = [self.upload(moored)["status"] for _ in range(6)]
+        self.assertNotIn('rejected', statuses)
+        self.assertNotIn('duplicate', statuses)
+        self.assertEqual(BoatCapture.objects.get().track_frames, 9)
+
+    def test_rolled_back_save_leaves_no_track(self):
+        self.upload(sea())
+        with mock.patch('camera.views.BoatCapture.objects.create', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                self.upload(sea((80, 240, 240, 160)))
+        self.assertEqual(tracking.get_tracker().match('cam1', [[120, 240, 240, 160]]), ([], [0]))
+        self.assertEqual(self.upload(sea((160, 240, 240, 160)))["status"], 'received')
@@ -0,0 +1,247 @@
+"""
+Per-camera vessel tracking (SORT-style: boxes + motion, no appearance)
+
+A boat crossing the view used to create a new capture every capture
+interval. Each camera now keeps its live tracks: the box of a detected
+vessel plus its velocity. A new detection is matched to the track whose
+predicted box (last box moved by velocity x elapsed time) overlaps it
+most (IoU >= TRACK_IOU_THRESHOLD), or whose centre is within
+TRACK_MAX_DISTANCE box diagonals when the boat moved further than its own
+size. Matching is greedy, best pair first. A track that is not matched
+for TRACK_MAX_AGE seconds ends.
+
+One track = one capture: the first frame creates the BoatCapture, later
+frames only update it (frame count, last seen, and the image while the
+capture is pending and the vessel is seen larger). match() only reads the
+tracks; apply() records the frame once its capture is committed, so a
+frame whose save rolls back leaves no track pointing at a missing capture.
+A track confirmed by TRACK_MIN_HITS frames also lets detection be
+skipped for up to TRACK_SKIP_FRAMES frames in a row, as long as the
+frame's motion lies inside the predicted boxes of confirmed tracks (or
+their last TRACK_TRAIL_FRAMES boxes: the background model still sees a
+moving boat's wake there for a while) and each predicted box still shows
+the track's color (TRACK_MIN_COLOR): motion alone may be the water after
+the boat has left.
+State is per process, like the motion / dedupe caches.
+"""
+import time
+import threading
+from collections import OrderedDict, deque
+
+from django.conf import settings
+
+try:
+    import cv2
+    import numpy as np
+    CV_AVAILABLE = True
+except ImportError:
+    CV_AVAILABLE = False
+
+
+def iou(a, b):
+    """Intersection over union of two [x, y, w, h] boxes"""
+    width = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    height = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    overlap = width * height
+    return overlap / (a[2] * a[3] + b[2] * b[3] - overlap)
+
+
+def centre_distance(a, b):
+    """Distance between box centres in units of a's diagonal"""
+    dx = (a[0] + a[2] / 2) - (b[0] + b[2] / 2)
+    dy = (a[1] + a[3] / 2) - (b[1] + b[3] / 2)
+    return (dx * dx + dy * dy) ** 0.5 / max((a[2] ** 2 + a[3] ** 2) ** 0.5, 1)
+
+
+def vessel_boxes(verdict):
+    """Boxes to track in a detected frame: the blobs of the color that made it suspicious"""
+    return [blob["bbox"] for blob in verdict.get("blobs", []) if blob["color"] == verdict.get("color")]
+
+
+class Track:
+    def __init__(self, track_id, bbox, verdict, now):
+        self.id = track_id
+        self.bbox = list(bbox)
+        self.trail = deque([self.bbox], maxlen=settings.TRACK_TRAIL_FRAMES)
+        self.velocity = (0.0, 0.0)          # Pixels per second (box origin)
+        self.hits = 1
+        self.skipped = 0                    # Frames in a row whose detection was skipped
+        self.best_area = bbox[2] * bbox[3]  # Largest view of the vessel so far
+        self.verdict = verdict              # Last detection verdict (reused for skipped frames)
+        self.capture_id = None
+        self.updated_at = now
+
+    @property
+    def confirmed(self):
+        return self.hits >= settings.TRACK_MIN_HITS
+
+    def predict(self, now):
+        elapsed = now - self.updated_at
+        return [
+            self.bbox[0] + self.velocity[0] * elapsed,
+            self.bbox[1] + self.velocity[1] * elapsed,
+            self.bbox[2],
+            self.bbox[3],
+        ]
+
+    def update(self, bbox, verdict, now):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.velocity = ((bbox[0] - self.bbox[0]) / elapsed, (bbox[1] - self.bbox[1]) / elapsed)
+        self.bbox = list(bbox)
+        self.trail.append(self.bbox)
+        self.hits += 1
+        self.skipped = 0
+        self.verdict = verdict
+        self.updated_at = now
+        self.best_area = max(self.best_area, bbox[2] * bbox[3])
+
+
+def associate(tracks, boxes, now, iou_threshold, max_distance):
+    """
+    Greedy matching, best pair first: IoU with the predicted box, then
+    centre distance for boats that moved more than their own size
+    Returns: (matches [(track, box_index)], unmatched box indexes)
+    """
+    pairs = []
+    for track in tracks:
+        predicted = track.predict(now)
+        for index, box in enumerate(boxes):
+            overlap = iou(predicted, box)
+            distance = centre_distance(predicted, box)
+            if overlap >= iou_threshold or distance <= max_distance:
+                pairs.append((-overlap, distance, id(track), track, index))
+    pairs.sort(key=lambda pair: pair[:3])
+
+    matches, used_tracks, used_boxes = [], set(), set()
+    for _, _, _, track, index in pairs:
+        if track.id in used_tracks or index in used_boxes:
+            continue
+        used_tracks.add(track.id)
+        used_boxes.add(index)
+        matches.append((track, index))
+    return matches, [i for i in range(len(boxes)) if i not in used_boxes]
+
+
+class VesselTracker:
+    """Live tracks for every camera (least recently used camera dropped first)"""
+
+    def __init__(self, max_cameras):
+        self.max_cameras = max_cameras
+        self._cameras = OrderedDict()  # camera_id → [Track]
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def _tracks(self, camera_id, now):
+        tracks = [
+            track for track in self._cameras.get(camera_id, [])
+            if now - track.updated_at <= settings.TRACK_MAX_AGE
+        ]
+        self._cameras[camera_id] = tracks
+        self._cameras.move_to_end(camera_id)
+        while len(self._cameras) > self.max_cameras:
+            self._cameras.popitem(last=False)
+        return tracks
+
+    def match(self, camera_id, boxes):
+        """
+        Match one detected frame's vessel boxes (full-resolution [x, y, w, h])
+        to the camera's tracks - read only, see apply()
+        Returns: (matches [(track, box index, best view so far)], unmatched box indexes)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tracks = self._tracks(camera_id, now)
+            matches, unmatched = associate(
+                tracks, boxes, now, settings.TRACK_IOU_THRESHOLD, settings.TRACK_MAX_DISTANCE
+            )
+        return [
+            (track, index, boxes[index][2] * boxes[index][3] > track.best_area) for track, index in matches
+        ], unmatched
+
+    def apply(self, camera_id, boxes, verdict, matches, unmatched, capture_id):
+        """
+        Record a saved frame (after its commit): move the matched tracks, start
+        a track per unmatched box; tracks without a capture get capture_id
+        """
+        now = time.monotonic()
+        with self._lock:
+            tracks = self._tracks(camera_id, now)
+            for track, index, _ in matches:
+                track.update(boxes[index], verdict, now)
+                track.capture_id = track.capture_id or capture_id
+            for index in unmatched:
+                self._next_id += 1
+                track = Track(f"{camera_id}-{self._next_id}", boxes[index], verdict, now)
+                track.capture_id = capture_id
+                tracks.append(track)
+
+    def captures(self, camera_id):
+        """Capture ids of the camera's live tracks"""
+        with self._lock:
+            return {track.capture_id for track in self._tracks(camera_id, time.monotonic()) if track.capture_id}
+
+    def covering(self, camera_id, foreground, scale, hsv, classifier):
+        """
+        Confirmed tracks whose predicted + recent boxes contain this frame's
+        motion, and whose predicted boxes still show the track's color
+        (no motion at all: a moored boat, still there if its color is)
+        foreground, hsv: motion mask + HSV frame at 1/scale of the full frame
+        Returns: list of tracks (detection can be skipped), or []
+        """
+        if foreground is None or hsv is None or not CV_AVAILABLE:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            tracks = [
+                track for track in self._tracks(camera_id, now)
+                if track.confirmed and track.capture_id and track.skipped < settings.TRACK_SKIP_FRAMES
+            ]
+            if not tracks:
+                return []
+
+            moving = cv2.countNonZero(foreground)
+            covered = np.zeros_like(foreground)
+            for box in (box for track in tracks for box in [track.predict(now), *track.trail]):
+                x1, y1, x2, y2 = padded(box, scale)
+                covered[y1:y2, x1:x2] = 255
+            outside = cv2.countNonZero(cv2.bitwise_and(foreground, cv2.bitwise_not(covered)))
+            if outside > moving * settings.TRACK_MAX_UNCOVERED / 100:
+                return []  # Something moves outside the tracked boats: run detection
+
+            # The boat itself must still be there, not just moving water where it was
+            bits = classifier.classify(hsv)
+            for track in tracks:
+                color = track.verdict.get("color")
+                if color not in classifier.colors:
+                    return []
+                x, y, w, h = track.predict(now)
+                x1, y1, x2, y2 = padded([x, y, w, h], scale)
+                found = cv2.countNonZero(classifier.color_mask(bits[y1:y2, x1:x2], color))
+                if found < (w / scale) * (h / scale) * settings.TRACK_MIN_COLOR / 100:
+                    return []
+
+            for track in tracks:
+                track.skipped += 1
+            return tracks
+
+
+def padded(box, scale):
+    """[x, y, w, h] grown by TRACK_COVER_PADDING, as (x1, y1, x2, y2) at 1/scale (clipped at 0)"""
+    x, y, w, h = box
+    padding = settings.TRACK_COVER_PADDING
+    x1, y1 = int((x - w * padding) / scale), int((y - h * padding) / scale)
+    x2, y2 = int((x + w * (1 + padding)) / scale) + 1, int((y + h * (1 + padding)) / scale) + 1
+    return max(x1, 0), max(y1, 0), max(x2, 0), max(y2, 0)
+
+
+_tracker = None
+
+
+def get_tracker():
+    global _tracker
+    if _tracker is None:
+        _tracker = VesselTracker(settings.TRACK_MAX_CAMERAS)
+    return _tracker
@@ -1,105 +1,34 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_exempt
 from django.core.files.base import ContentFile
 from django.utils import timezone
+from django.db import transaction
 from django.conf import settings
-from .models import BoatCapture, RegisteredBoat, CaptureRequest
+from django.db.models import Q, F
+from .models import BoatCapture, RegisteredBoat, CaptureRequest, IngestJob, Camera
+from .ingest import enqueue_upload
+from .detection import analyze_frame
+from .executor import get_executor, executor_stats
+from .batch import parse_batch, BatchFormatError
+from .jpeg import read_jpeg_upload, validate_jpeg, JpegValidationError
+from .frame import Frame
+from .dedupe import dhash, get_dedupe_cache
+from .motion import get_motion_gate
+from .tracking import get_tracker, vessel_boxes
+from .profiles import get_active_profile
+from .cameras import get_camera, register_camera
+from .admission import get_admission, get_rate_limiter
+from .storage import capture_storage, release_image, sha256_hex
+from .live import get_ring, ring_exists, acquire_stream, MjpegStream, BOUNDARY
+from .maintenance import read_status as maintenance_status
 import os
-import glob
 import time
-# QR Code Scanner Libraries - OpenCV (Windows-friendly, no DLL issues)
-try:
-    import cv2
-    import numpy as np
-    QR_AVAILABLE = True
-except ImportError:
-    # OpenCV not available
-    QR_AVAILABLE = False
-# ML Boat Detection Libraries (Optional - graceful fallback if not available)
-try:
-    from ultralytics import YOLO
-    import cv2
-    import numpy as np
-    ML_AVAILABLE = True
-except ImportError:
-    ML_AVAILABLE = False
 from math import radians, cos, sin, asin, sqrt
 import datetime
 import json
-import io
-
-
-# 🎨 Color Detection Function for RED and BLUE boats
-def detect_colored_boat(img_data):
-    """
-    Detect RED or BLUE colored boats in image using HSV color space
-    Returns: (detected, color, percentage)
-    - detected: True if RED or BLUE boat found
-    - color: 'RED' or 'BLUE' or None
-    - percentage: percentage of image that is the detected color
-    """
-    if not QR_AVAILABLE:  # cv2 and numpy needed
-        return False, None, 0.0
-
-    try:
-        # Convert bytes to numpy array
-        nparr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-        if img is None:
-            return False, None, 0.0
-
-        # Convert BGR to HSV (better for color detection)
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-
-        # Total pixels in image
-        total_pixels = img.shape[0] * img.shape[1]
-
-        # Get color ranges from settings
-        color_ranges = settings.COLOR_RANGES
-        min_threshold = settings.COLOR_DETECTION_MIN_THRESHOLD
-        max_threshold = settings.COLOR_DETECTION_MAX_THRESHOLD
-
-        detected_colors = []
-
-        # Check each color
-        for color_name, ranges in color_ranges.items():
-            total_color_pixels = 0
-
-            # Check all ranges for this color (RED has 2 ranges)
-            for color_range in ranges:
-                lower = np.array(color_range['lower'])
-                upper = np.array(color_range['upper'])
-
-                # Create mask for this color range
-                mask = cv2.inRange(hsv, lower, upper)
-
-                # Count colored pixels
-                color_pixels = cv2.countNonZero(mask)
-                total_color_pixels += color_pixels
-
-            # Calculate percentage
-            percentage = (total_color_pixels / total_pixels) * 100
-
-            # Check if within valid range (not too small, not too big)
-            if min_threshold <= percentage <= max_threshold:
-                detected_colors.append({
-                    'color': color_name,
-                    'percentage': round(percentage, 2)
-                })
-
-        # Return highest percentage color
-        if detected_colors:
-            detected_colors.sort(key=lambda x: x['percentage'], reverse=True)
-            best = detected_colors[0]
-            return True, best['color'], best['percentage']
-
-        return False, None, 0.0
-
-    except Exception as e:
-        print(f"❌ Color detection error: {str(e)}")
-        return False, None, 0.0
+import re
+import math
 
 
 # GPS Distance Calculator (Haversine Formula)
@@ -125,99 +54,19 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     return c * r
 
 
-# Live Monitoring Folder Cleanup
-def cleanup_live_folder():
-    """
-    Delete images older than 5 minutes from live monitoring folder
-    """
-    try:
-        live_folder = os.path.join(settings.MEDIA_ROOT, 'live_monitoring')
-        if not os.path.exists(live_folder):
-            return
-
-        current_time = time.time()
-        max_age = 5 * 60  # 5 minutes in seconds
-
-        # Find all jpg files in live folder
-        pattern = os.path.join(live_folder, '*.jpg')
-        files = glob.glob(pattern)
-
-        deleted_count = 0
-        for file_path in files:
-            file_age = current_time - os.path.getmtime(file_path)
-            if file_age > max_age:
-                os.remove(file_path)
-                deleted_count += 1
-
-        if deleted_count > 0:
-            print(f"🗑️ Cleaned up {deleted_count} old images from live monitoring folder")
-    except Exception as e:
-        print(f"⚠️ Cleanup error: {str(e)}")
-
-
-def save_to_live_monitoring(image_data, filename):
+def save_to_live_monitoring(image_data, filename, camera_id='default'):
     """
-    Save image to live monitoring folder (5 min auto-delete)
+    Publish image to the camera's live monitoring ring buffer (see live.py)
+    Bounded by LIVE_BUFFER_FRAMES / LIVE_BUFFER_BYTES - oldest frames are overwritten
     """
     try:
-        # Create live monitoring folder
-        live_folder = os.path.join(settings.MEDIA_ROOT, 'live_monitoring')
-        os.makedirs(live_folder, exist_ok=True)
-
-        # Save image
-        file_path = os.path.join(live_folder, filename)
-        with open(file_path, 'wb') as f:
-            f.write(image_data)
-
-        print(f"📁 Saved to live monitoring: {filename}")
-    except Exception as e:
-        print(f"⚠️ Live monitoring save error: {str(e)}")
-
-
-# ML Boat Detection
-def detect_boat(image_data):
-    """
-    Detect if image contains a boat using YOLO ML model
-    Returns: (is_boat, confidence, detected_class)
-    """
-    if not ML_AVAILABLE or not settings.ML_BOAT_DETECTION_ENABLED:
-        # If ML not available or disabled, assume it's a boat (fallback)
-        return True, 1.0, "unknown"
-
-    try:
-        # Load YOLO model (using YOLOv8 pre-trained on COCO dataset)
-        model = YOLO('yolov8n.pt')  # Nano model - fast and lightweight
-
-        # Convert image data to numpy array
-        image_array = np.frombuffer(image_data, np.uint8)
-        image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-
-        # Run inference
-        results = model(image, verbose=False)
-
-        # Check detections
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Get class name and confidence
-                class_id = int(box.cls[0])
-                confidence = float(box.conf[0])
-                class_name = model.names[class_id]
-
-                # Check if it's a boat-related class
-                if class_name.lower() in [c.lower() for c in settings.BOAT_CLASSES]:
-                    if confidence >= settings.ML_CONFIDENCE_THRESHOLD:
-                        print(f"🚢 Boat Detected: {class_name} ({confidence*100:.1f}% confidence)")
-                        return True, confidence, class_name
-
-        # No boat detected
-        print("❌ No boat detected in image")
-        return False, 0.0, None
-
+        seq = get_ring(camera_id).publish(image_data, filename)
+        if seq is None:
+            print(f"⚠️ Live monitoring: {filename} larger than LIVE_BUFFER_BYTES - not shown")
+        else:
+            print(f"📺 Live monitoring: {filename} (frame {seq})")
     except Exception as e:
-        print(f"⚠️ ML Detection Error: {str(e)}")
-        # On error, assume it's a boat (fail-safe approach)
-        return True, 0.0, "error"
+        print(f"⚠️ Live monitoring error: {str(e)}")
 
 
 # QR Code Validator with GPS Tracking
@@ -279,79 +128,572 @@ def validate_qr_with_gps(qr_data, latitude=None, longitude=None):
         return False, True, f"❌ Validation Error: {str(e)}", None
 
 
+def get_camera_id(request):
+    """Camera identity of an upload: X-Camera-Id header or ?camera= (default: 'default')"""
+    camera_id = request.headers.get('X-Camera-Id') or request.GET.get('camera') or 'default'
+    # Used in folder names and as a slug: letters, digits, '-' and '_' only
+    return re.sub(r'[^A-Za-z0-9_-]', '', camera_id)[:50] or 'default'
+
+
+def authenticate_camera(request):
+    """
+    Resolve the calling camera and check its token (X-Camera-Token or ?token=)
+    Returns: (CameraConfig, None) or (None, error JsonResponse)
+    """
+    camera_id = get_camera_id(request)
+    token = request.headers.get('X-Camera-Token') or request.GET.get('token')
+    camera = get_camera(camera_id) or register_camera(camera_id, token)
+
+    if camera is None:
+        return None, JsonResponse({"status": "forbidden", "message": f"Unknown camera '{camera_id}'"}, status=403)
+    if not camera.is_active:
+        return None, JsonResponse({"status": "forbidden", "message": f"Camera '{camera_id}' is disabled"}, status=403)
+
+    if not camera.check_token(token):
+        print(f"🚫 Bad token from camera '{camera_id}'")
+        return None, JsonResponse({"status": "unauthorized", "message": "Invalid camera token"}, status=401)
+
+    return camera, None
+
+
+def upload_frame(img_data):
+    """Frame for screening + detection: one reduced decode serves every screening scale"""
+    return Frame(img_data, base_scale=min(settings.MOTION_SCALE, settings.COLOR_SCREENING_SCALE))
+
+
+def screen_frame(frame, camera_id, roi=None, profile=None):
+    """
+    Cheap per-camera gates before detection (run in order, in this process)
+    1. Motion: update the camera's background model, get the foreground mask
+    2. Near-duplicate: reuse the verdict of a recent matching frame (not while
+       that frame's boat is tracked: its frames go to the tracker)
+    3. Tracked boats: all motion inside confirmed tracks that still show their
+       color (profile's classifier) → reuse their verdict
+    4. No motion: reject without running detection (tracked boats: detect
+       without the motion mask - they may have stopped)
+    Returns: (phash, foreground_mask, verdict) - verdict is set if detection can be skipped
+    """
+    foreground, motion_percentage = None, None
+    if settings.MOTION_GATING_ENABLED:
+        foreground, motion_percentage = get_motion_gate().apply(frame, camera_id, roi)
+
+    tracked_captures = get_tracker().captures(camera_id) if settings.TRACKING_ENABLED else set()
+
+    phash = dhash(frame) if settings.DEDUPE_ENABLED else None
+    if phash is not None:
+        entry = get_dedupe_cache().lookup(camera_id, phash)
+        if entry is not None and entry.capture_id not in tracked_captures:
+            print(f"♻️ Near-duplicate frame from camera '{camera_id}' - reusing previous verdict")
+            return phash, foreground, dict(entry.verdict, phash=phash, duplicate=True, duplicate_of=entry.capture_id)
+
+    if tracked_captures:
+        tracks = get_tracker().covering(
+            camera_id, foreground, settings.MOTION_SCALE,
+            frame.reduced_hsv(settings.MOTION_SCALE) if foreground is not None else None,
+            (profile or get_active_profile()).classifier,
+        )
+        if tracks:
+            print(f"🎯 Motion on camera '{camera_id}' only around {len(tracks)} tracked boat(s) - skipping detection")
+            return phash, foreground, dict(
+                tracks[0].verdict, phash=phash, tracked=True,
+                track_ids=[track.id for track in tracks],
+                capture_ids=[track.capture_id for track in tracks],
+            )
+
+    if motion_percentage is not None and motion_percentage < settings.MOTION_MIN_FOREGROUND:
+        if tracked_captures:
+            # A tracked boat that stopped: detect on the whole frame, which keeps its track alive
+            return phash, None, None
+        print(f"💤 No motion on camera '{camera_id}' ({motion_percentage:.2f}% changed) - skipping detection")
+        return phash, foreground, {
+            "suspicious": False,
+            "color_detected": False,
+            "color": None,
+            "color_percentage": 0.0,
+            "motion_percentage": round(motion_percentage, 2),
+            "phash": phash,
+        }
+
+    return phash, foreground, None
+
+
+def analyze_upload(img_data, camera_id='default'):
+    """
+    Detection chain for one uploaded frame (no database writes)
+    Runs inside the ingest worker, or inline if the queue is disabled
+    Live monitoring is published on upload (receive_upload), not here
+    Returns: verdict dict
+    """
+    # ============================================
+    # STEP 1: MOTION + NEAR-DUPLICATE GATES (may skip detection)
+    # ============================================
+    camera = get_camera(camera_id)
+    roi = camera.roi if camera else None
+    profile = camera.detection_profile if camera else get_active_profile()
+    frame = upload_frame(img_data)
+    phash, foreground, early_verdict = screen_frame(frame, camera_id, roi, profile)
+    if early_verdict:
+        return early_verdict
+
+    # ============================================
+    # STEP 2+: DETECTION CHAIN (runs on the detection pool, reusing the screening decode)
+    # ============================================
+    verdict = get_executor().run(analyze_frame, frame, profile, foreground, roi)
+    verdict["phash"] = phash
+    return verdict
+
+
+def remember_frame(camera_id, verdict, capture_id):
+    """Add a captured frame to the near-duplicate cache (rejected frames are never reused)"""
+    if capture_id is not None and verdict.get("phash") is not None:
+        get_dedupe_cache().remember(camera_id, verdict["phash"], verdict, capture_id)
+
+
+def count_track_frames(capture_ids):
+    """One more frame of already captured boats: one UPDATE, no new capture"""
+    BoatCapture.objects.filter(pk__in=capture_ids).update(
+        track_frames=F('track_frames') + 1, last_seen_at=timezone.now()
+    )
+
+
+def record_tracks(camera_id, boxes, verdict, matches, unmatched, capture_id):
+    """Update the camera's tracks once this frame is committed (a rolled back save leaves them as they were)"""
+    if settings.TRACKING_ENABLED:
+        transaction.on_commit(
+            lambda: get_tracker().apply(camera_id, boxes, verdict, matches, unmatched, capture_id)
+        )
+
+
+def replace_capture_image(capture_id, img_data, filename, verdict, source_path=None):
+    """
+    Best frame of a track so far (boat seen larger): becomes the capture image
+    Only while the capture is pending - a reviewed capture keeps what was reviewed
+    """
+    image_sha256 = sha256_hex(img_data)
+    with transaction.atomic():
+        capture = BoatCapture.objects.filter(pk=capture_id, status='pending').only('image', 'image_sha256').first()
+        if capture is None or capture.image_sha256 == image_sha256:
+            return False
+        name = BoatCapture._meta.get_field('image').generate_filename(None, filename)
+        if source_path and os.path.exists(source_path):
+            image_name = capture_storage().save_file(name, source_path, image_sha256)  # Hard link
+        else:
+            image_name = capture_storage().save(name, ContentFile(img_data))
+        BoatCapture.objects.filter(pk=capture_id).update(
+            image=image_name, image_sha256=image_sha256, blobs=verdict.get("blobs", [])
+        )
+        release_image(capture.image.name, capture.image_sha256)  # Old file: removed after commit
+    print(f"🎯 Capture {capture_id}: better view of the boat - image replaced")
+    return True
+
+
+def save_upload_result(img_data, filename, verdict, camera_id='default', source_path=None):
+    """
+    Decision logic: save suspicious frames to the database
+    source_path: spooled copy of img_data - stored as the capture by hard link
+    Returns: response dict for the ESP32 / job result
+    """
+    # Near-duplicate of a recent frame → no new capture
+    if verdict.get("duplicate"):
+        return {
+            "status": "duplicate",
+            "duplicate_of": verdict["duplicate_of"],
+            "suspicious_detected": verdict["suspicious"],
+            "message": "Same scene as a recent frame"
+        }
+
+    # Only tracked boats moving (detection skipped) → count the frame on their captures
+    if verdict.get("tracked"):
+        count_track_frames(verdict["capture_ids"])
+        remember_frame(camera_id, verdict, verdict["capture_ids"][0])
+        return {
+            "status": "tracked",
+            "id": verdict["capture_ids"][0],
+            "track_ids": verdict["track_ids"],
+            "suspicious_detected": True,
+            "message": "Boat already captured - track updated"
+        }
+
+    # Suspicious color detected → Save to database
+    if verdict["suspicious"]:
+        # Same boats as earlier frames (per camera tracks) → update their captures, no new one
+        boxes, matches, unmatched = vessel_boxes(verdict), [], []
+        if settings.TRACKING_ENABLED:
+            matches, unmatched = get_tracker().match(camera_id, boxes)
+        known = [(track, best) for track, _, best in matches if track.capture_id]
+        untracked = bool(unmatched) or len(known) < len(matches)  # Boats without a capture yet
+        if known:
+            count_track_frames({track.capture_id for track, _ in known})
+            for capture_id in {track.capture_id for track, best in known if best}:
+                replace_capture_image(capture_id, img_data, filename, verdict, source_path)
+        if known and not untracked:
+            capture_id = known[0][0].capture_id
+            record_tracks(camera_id, boxes, verdict, matches, unmatched, capture_id)
+            print(f"🎯 Tracked boat(s) on camera '{camera_id}' → Capture {capture_id} updated")
+            remember_frame(camera_id, verdict, capture_id)
+            return {
+                "status": "tracked",
+                "id": capture_id,
+                "track_ids": [track.id for track, _ in known],
+                "suspicious_detected": True,
+                "message": "Boat already captured - track updated"
+            }
+
+        print(f"✅ SUSPICIOUS ACTIVITY DETECTED → Saving to database")
+
+        # Exact same bytes already saved (ESP32 retry after a timeout) → reuse that capture
+        image_sha256 = sha256_hex(img_data)
+        existing = BoatCapture.objects.filter(image_sha256=image_sha256).only('id').first()
+        if existing:
+            print(f"♻️ Identical upload - already stored as Capture {existing.id}")
+            record_tracks(camera_id, boxes, verdict, matches, unmatched, existing.id)
+            remember_frame(camera_id, verdict, existing.id)
+            return {
+                "status": "duplicate",
+                "duplicate_of": existing.id,
+                "suspicious_detected": True,
+                "message": "Identical image already stored"
+            }
+
+        # Save to database (file + row in one transaction, see release_image)
+        name = BoatCapture._meta.get_field('image').generate_filename(None, filename)
+        camera = get_camera(camera_id)
+        with transaction.atomic():
+            if source_path and os.path.exists(source_path):
+                image_name = capture_storage().save_file(name, source_path, image_sha256)  # Hard link
+            else:
+                image_name = capture_storage().save(name, ContentFile(img_data))
+            # One INSERT with every field set
+            boat_capture = BoatCapture.objects.create(
+                image=image_name,
+                image_sha256=image_sha256,
+                camera_id=camera.pk if camera else None,
+                qr_detected=False,
+                qr_data=None,
+                qr_valid=False,
+                blobs=verdict.get("blobs", []),
+                status='pending',
+                notes="Unidentified vessel detected - Security review required",
+                last_seen_at=timezone.now(),
+            )
+        record_tracks(camera_id, boxes, verdict, matches, unmatched, boat_capture.id)
+
+        print(f"✅ Image Saved: {boat_capture.id} - Suspicious Activity Detected - Status: PENDING")
+        remember_frame(camera_id, verdict, boat_capture.id)
+
+        return {
+            "status": "received",
+            "id": boat_capture.id,
+            "filename": filename,
+            "suspicious_detected": True,
+            "color_percentage": verdict["color_percentage"],
+            "blobs": len(verdict.get("blobs", []))
+        }
+
+    # No suspicious color → Reject
+    print("❌ No suspicious activity detected → Image rejected")
+    remember_frame(camera_id, verdict, None)
+    return {
+        "status": "rejected",
+        "reason": "no_suspicious_activity",
+        "message": "No suspicious activity detected"
+    }
+
+
+def overloaded(status_code, reason, message, retry_after):
+    """429 / 503 answer telling the device how long to back off"""
+    response = JsonResponse({
+        "status": "rate_limited" if status_code == 429 else "overloaded",
+        "reason": reason,
+        "message": message,
+        "retry_after": retry_after
+    }, status=status_code)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def admit_upload(camera):
+    """
+    Per-camera token bucket, then global admission (see admission.py)
+    Returns: (admitted, error_response) - call get_admission().leave() if admitted
+    """
+    if settings.RATE_LIMIT_ENABLED:
+        wait = get_rate_limiter().check(camera.camera_id, camera.capture_interval)
+        if wait:
+            retry_after = max(math.ceil(wait), 1)
+            print(f"🚦 Camera '{camera.camera_id}' over its rate limit - retry in {retry_after}s")
+            return False, overloaded(429, 'rate_limit', "Uploading faster than the capture interval", retry_after)
+
+    retry_after, reason = get_admission().enter()
+    if retry_after:
+        print(f"🚦 Server overloaded ({reason}) - camera '{camera.camera_id}' told to retry in {retry_after}s")
+        return False, overloaded(503, reason, "Server busy, retry later", retry_after)
+
+    return True, None
+
+
 @csrf_exempt
 def upload_image(request):
     if request.method == "POST":
-        img_data = request.body
+        # Which camera is this? (before reading the body)
+        camera, error = authenticate_camera(request)
+        if error:
+            return error
+
+        # Shed load at the edge: refuse before the body is read
+        admitted, error = admit_upload(camera)
+        if not admitted:
+            return error
+
+        try:
+            return receive_upload(request, camera)
+        finally:
+            get_admission().leave()
+
+    return JsonResponse({"error": "POST only"})
+
+
+def receive_upload(request, camera):
+    """Read, validate and queue (or process) one admitted upload"""
+    camera_id = camera.camera_id
+
+    # Stream + validate the JPEG before any decode or disk write
+    try:
+        img_data = read_jpeg_upload(request)
+    except JpegValidationError as e:
+        print(f"❌ Upload rejected ({e.reason}): {str(e)}")
+        return JsonResponse({
+            "status": "invalid",
+            "reason": e.reason,
+            "message": str(e)
+        }, status=e.status)
+
+    # Create filename
+    filename = f"capture_{int(datetime.datetime.now().timestamp())}.jpg"
+
+    # ============================================
+    # STEP 0: LIVE MONITORING (shared memory ring buffer)
+    # ============================================
+    # On upload, not in the worker: the live view never lags the queue backlog
+    save_to_live_monitoring(img_data, filename, camera_id)
+
+    # Queue mode: persist + acknowledge, detection runs in the ingest worker
+    if settings.INGEST_QUEUE_ENABLED:
+        job = enqueue_upload(img_data, filename, camera_id)
+        print(f"📥 Queued upload as Ingest Job {job.id}")
+
+        return JsonResponse({
+            "status": "queued",
+            "job_id": job.id,
+            "filename": filename,
+            "capture_interval": camera.capture_interval
+        }, status=202)
+
+    # Inline mode: run the detection chain inside the request
+    # Nothing touches the disk unless the frame is saved as a capture
+    verdict = analyze_upload(img_data, camera_id)
+    result = save_upload_result(img_data, filename, verdict, camera_id)
+    return JsonResponse(dict(result, capture_interval=camera.capture_interval))
+
+
+@csrf_exempt
+def upload_batch(request):
+    """
+    Burst upload: several frames in one request (format in batch.py)
+    Frames are detected in parallel on the pool and saved in upload order
+    Returns per-frame verdicts in upload order
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST only"})
+
+    camera, error = authenticate_camera(request)
+    if error:
+        return error
 
-        # Create filename
-        filename = f"capture_{int(datetime.datetime.now().timestamp())}.jpg"
+    # One token per burst: the ESP32 sends bursts instead of single frames
+    admitted, error = admit_upload(camera)
+    if not admitted:
+        return error
+
+    try:
+        return receive_batch(request, camera)
+    finally:
+        get_admission().leave()
 
-        # ============================================
-        # STEP 0: LIVE MONITORING (5-min auto-delete)
-        # ============================================
-        cleanup_live_folder()  # Delete old images first
-        save_to_live_monitoring(img_data, filename)  # Save new image
 
-        # ============================================
-        # STEP 1: SUSPICIOUS COLOR DETECTION
-        # ============================================
-        color_detected = False
-        detected_color = None
-        color_percentage = 0.0
+def receive_batch(request, camera):
+    """Parse, detect and save one admitted burst"""
+    camera_id = camera.camera_id
 
+    try:
+        frames = parse_batch(request)
+    except BatchFormatError as e:
+        return JsonResponse({"status": "error", "error": str(e)}, status=400)
+
+    timestamp = int(datetime.datetime.now().timestamp())
+    filenames = [f"capture_{timestamp}_{i}.jpg" for i in range(len(frames))]
+    results = [None] * len(frames)
+    verdicts = {}
+
+    # Cheap JPEG checks first: corrupt frames never reach the decoder
+    valid = []
+    for i, (img_data, meta) in enumerate(frames):
         try:
-            if settings.COLOR_DETECTION_ENABLED:
-                print("🎨 Step 1: Checking for suspicious activity...")
-                color_detected, detected_color, color_percentage = detect_colored_boat(img_data)
-
-                if color_detected:
-                    print(f"✅ Suspicious Color Found! ({color_percentage}% of image)")
-                else:
-                    print(f"❌ No suspicious activity detected - Rejecting image")
-            else:
-                print("⚠️ Color detection disabled in settings")
-        except Exception as e:
-            print(f"❌ Color Detection Error: {str(e)}")
+            validate_jpeg(img_data)
+            valid.append(i)
+        except JpegValidationError as e:
+            results[i] = {"status": "invalid", "reason": e.reason, "message": str(e)}
+
+    # STEP 0: LIVE MONITORING
+    for i in valid:
+        save_to_live_monitoring(frames[i][0], filenames[i], camera_id)
+
+    # STEP 1: MOTION + NEAR-DUPLICATE GATES (in upload order, per camera state)
+    roi = camera.roi
+    profile = camera.detection_profile  # One profile lookup for the whole burst
+    hashes, masks, decoded = {}, {}, {}
+    for i in valid:
+        decoded[i] = upload_frame(frames[i][0])
+        hashes[i], masks[i], early_verdict = screen_frame(decoded[i], camera_id, roi, profile)
+        if early_verdict:
+            verdicts[i] = early_verdict
+    to_detect = [i for i in valid if i not in verdicts]
+
+    # STEP 2+: DETECTION CHAIN (whole burst in parallel)
+    futures = [
+        get_executor().submit(analyze_frame, decoded[i], profile, masks[i], roi)
+        for i in to_detect
+    ]
+    for i, future in zip(to_detect, futures):
+        verdicts[i] = dict(future.result(), phash=hashes[i])
+
+    # Save frame by frame, in upload order: each frame's tracks are recorded on its
+    # commit, so the next frame of the burst is matched against them
+    for i in valid:
+        results[i] = save_upload_result(frames[i][0], filenames[i], verdicts[i], camera_id)
+
+    print(
+        f"📦 Batch of {len(frames)} frames: {sum(r['status'] == 'received' for r in results)} saved, "
+        f"{sum(r['status'] == 'tracked' for r in results)} tracked"
+    )
+
+    return JsonResponse({
+        "status": "processed",
+        "count": len(frames),
+        "frames": [
+            dict(result, index=i, meta=meta)
+            for i, (result, (img_data, meta)) in enumerate(zip(results, frames))
+        ]
+    })
 
-        # ============================================
-        # DECISION LOGIC: Suspicious Activity Detection
-        # ============================================
 
-        # Suspicious color detected → Save to database
-        if color_detected:
-            print(f"✅ SUSPICIOUS ACTIVITY DETECTED → Saving to database")
+def ingest_job_status(request, job_id):
+    """Poll the outcome of a queued upload"""
+    try:
+        job = IngestJob.objects.get(id=job_id)
+    except IngestJob.DoesNotExist:
+        return JsonResponse({"error": "Job not found"}, status=404)
+
+    return JsonResponse({
+        "job_id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "result": job.result,
+        "error": job.last_error if job.status == 'failed' else None
+    })
+
 
-            # Save to database
-            boat_capture = BoatCapture()
-            boat_capture.image.save(filename, ContentFile(img_data), save=True)
-            boat_capture.qr_detected = False
-            boat_capture.qr_data = None
-            boat_capture.qr_valid = False
-            boat_capture.status = 'pending'
-            boat_capture.notes = "Unidentified vessel detected - Security review required"
-            boat_capture.save()
+def detection_pool_status(request):
+    """Detection pool size and utilisation for this process"""
+    return JsonResponse(dict(executor_stats(), admission=get_admission().stats()))
 
-            print(f"✅ Image Saved: {boat_capture.id} - Suspicious Activity Detected - Status: PENDING")
 
-            return JsonResponse({
-                "status": "received",
-                "id": boat_capture.id,
-                "filename": filename,
-                "suspicious_detected": True,
-                "color_percentage": color_percentage
-            })
+def maintenance_report(request):
+    """Last maintenance run per job (duration + counts), written by the leader process"""
+    status = maintenance_status()
+    if status is None:
+        return JsonResponse({"error": "Maintenance has not run yet"}, status=404)
+    return JsonResponse(status)
 
-        # No suspicious color → Reject
-        else:
-            print("❌ No suspicious activity detected → Image rejected")
-            return JsonResponse({
-                "status": "rejected",
-                "reason": "no_suspicious_activity",
-                "message": "No suspicious activity detected"
-            })
 
-    return JsonResponse({"error": "POST only"})
+def live_frames(request, camera_id):
+    """
+    Latest frames of one camera's live view (newest first, no image bytes)
+    ?count=N (default 10, at most LIVE_BUFFER_FRAMES)
+    """
+    if not ring_exists(camera_id):
+        return JsonResponse({"error": "No live frames for this camera"}, status=404)
+
+    try:
+        count = int(request.GET.get('count', 10))
+    except ValueError:
+        count = 10
+    count = max(1, min(count, settings.LIVE_BUFFER_FRAMES))
+
+    now = time.time()
+    frames = get_ring(camera_id).latest(count, with_data=False)
+    return JsonResponse({
+        "camera": camera_id,
+        "frames": [
+            {
+                "seq": frame["seq"],
+                "filename": frame["filename"],
+                "captured_at": datetime.datetime.fromtimestamp(frame["timestamp"], datetime.timezone.utc).isoformat(),
+                "age_seconds": round(now - frame["timestamp"], 1),
+                "size": frame["size"],
+                "url": f"/live/{camera_id}/{frame['seq']}.jpg",
+            }
+            for frame in frames
+        ]
+    })
+
+
+def live_frame(request, camera_id, seq=None):
+    """One live frame as JPEG: /live/<camera>/latest.jpg or /live/<camera>/<seq>.jpg"""
+    if not ring_exists(camera_id):
+        return HttpResponse(status=404)
+
+    ring = get_ring(camera_id)
+    if seq is None:
+        frames = ring.latest(1)
+        frame = frames[0] if frames else None
+    else:
+        frame = ring.read(seq)
+    if frame is None:
+        return HttpResponse(status=404)  # Not uploaded yet, or already overwritten
+
+    response = HttpResponse(frame["data"], content_type='image/jpeg')
+    # A seq never changes its bytes; "latest" changes every upload
+    response['Cache-Control'] = 'no-cache' if seq is None else 'max-age=300'
+    response['X-Frame-Seq'] = str(frame["seq"])
+    return response
+
+
+def live_stream(request, camera_id):
+    """
+    MJPEG stream of one camera's live frames (multipart/x-mixed-replace)
+    <img src="/live/<camera>/stream/"> - frames are sent as uploaded, never re-encoded
+    A slow viewer skips frames instead of delaying anyone (see StreamClient)
+    """
+    if not ring_exists(camera_id):
+        return HttpResponse(status=404)
+
+    slot = acquire_stream()
+    if slot is None:
+        return overloaded(503, 'busy', "Too many live viewers, try again later", settings.ADMISSION_RETRY_AFTER)
+
+    body = MjpegStream(
+        get_ring(camera_id), camera_id, slot,
+        max_seconds=settings.LIVE_STREAM_MAX_SECONDS,
+        poll_interval=settings.LIVE_STREAM_POLL_INTERVAL,
+        keepalive=settings.LIVE_STREAM_KEEPALIVE,
+        queue_size=settings.LIVE_STREAM_QUEUE_FRAMES,
+    )
+    print(f"📺 Live stream of '{camera_id}' opened")
+    response = StreamingHttpResponse(body, content_type=f"multipart/x-mixed-replace; boundary={BOUNDARY.decode()}")
+    response['Cache-Control'] = 'no-cache, no-store'
+    response['X-Accel-Buffering'] = 'no'  # nginx: pass parts through as they are produced
+    return response
 
 
 def gallery(request):
@@ -370,6 +712,8 @@ def gallery(request):
         "pending": pending,
         "approved": approved,
         "warnings": warnings,
+        "cameras": Camera.objects.filter(is_active=True).only('camera_id', 'name'),
+        "live_stream_seconds": settings.LIVE_STREAM_MAX_SECONDS,
         "page_title": "All Captures",
         "current_page": "all"
     })
@@ -410,6 +754,8 @@ def approved_gallery(request):
         "pending": pending,
         "approved": approved,
         "warnings": warnings,
+        "cameras": Camera.objects.filter(is_active=True).only('camera_id', 'name'),
+        "live_stream_seconds": settings.LIVE_STREAM_MAX_SECONDS,
         "page_title": "Approved Boats",
         "current_page": "approved"
     })
@@ -431,6 +777,8 @@ def warning_gallery(request):
         "pending": pending,
         "approved": approved,
         "warnings": warnings,
+        "cameras": Camera.objects.filter(is_active=True).only('camera_id', 'name'),
+        "live_stream_seconds": settings.LIVE_STREAM_MAX_SECONDS,
         "page_title": "Warning Boats",
         "current_page": "warnings"
     })
@@ -479,15 +827,16 @@ def update_status(request, capture_id):
 def delete_capture(request, capture_id):
     if request.method == "POST":
         try:
-            # Get the capture
-            capture = BoatCapture.objects.get(id=capture_id)
+            with transaction.atomic():
+                # Get the capture
+                capture = BoatCapture.objects.get(id=capture_id)
 
-            # Delete the image file from filesystem
-            if capture.image:
-                capture.image.delete(save=False)
+                # Delete from database
+                capture.delete()
 
-            # Delete from database
-            capture.delete()
+                # Delete the image file only if no other capture shares it (same bytes), after commit
+                if capture.image:
+                    release_image(capture.image.name, capture.image_sha256)
 
             print(f"✅ Deleted: Capture #{capture_id}")
 
@@ -503,9 +852,15 @@ def delete_capture(request, capture_id):
 def request_capture(request):
     """User clicks 'Capture Now' button in app"""
     if request.method == 'POST':
+        # Target one camera (?camera= or form field), or any camera if not given
+        camera_id = request.POST.get('camera') or request.GET.get('camera')
+        camera = Camera.objects.filter(camera_id=camera_id).first() if camera_id else None
+        if camera_id and camera is None:
+            return JsonResponse({"error": f"Unknown camera '{camera_id}'"}, status=404)
+
         # Create capture request
-        capture_req = CaptureRequest.objects.create()
-        print(f"📸 Manual capture requested! ID: {capture_req.id}")
+        capture_req = CaptureRequest.objects.create(camera=camera)
+        print(f"📸 Manual capture requested! ID: {capture_req.id} (camera: {camera_id or 'any'})")
 
         return JsonResponse({
             "success": True,
@@ -519,19 +874,23 @@ def request_capture(request):
 @csrf_exempt
 def check_capture_request(request):
     """ESP32 polls this endpoint to check if it should capture"""
-    # Check for unprocessed capture requests
-    pending_request = CaptureRequest.objects.filter(processed=False).first()
+    camera, error = authenticate_camera(request)
+    if error:
+        return error
 
-    if pending_request:
-        # Mark as processed
-        pending_request.processed = True
-        pending_request.save()
+    # Check for unprocessed capture requests for this camera (or for any camera)
+    pending_request = CaptureRequest.objects.filter(
+        Q(camera_id=camera.pk) | Q(camera__isnull=True), processed=False
+    ).first()
 
-        print(f"✅ ESP32 processing capture request #{pending_request.id}")
+    # Mark as processed - conditional, so two cameras can't both take an untargeted request
+    if pending_request and CaptureRequest.objects.filter(pk=pending_request.pk, processed=False).update(processed=True):
+        print(f"✅ ESP32 '{camera.camera_id}' processing capture request #{pending_request.id}")
 
         return JsonResponse({
             "capture": True,
-            "request_id": pending_request.id
+            "request_id": pending_request.id,
+            "capture_interval": camera.capture_interval
         })
 
-    return JsonResponse({"capture": False})
\ No newline at end of file
+    return JsonResponse({"capture": False, "capture_interval": camera.capture_interval})
\ No newline at end of file
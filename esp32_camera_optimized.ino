@@ -9,6 +9,17 @@ const char* password = "TSS@2023";
 // ⬇️ Your server endpoint (UPDATE THIS!)
 String serverURL = "http://192.168.0.177:8000/upload-image/";
 
+// ⬇️ This camera's identity (admin → Cameras). Token can stay empty if none is set.
+const char* cameraId = "default";
+const char* cameraToken = "";
+
+// Seconds between captures - the server sends the camera's configured interval
+int captureIntervalSeconds = 8;
+
+// Back-off when the server is overloaded (429 / 503 Retry-After) or unreachable
+int failedUploads = 0;
+const int MAX_BACKOFF_SECONDS = 120;
+
 // Camera Module: AI Thinker
 #define PWDN_GPIO_NUM     32
 #define RESET_GPIO_NUM    -1
@@ -184,17 +195,40 @@ void loop() {
 
   http.begin(serverURL);
   http.addHeader("Content-Type", "image/jpeg");
+  http.addHeader("X-Camera-Id", cameraId);
+  http.addHeader("X-Camera-Token", cameraToken);
   http.setTimeout(15000); // 15 second timeout (increased for larger image)
+  const char* responseHeaders[] = {"Retry-After"};
+  http.collectHeaders(responseHeaders, 1);
 
   int httpResponseCode = http.POST(fb->buf, fb->len);
-
-  if (httpResponseCode > 0) {
+  int waitSeconds = captureIntervalSeconds;
+
+  if (httpResponseCode == 429 || httpResponseCode == 503) {
+    // Server asked us to slow down - sleep as long as it says, don't add to the pile
+    int retryAfter = http.header("Retry-After").toInt();
+    waitSeconds = retryAfter > 0 ? min(retryAfter, MAX_BACKOFF_SECONDS) : captureIntervalSeconds * 2;
+    Serial.printf("🚦 Server busy (%d) - backing off %d seconds\n", httpResponseCode, waitSeconds);
+  } else if (httpResponseCode > 0) {
     Serial.printf("✅ Upload SUCCESS! Response: %d\n", httpResponseCode);
     String response = http.getString();
     Serial.println("Server says: " + response);
+
+    // Follow the capture interval configured for this camera
+    int key = response.indexOf("\"capture_interval\":");
+    if (key >= 0) {
+      int interval = response.substring(key + 19).toInt();
+      if (interval > 0) captureIntervalSeconds = interval;
+    }
+    waitSeconds = captureIntervalSeconds;
+    failedUploads = 0;
   } else {
     Serial.printf("❌ Upload FAILED! Error: %s\n", http.errorToString(httpResponseCode).c_str());
     Serial.println("⚠️ Server: http://192.168.0.177:8000/upload-image/");
+
+    // Timeout / connection error: exponential back-off (interval x2, x4, ... up to the max)
+    failedUploads++;
+    waitSeconds = min(captureIntervalSeconds << min(failedUploads, 4), MAX_BACKOFF_SECONDS);
   }
 
   http.end();
@@ -202,6 +236,6 @@ void loop() {
 
   digitalWrite(LED_PIN, LOW);
 
-  Serial.println("⏳ Waiting 8 seconds...");
-  delay(8000);
+  Serial.printf("⏳ Waiting %d seconds...\n", waitSeconds);
+  delay(waitSeconds * 1000);
 }
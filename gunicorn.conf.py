@@ -0,0 +1,32 @@
+"""
+Gunicorn settings (picked up automatically: gunicorn oceanguard.wsgi:application)
+"""
+import os
+
+# Threaded workers: a live MJPEG viewer holds its thread for up to
+# LIVE_STREAM_MAX_SECONDS, so a sync worker would serve nothing else meanwhile.
+# Keep threads above LIVE_STREAM_MAX_CLIENTS so uploads always find one.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+
+def post_fork(server, worker):
+    """
+    Each worker takes its share of the host's DETECTION_POOL_SIZE. In inline
+    mode it also starts its pool (or loads the detectors) right after the
+    fork, so the first uploads it handles don't pay for it; in queue mode
+    the ingest worker detects, and the pool only starts on a batch upload.
+    Workers also start the maintenance scheduler (one leader per host), so
+    cleanup runs without an ingest worker too.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'oceanguard.settings')
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from camera.executor import get_executor, share_pool
+    from camera.maintenance import start_scheduler
+    share_pool(server.num_workers)
+    if not settings.INGEST_QUEUE_ENABLED:
+        get_executor().warm()
+    start_scheduler()
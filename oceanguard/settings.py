@@ -73,6 +73,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Web workers + ingest workers share this file
+            'init_command': 'PRAGMA journal_mode=WAL;',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -116,6 +122,28 @@ QR_SCAN_ENABLED = False  # DISABLED - Using ML + Color detection
 # ML Boat Detection Settings (DISABLED - Only color detection!)
 ML_BOAT_DETECTION_ENABLED = False  # DISABLED - Only using color detection
 ML_CONFIDENCE_THRESHOLD = 0.25  # 25% confidence (lowered for better detection)
+ML_MODEL_WEIGHTS = 'yolov8n.pt'  # Nano model - fast and lightweight (loaded once per process)
+ML_IMAGE_SIZE = 640             # Inference size (YOLO letterboxes frames to this)
+# 'torch' = ultralytics + PyTorch, 'onnx' = exported model on ONNX Runtime (fast on CPU-only servers)
+# Export: python manage.py export_detector [--int8]
+ML_BACKEND = os.environ.get('ML_BACKEND', 'torch')
+ML_ONNX_MODEL = os.path.join(BASE_DIR, 'models', 'yolov8n.onnx')  # or models/yolov8n.int8.onnx
+ML_ONNX_THREADS = 1             # ONNX Runtime threads per process (like DETECTION_CV_THREADS)
+ML_NMS_IOU = 0.45               # Overlap above which the weaker box is suppressed (onnx backend)
+# Cascade: YOLO only looks at padded crops around the color blobs that passed the color screen
+ML_CASCADE_ENABLED = True
+ML_CASCADE_PADDING = 0.5        # Crop grows by 50% of the blob's width / height on every side
+ML_CASCADE_MIN_CROP = 96        # Smallest crop (pixels) - tiny blobs still get some context
+ML_CASCADE_MAX_CROPS = 3        # Largest blobs checked per frame
+ML_CASCADE_MAX_COVERAGE = 0.6   # Crops covering more of the frame than this → full-frame inference
+ML_CASCADE_IMAGE_SIZE = 320     # Model input size for crops (a quarter of the work of 640)
+# 'local' = model loaded in every detection process, 'daemon' = one shared model per host
+# Daemon mode: python manage.py run_inference_server (Linux / macOS - Unix socket)
+INFERENCE_MODE = os.environ.get('INFERENCE_MODE', 'local')
+INFERENCE_SOCKET = os.path.join(BASE_DIR, 'inference.sock')
+INFERENCE_BATCH_MAX = 8         # Frames per forward pass
+INFERENCE_BATCH_WAIT_MS = 10    # Longest a frame waits for others to join its batch
+INFERENCE_TIMEOUT = 10          # Seconds a detection process waits for the daemon
 # Classes to detect as "boats" (COCO dataset - only 'boat' exists in COCO)
 # Note: COCO doesn't have 'ship', 'sailboat', etc. - only generic 'boat' class
 BOAT_CLASSES = ['boat']  # Only 'boat' exists in COCO dataset
@@ -136,11 +164,132 @@ COLOR_RANGES = {
 # Minimum and Maximum percentage of colored pixels to consider boat detected
 COLOR_DETECTION_MIN_THRESHOLD = 5.0   # At least 5% must be colored (filters out small objects like pens)
 COLOR_DETECTION_MAX_THRESHOLD = 60.0  # Maximum 60% can be colored (filters out walls, large backgrounds)
+# ☝️ Defaults only: an active Detection Profile (admin) overrides COLOR_RANGES + thresholds
+PROFILE_RELOAD_INTERVAL = 5   # Seconds between checks for a changed profile (no restart needed)
+
+# Screening: decode at reduced size first (JPEG DCT scaling), full frame only near a threshold
+COLOR_SCREENING_SCALE = 4     # 1 = off, 2 / 4 / 8 = decode at 1/2, 1/4, 1/8 size
+COLOR_SCREENING_MARGIN = 1.0  # Percentage points around MIN/MAX threshold that trigger a full-res check
+
+# Early exit: classify a stratified sample of tiles, reject once color is certainly below MIN
+# Opt-in, for full-resolution screening only: set COLOR_SAMPLING_ENABLED = True together with
+# COLOR_SCREENING_SCALE = 1 (with the default 1/4 decode it does nothing - scanning 200x150 whole is cheaper)
+# No early accept: MIN/MAX apply to the largest blob, which only the full scan can measure
+COLOR_SAMPLING_ENABLED = False
+COLOR_SAMPLE_TILE = 8             # Tile size in pixels (full resolution)
+COLOR_SAMPLE_STRATA = 8           # Frame split into 8x8 strata - every round samples one tile from each
+COLOR_SAMPLE_Z = 2.5              # Confidence of the upper bound (2.5 ≈ 99.4% one-sided)
+COLOR_SAMPLE_MAX_FRACTION = 0.25  # Give up (or skip sampling) if proof needs more than this share of tiles
+
+# 🔵 Blob detection (thresholds above apply to the largest connected blob, not all colored pixels)
+BLOB_OPEN_KERNEL = 3          # Morphological open (full-resolution px, scaled with the decode) - removes speckle noise
+BLOB_CLOSE_KERNEL = 5         # Morphological close (full-resolution px) - joins a hull split by glare / rigging
+BLOB_MIN_AREA_PERCENT = 0.5   # Smaller components are noise (% of frame / ROI area)
+BLOB_MAX_COUNT = 10           # Blobs kept per frame (largest first)
 
 # Camera GPS Location (Update with actual coordinates)
+# Default location for newly registered cameras - each camera's own location is in admin → Cameras
 CAMERA_GPS_LOCATION = {
     'latitude': 19.0760,   # Mumbai Port example
     'longitude': 72.8777,
     'location_name': 'Port Entry Gate',
     'installation_height': 10,  # meters
 }
+
+# 📷 Cameras (admin → Cameras: token, location, ROI, detection profile, capture interval)
+# Devices without an X-Camera-Id upload as 'default' (created by the migrations, no token)
+CAMERA_AUTO_REGISTER = False  # Unknown X-Camera-Id → 403 (add it in admin); True = register it on first upload
+CAMERA_AUTO_REGISTER_MAX = 32 # ...only with an X-Camera-Token (becomes its token), up to this many cameras
+CAMERA_CONFIG_TTL = 30        # Seconds a camera's config is cached per process
+
+# 📥 Ingest Queue (upload_image returns 202, workers run detection)
+# Start workers with: python manage.py run_ingest_worker
+INGEST_QUEUE_ENABLED = os.environ.get('INGEST_QUEUE_ENABLED', 'True') == 'True'
+INGEST_SPOOL_DIR = os.path.join(BASE_DIR, 'ingest_spool')  # Uploaded bytes waiting for a worker
+INGEST_LEASE_SECONDS = 60      # Worker must finish a job within this time, else it is re-leased
+INGEST_MAX_ATTEMPTS = 3        # Give up on a job after this many tries
+INGEST_RETRY_BACKOFF = 5       # Seconds before first retry (doubles each attempt)
+INGEST_POLL_INTERVAL = 0.5     # Seconds an idle worker waits before polling again
+INGEST_STATS_INTERVAL = 60     # Seconds between detection pool stats log lines
+BATCH_MAX_FRAMES = 16          # Max frames per /upload-batch/ request (burst captures)
+INGEST_JOB_RETENTION_DAYS = 7  # Finished jobs are deleted after this (maintenance)
+
+# 🧹 Maintenance (runs inside run_ingest_worker and the gunicorn workers - one leader - or: python manage.py run_maintenance)
+MAINTENANCE_ENABLED = True
+MAINTENANCE_LOCK_FILE = os.path.join(BASE_DIR, 'maintenance.lock')          # flock holder = leader
+MAINTENANCE_STATUS_FILE = os.path.join(BASE_DIR, 'maintenance_status.json') # Last run report
+MAINTENANCE_TICK_SECONDS = 5       # How often the scheduler checks for due jobs
+MAINTENANCE_BATCH_SIZE = 500       # Files / rows handled per batch
+MAINTENANCE_FILE_MAX_AGE = 3600    # Orphaned spool / temp files older than this are removed
+MAINTENANCE_INTERVALS = {          # Seconds between runs of each job
+    'clean_spool': 600,
+    'clean_capture_temp_files': 600,
+    'prune_ingest_jobs': 3600,
+    'clean_legacy_live_folder': 3600,  # Pre-ring-buffer media/live_monitoring JPEGs (no-op once gone)
+}
+
+# ♻️ Near-duplicate suppression (per camera perceptual hash)
+DEDUPE_ENABLED = True
+DEDUPE_WINDOW_SECONDS = 300   # Reuse a verdict for up to 5 minutes after the first frame
+DEDUPE_MAX_DISTANCE = 4       # Max differing bits (of 64) to count as the same scene
+DEDUPE_MAX_PER_CAMERA = 32    # Recent frame hashes kept per camera
+DEDUPE_MAX_CAMERAS = 256      # Cameras tracked before least-recently-used ones are dropped
+
+# 🎯 Vessel tracking (per camera, boxes of the detected color across frames)
+# One capture per track: later frames of the same boat update it instead of adding captures
+TRACKING_ENABLED = True
+TRACK_IOU_THRESHOLD = 0.2     # Min overlap with a track's predicted box to be the same boat
+TRACK_MAX_DISTANCE = 1.0      # ...or max centre distance, in box diagonals (fast / small boats)
+TRACK_MAX_AGE = 60            # Seconds without a match before a track ends (next sighting = new capture)
+TRACK_MIN_HITS = 2            # Detected frames before a track is confirmed (may skip detection)
+TRACK_SKIP_FRAMES = 3         # Frames in a row detection may be skipped for a confirmed track
+TRACK_COVER_PADDING = 0.25    # Predicted box grown by this fraction when checking motion inside it
+TRACK_TRAIL_FRAMES = 4        # Last boxes of a track that also count (the boat's wake is still motion)
+TRACK_MAX_UNCOVERED = 10.0    # % of moving pixels allowed outside tracked boxes when skipping
+TRACK_MIN_COLOR = 20.0        # % of a track's predicted box that must still show its color when skipping
+TRACK_MAX_CAMERAS = 256       # Cameras tracked before least-recently-used ones are dropped
+
+# 🌊 Motion gating (per camera background model)
+MOTION_GATING_ENABLED = True
+MOTION_SCALE = 8                # Background model runs on the 1/8 reduced decode (100x75 for SVGA)
+MOTION_LEARNING_RATE = 0.1      # EMA weight of each new frame (static objects fade in ~10 frames)
+MOTION_PIXEL_THRESHOLD = 25     # Change in any B/G/R channel for a pixel to count as foreground
+MOTION_MIN_FOREGROUND = 0.5     # % of pixels that must change, else detection is skipped
+MOTION_DILATE_ITERATIONS = 2    # Grow the foreground mask so whole objects count
+MOTION_MAX_CAMERAS = 256        # Background models kept before least-recently-used ones are dropped
+
+# 📺 Live monitoring (ring buffer per camera, shared by all worker processes via mmap)
+# /dev/shm is RAM - live frames never touch the disk; old frames are overwritten, nothing to clean up
+LIVE_BUFFER_DIR = '/dev/shm/oceanguard_live' if os.path.isdir('/dev/shm') else os.path.join(BASE_DIR, 'live_buffer')
+LIVE_BUFFER_FRAMES = 40             # Frames kept per camera (~5 minutes at an 8 s capture interval)
+LIVE_BUFFER_BYTES = 4 * 1024 * 1024 # JPEG bytes kept per camera (larger frames are not shown live)
+# MJPEG stream (/live/<camera>/stream/) - each open viewer holds one server thread
+LIVE_STREAM_MAX_CLIENTS = 4         # Open viewers per host (all workers), the rest get 503
+LIVE_STREAM_MAX_SECONDS = 600       # Stream ends after this (the page reconnects), frees the thread
+LIVE_STREAM_QUEUE_FRAMES = 2        # Frames queued per viewer - a slow viewer skips older ones
+LIVE_STREAM_POLL_INTERVAL = 0.2     # Seconds between checks for a new frame
+LIVE_STREAM_KEEPALIVE = 15          # Re-send the last frame when idle, so closed viewers are noticed
+
+# 📏 Upload limits (checked while the body streams in, before decode)
+UPLOAD_MAX_BYTES = 512 * 1024   # SVGA at quality 10 is ~40-60KB
+UPLOAD_MAX_DIMENSION = 2048     # Largest width/height accepted (UXGA is 1600x1200)
+UPLOAD_CHUNK_SIZE = 16 * 1024   # Bytes read from the socket per step
+
+# 🚦 Rate limiting + backpressure (429 / 503 with Retry-After, ESP32 sleeps that long)
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_HEADROOM = 2.0       # A camera may upload 2x faster than its capture interval
+RATE_LIMIT_BURST = 3            # Extra uploads allowed back to back (retries after Wi-Fi drops)
+# Shared by every worker process on the host (flock'd files - RAM under /dev/shm)
+ADMISSION_STATE_DIR = '/dev/shm/oceanguard_admission' if os.path.isdir('/dev/shm') else os.path.join(BASE_DIR, 'admission_state')
+ADMISSION_MAX_IN_FLIGHT = 8     # Queue mode: uploads handled at once on this host, the rest get 503
+ADMISSION_MAX_INLINE = 2 * (os.cpu_count() or 1)  # Inline mode: uploads detecting at once on this host
+INGEST_MAX_BACKLOG = 200        # Queued + processing jobs before new uploads get 503
+ADMISSION_BACKLOG_CHECK_INTERVAL = 1.0  # Seconds between backlog counts
+ADMISSION_RETRY_AFTER = 10      # Base back-off (seconds) suggested to devices, scaled by overload
+ADMISSION_MAX_RETRY_AFTER = 120 # Never tell a device to wait longer than this
+
+# ⚙️ Detection Process Pool (multi-core OpenCV / YOLO)
+# Pool processes x OpenCV threads should not exceed the CPU cores
+DETECTION_POOL_SIZE = int(os.environ.get('DETECTION_POOL_SIZE', os.cpu_count() or 1))  # Per host (split between gunicorn workers), 0 = run inline
+DETECTION_CV_THREADS = int(os.environ.get('DETECTION_CV_THREADS', 1))  # cv2.setNumThreads per process
+DETECTION_POOL_START_METHOD = 'spawn'  # 'spawn' works on Linux and Windows
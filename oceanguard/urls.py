@@ -19,6 +19,13 @@ from django.contrib import admin
 from django.urls import path
 from camera.views import (
     upload_image,
+    upload_batch,
+    ingest_job_status,
+    detection_pool_status,
+    maintenance_report,
+    live_frames,
+    live_frame,
+    live_stream,
     gallery,
     approved_gallery,
     warning_gallery,
@@ -38,6 +45,18 @@ urlpatterns = [
 
     # Image Upload
     path('upload-image/', upload_image, name='upload_image'),
+    path('upload-batch/', upload_batch, name='upload_batch'),
+    path('ingest-job/<int:job_id>/', ingest_job_status, name='ingest_job_status'),
+
+    # System Status
+    path('system/detection-pool/', detection_pool_status, name='detection_pool_status'),
+    path('system/maintenance/', maintenance_report, name='maintenance_report'),
+
+    # Live Monitoring (shared memory ring buffer per camera)
+    path('live/<slug:camera_id>/', live_frames, name='live_frames'),
+    path('live/<slug:camera_id>/latest.jpg', live_frame, name='live_latest'),
+    path('live/<slug:camera_id>/<int:seq>.jpg', live_frame, name='live_frame'),
+    path('live/<slug:camera_id>/stream/', live_stream, name='live_stream'),
 
     # Gallery Pages
     path('gallery/', gallery, name='gallery'),